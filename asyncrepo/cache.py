@@ -0,0 +1,115 @@
+import asyncio
+import time
+from collections import OrderedDict
+from typing import AsyncGenerator, Hashable, Optional, Union
+
+from asyncrepo.exceptions import ItemNotFound
+from asyncrepo.repository import Changes, Repository, Page, Item
+
+
+class CachedRepository(Repository):
+    """
+    Wraps a repository to cache the items returned by get.
+
+    Items are kept for ttl seconds, up to max_size of them, evicting the least recently used first. Concurrent gets
+    for the same item share a single call to the wrapped repository, and items which weren't found are remembered
+    for negative_ttl seconds. Everything other than get is passed straight through to the wrapped repository.
+    """
+
+    def __init__(self, repository: Repository, ttl: Optional[float] = 300, max_size: int = 10_000,
+                 negative_ttl: Optional[float] = 60):
+        """
+        Initialize a new cache for the specified repository.
+
+        :param repository: The repository to cache.
+        :param ttl: The number of seconds to keep items for, or None to keep them until evicted.
+        :param max_size: The maximum number of items (and missing items) to keep.
+        :param negative_ttl: The number of seconds to remember that an item wasn't found, or 0 not to.
+        """
+        self.repository = repository
+        self.ttl = ttl
+        self.max_size = max_size
+        self.negative_ttl = negative_ttl
+        self._entries: OrderedDict[Hashable, tuple[float, Union[Item, ItemNotFound]]] = OrderedDict()
+        self._in_flight: dict[Hashable, asyncio.Future] = {}
+
+    def __getattr__(self, name):
+        # Only called for attributes not found on the cache itself, e.g. repository specific options
+        if name == 'repository':
+            raise AttributeError(name)
+        return getattr(self.repository, name)
+
+    async def close(self) -> None:
+        await self.repository.close()
+
+    async def list_page(self, *args, **kwargs) -> Page:
+        return await self.repository.list_page(*args, **kwargs)
+
+    async def list_pages(self, *args, **kwargs) -> AsyncGenerator[Page, None]:
+        async for page in self.repository.list_pages(*args, **kwargs):
+            yield page
+
+    async def search_page(self, query: str, *args, **kwargs) -> Page:
+        return await self.repository.search_page(query, *args, **kwargs)
+
+    async def search_pages(self, query: str, *args, **kwargs) -> AsyncGenerator[Page, None]:
+        async for page in self.repository.search_pages(query, *args, **kwargs):
+            yield page
+
+    def changes_since(self, cursor: Optional[str] = None, *args, **kwargs) -> Changes:
+        return self.repository.changes_since(cursor, *args, **kwargs)
+
+    async def get(self, id: str, *args, **kwargs) -> Item:
+        key = (id, args, tuple(sorted((name, _hashable(value)) for name, value in kwargs.items())))
+        entry = self._entries.get(key)
+        if entry is not None:
+            expires_at, value = entry
+            if expires_at > time.monotonic():
+                self._entries.move_to_end(key)
+                if isinstance(value, ItemNotFound):
+                    raise ItemNotFound(*value.args)
+                return value
+            del self._entries[key]
+
+        future = self._in_flight.get(key)
+        if future is None:
+            future = self._in_flight[key] = asyncio.ensure_future(self._fetch(key, id, *args, **kwargs))
+            future.add_done_callback(lambda _: self._in_flight.pop(key, None))
+        # Shielded so that one caller giving up doesn't cancel the call for everyone else waiting on it
+        return await asyncio.shield(future)
+
+    def invalidate(self, id: Optional[str] = None) -> None:
+        """
+        Forget the cached item (or missing item) with the specified identifier, or everything if none is given.
+        """
+        if id is None:
+            self._entries.clear()
+            return
+        for key in [key for key in self._entries if key[0] == id]:
+            del self._entries[key]
+
+    async def _fetch(self, key: Hashable, id: str, *args, **kwargs) -> Item:
+        try:
+            item = await self.repository.get(id, *args, **kwargs)
+        except ItemNotFound as e:
+            if self.negative_ttl:
+                self._store(key, e, self.negative_ttl)
+            raise
+        self._store(key, item, self.ttl)
+        return item
+
+    def _store(self, key: Hashable, value: Union[Item, ItemNotFound], ttl: Optional[float]) -> None:
+        expires_at = float('inf') if ttl is None else time.monotonic() + ttl
+        self._entries[key] = (expires_at, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+
+def _hashable(value):
+    # Arguments such as a list of fields are part of the key too
+    if isinstance(value, list):
+        return tuple(value)
+    if isinstance(value, set):
+        return frozenset(value)
+    return value
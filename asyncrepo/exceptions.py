@@ -1,2 +1,10 @@
 class ItemNotFound(Exception):
     pass
+
+
+class OperationNotSupported(NotImplementedError):
+    pass
+
+
+class InvalidCursor(ValueError):
+    pass
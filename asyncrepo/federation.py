@@ -0,0 +1,119 @@
+import asyncio
+import warnings
+from contextlib import aclosing
+from typing import AsyncGenerator, AsyncIterator, Awaitable, Callable, Optional, TypeVar
+
+from asyncrepo.repository import Repository, Page, Item
+from asyncrepo.utils.concurrency import merge
+
+T = TypeVar('T')
+
+
+class Federation:
+    """
+    A federation runs the same operation on several repositories at once, yielding the results of each
+    repository as soon as that repository produces them, so a slow source never holds back a fast one, and a
+    failing source never stops the others.
+
+    Every item keeps a reference to the repository it came from in item.repository.
+    """
+
+    def __init__(self, *repositories: Repository, timeout: Optional[float] = None,
+                 timeouts: Optional[dict[Repository, float]] = None):
+        """
+        Initialize a new federation of the specified repositories.
+
+        :param repositories: The repositories to federate.
+        :param timeout: The number of seconds each repository has to produce all of its results. A repository which
+            runs out of time is skipped from then on, with a warning, as is one which raises an error.
+        :param timeouts: Overrides of the timeout for specific repositories.
+        """
+        self.repositories = list(repositories)
+        self.timeout = timeout
+        self.timeouts = dict(timeouts or {})
+
+    async def __aenter__(self) -> 'Federation':
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb) -> None:
+        await self.close()
+
+    async def close(self) -> None:
+        await asyncio.gather(*[repository.close() for repository in self.repositories])
+
+    async def list(self, *args, **kwargs) -> AsyncGenerator[Item, None]:
+        async for page in self.list_pages(*args, **kwargs):
+            for item in page:
+                yield item
+
+    async def list_pages(self, *args, **kwargs) -> AsyncGenerator[Page, None]:
+        """
+        List pages from every repository concurrently. Any arguments are passed along to every repository.
+        """
+        async for page in self._federate(lambda repository: repository.list_pages(*args, **kwargs)):
+            yield page
+
+    async def search(self, query: str, *args, **kwargs) -> AsyncGenerator[Item, None]:
+        async for page in self.search_pages(query, *args, **kwargs):
+            for item in page:
+                yield item
+
+    async def search_pages(self, query: str, *args, **kwargs) -> AsyncGenerator[Page, None]:
+        """
+        Search every repository concurrently. Any arguments are passed along to every repository.
+        """
+        async for page in self._federate(lambda repository: repository.search_pages(query, *args, **kwargs)):
+            yield page
+
+    async def _federate(self, operation: Callable[[Repository], AsyncIterator[Page]]) -> AsyncGenerator[Page, None]:
+        sources = [self._within_timeout(repository, operation(repository)) for repository in self.repositories]
+        # Each repository can have a page ready while the consumer is busy, and then waits for it
+        async with aclosing(merge(sources, buffer=len(sources))) as pages:
+            async for page in pages:
+                yield page
+
+    async def _within_timeout(self, repository: Repository,
+                              pages: AsyncIterator[Page]) -> AsyncGenerator[Page, None]:
+        timeout = self.timeouts.get(repository, self.timeout)
+        loop = asyncio.get_running_loop()
+        deadline = None if timeout is None else loop.time() + timeout
+        try:
+            while True:
+                try:
+                    if deadline is None:
+                        page = await pages.__anext__()
+                    else:
+                        page = await _before(deadline, pages.__anext__())
+                except StopAsyncIteration:
+                    return
+                except _DeadlineMissed:
+                    warnings.warn(f"{type(repository).__name__} did not finish within {timeout} seconds. "
+                                  f"Skipping the rest of its results.")
+                    return
+                yield page
+        except Exception as e:
+            warnings.warn(f"{type(repository).__name__} failed with {e!r}. Skipping the rest of its results.")
+        finally:
+            await pages.aclose()
+
+
+class _DeadlineMissed(Exception):
+    pass
+
+
+async def _before(deadline: float, awaitable: Awaitable[T]) -> T:
+    """
+    Awaits awaitable, cancelling it and raising _DeadlineMissed if it isn't done by the event loop time deadline.
+    Unlike with wait_for, a TimeoutError raised by awaitable itself is passed through as it is.
+    """
+    loop = asyncio.get_running_loop()
+    task = asyncio.ensure_future(awaitable)
+    try:
+        done, _ = await asyncio.wait({task}, timeout=max(deadline - loop.time(), 0))
+    finally:
+        if not task.done():
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+    if not done:
+        raise _DeadlineMissed()
+    return task.result()
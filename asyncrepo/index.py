@@ -0,0 +1,189 @@
+import asyncio
+import time
+from bisect import bisect_left
+from contextlib import aclosing
+from typing import AsyncGenerator, Iterable, Optional
+
+from asyncrepo.exceptions import ItemNotFound
+from asyncrepo.repository import Changes, Repository, Page, Item
+from asyncrepo.utils.text import tokens
+
+DEFAULT_PAGE_SIZE = 100
+
+# Listing options which change how pages are fetched, but not which items are listed
+_LISTING_OPTIONS = frozenset({'prefetch', 'concurrency', 'ordered'})
+
+
+class InvertedIndex:
+    """
+    An in-memory index from the words of each item's document to the items containing them.
+
+    A search returns the items containing every word of the query, or a word starting with it, in the order the
+    items were added.
+    """
+
+    def __init__(self, items: Iterable[Item] = ()):
+        self._items: list[Item] = []
+        self._ids: dict[str, int] = {}
+        self._postings: dict[str, list[int]] = {}
+        self._vocabulary: Optional[list[str]] = None
+        for item in items:
+            self.add(item)
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def add(self, item: Item) -> None:
+        position = len(self._items)
+        self._items.append(item)
+        self._ids.setdefault(item.id, position)
+        for token in set(tokens(str(item.document))):
+            self._postings.setdefault(token, []).append(position)
+        self._vocabulary = None
+
+    def get(self, id: str) -> Optional[Item]:
+        position = self._ids.get(id)
+        return None if position is None else self._items[position]
+
+    def search(self, query: str) -> list[Item]:
+        terms = set(tokens(query))
+        if not terms:
+            return list(self._items)
+        # Intersecting the rarest terms first keeps the working set as small as possible
+        postings = sorted((self._prefix_postings(term) for term in terms), key=len)
+        positions = postings[0]
+        for other in postings[1:]:
+            if not positions:
+                break
+            positions = positions.intersection(other)
+        return [self._items[position] for position in sorted(positions)]
+
+    def _prefix_postings(self, term: str) -> set[int]:
+        if self._vocabulary is None:
+            self._vocabulary = sorted(self._postings)
+        positions = set()
+        i = bisect_left(self._vocabulary, term)
+        while i < len(self._vocabulary) and self._vocabulary[i].startswith(term):
+            positions.update(self._postings[self._vocabulary[i]])
+            i += 1
+        return positions
+
+
+class IndexedRepository(Repository):
+    """
+    Wraps a repository to answer searches from an in-memory inverted index of its items, instead of
+    re-listing the whole repository for every query. This is mostly useful for repositories with naive search.
+
+    The index is built from the first full listing of the repository (or by the first search, if nothing has
+    listed it yet) and is rebuilt once it is older than ttl seconds, or on refresh(). While the index is fresh,
+    get is also answered from it.
+
+    Searches match items containing every word of the query, or words starting with it, so unlike naive search
+    they won't find a query that only appears in the middle of a word.
+    """
+
+    def __init__(self, repository: Repository, ttl: Optional[float] = None, page_size: int = DEFAULT_PAGE_SIZE):
+        """
+        Initialize a new index of the specified repository.
+
+        :param repository: The repository to index.
+        :param ttl: The number of seconds before the index is rebuilt, or None to keep it until refreshed.
+        :param page_size: The number of items per page of search results.
+        """
+        self.repository = repository
+        self.ttl = ttl
+        self.page_size = page_size
+        self._index: Optional[InvertedIndex] = None
+        self._built_at = 0.0
+        self._refresh_lock = asyncio.Lock()
+
+    def __getattr__(self, name):
+        # Only called for attributes not found on the index itself, e.g. repository specific options
+        if name == 'repository':
+            raise AttributeError(name)
+        return getattr(self.repository, name)
+
+    @property
+    def is_fresh(self) -> bool:
+        if self._index is None:
+            return False
+        return self.ttl is None or time.monotonic() - self._built_at < self.ttl
+
+    async def close(self) -> None:
+        await self.repository.close()
+
+    async def refresh(self) -> None:
+        """
+        Rebuild the index from a full listing of the repository.
+        """
+        async with self._refresh_lock:
+            await self._build()
+
+    async def list_page(self, *args, **kwargs) -> Page:
+        return await self.repository.list_page(*args, **kwargs)
+
+    def changes_since(self, cursor: Optional[str] = None, *args, **kwargs) -> Changes:
+        return self.repository.changes_since(cursor, *args, **kwargs)
+
+    async def list_pages(self, *args, **kwargs) -> AsyncGenerator[Page, None]:
+        """
+        List pages from the repository, building the index along the way if it isn't fresh and the listing covers
+        the whole repository.
+        """
+        pages = self.repository.list_pages(*args, **kwargs)
+        index = None
+        if not args and _LISTING_OPTIONS.issuperset(kwargs) and not self.is_fresh:
+            index = InvertedIndex()
+        async with aclosing(pages):
+            async for page in pages:
+                if index is not None:
+                    for item in page:
+                        index.add(item)
+                yield page
+        # Only reached if the listing ran to the end, so the index is complete
+        if index is not None:
+            self._install(index)
+
+    async def search_page(self, query: str, *args, **kwargs) -> Page:
+        """
+        Search the index, building it first if it isn't fresh. Any other arguments are repository specific, so
+        such searches are passed to the repository instead.
+        """
+        if args or kwargs:
+            return await self.repository.search_page(query, *args, **kwargs)
+        await self._ensure_index()
+        return self._page(self._index.search(query))
+
+    async def get(self, id: str, *args, **kwargs) -> Item:
+        if args or kwargs or not self.is_fresh:
+            return await self.repository.get(id, *args, **kwargs)
+        item = self._index.get(str(id))
+        if item is None:
+            raise ItemNotFound(id)
+        return item
+
+    async def _ensure_index(self) -> None:
+        async with self._refresh_lock:
+            # Searches which waited on the lock can use the index the first of them built
+            if not self.is_fresh:
+                await self._build()
+
+    async def _build(self) -> None:
+        index = InvertedIndex()
+        async with aclosing(self.repository.list_pages()) as pages:
+            async for page in pages:
+                for item in page:
+                    index.add(item)
+        self._install(index)
+
+    def _install(self, index: InvertedIndex) -> None:
+        self._index = index
+        self._built_at = time.monotonic()
+
+    def _page(self, items: list[Item], start: int = 0) -> Page:
+        end = start + self.page_size
+        next_page_fn = None
+        if end < len(items):
+            async def next_page_fn() -> Page:
+                return self._page(items, end)
+        return Page(self.repository, items[start:end], next_page_fn)
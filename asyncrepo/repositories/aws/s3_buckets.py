@@ -1,3 +1,5 @@
+from typing import Optional, Sequence
+
 import aioboto3
 
 from asyncrepo.exceptions import ItemNotFound
@@ -22,7 +24,7 @@ class S3Buckets(Repository):
                 buckets.append(await self._bucket_to_item(bucket))
             return Page(self, buckets)
 
-    async def get(self, id: str) -> Item:
+    async def get(self, id: str, fields: Optional[Sequence[str]] = None) -> Item:
         """
         Get a bucket by identifier
         """
@@ -41,7 +43,7 @@ class S3Buckets(Repository):
             if not await bucket.creation_date:
                 raise ItemNotFound(id)
 
-            return await self._bucket_to_item(bucket)
+            return (await self._bucket_to_item(bucket)).project(fields)
 
     async def _bucket_to_item(self, bucket):
         data = bucket.meta.data
@@ -1,17 +1,53 @@
+import asyncio
+from collections import deque
+from contextlib import AsyncExitStack, aclosing
+from datetime import datetime
+from typing import AsyncGenerator, Optional, Sequence
+
 import aioboto3
 
-from asyncrepo.exceptions import ItemNotFound
+from asyncrepo.exceptions import ItemNotFound, OperationNotSupported
 from asyncrepo.repository import Repository, Page, Item
+from asyncrepo.utils.concurrency import bounded_map, merge
+from asyncrepo.utils.cursors import decode_cursor, encode_cursor
+
+# The number of shards listed at once by changes_since, and by list_pages and search_pages when given split_points
+DEFAULT_LISTING_CONCURRENCY = 10
 
 
 class S3Objects(Repository):
     """
     AWS S3 Objects
+
+    Objects are listed with ListObjectsV2, up to 1,000 keys per request. Large buckets can instead be listed in
+    shards of their keys, several at a time (see list_pages). Listings share a client, to which any
+    aioboto_client_kwargs are passed (e.g. an endpoint_url for other S3 compatible storage, or a config with more
+    than the default 10 max_pool_connections for listing more shards at once).
     """
 
-    def __init__(self, bucket_name: str, aioboto_session_kwargs: dict = None):
+    # Cursors hold the continuation token for the next page
+    resumes_pages = True
+
+    def __init__(self, bucket_name: str, aioboto_session_kwargs: dict = None, aioboto_client_kwargs: dict = None):
         self.bucket_name = bucket_name
         self.session = aioboto3.Session(**(aioboto_session_kwargs or {}))
+        self.client_kwargs = aioboto_client_kwargs or {}
+        self._client = None
+        self._client_stack = AsyncExitStack()
+        self._ensure_client_lock = asyncio.Lock()
+
+    async def _ensure_client(self):
+        async with self._ensure_client_lock:
+            if self._client is None:
+                self._client = await self._client_stack.enter_async_context(
+                    self.session.client("s3", **self.client_kwargs))
+            return self._client
+
+    async def close(self) -> None:
+        async with self._ensure_client_lock:
+            if self._client is not None:
+                await self._client_stack.aclose()
+                self._client = None
 
     async def list_page(self, *args, **kwargs) -> 'Page':
         """
@@ -19,36 +55,186 @@ class S3Objects(Repository):
         """
         return await self.search_page(*args, **kwargs)
 
-    async def search_page(self, query='', _iterator=None, **kwargs) -> 'Page':
+    async def list_pages(self, *args, concurrency: Optional[int] = None, split_points: Optional[Sequence[str]] = None,
+                         prefetch: int = 0, **kwargs) -> AsyncGenerator[Page, None]:
+        """
+        List pages of objects.
+
+        :param concurrency: If set, the bucket is listed in shards, with at most this many requests in flight at
+            once. Unless split_points are given, the shards are the prefixes up to the first "/" (found with a
+            listing by that delimiter), after the objects without one. Pages from different shards are yielded as
+            they arrive, so keys aren't in order overall, and the pages are not linked, so their next_page() and
+            cursor are always None.
+        :param split_points: Keys to split the listing into shards at, for buckets whose keys aren't spread over
+            prefixes. Each shard lists the keys after one point up to and including the next. These are listed
+            DEFAULT_LISTING_CONCURRENCY at a time unless concurrency is given.
+        :param prefetch: The number of pages to fetch ahead when not listing in shards.
+        """
+        if concurrency is None and split_points is None:
+            pages = super().list_pages(*args, prefetch=prefetch, **kwargs)
+        else:
+            pages = self._list_pages_in_shards('', concurrency, split_points, **kwargs)
+        async with aclosing(pages):
+            async for page in pages:
+                yield page
+
+    async def search_page(self, query='', resume_from: Optional[str] = None, _token: Optional[str] = None,
+                          **kwargs) -> 'Page':
         """
-        Search for objects by prefix
+        Search for objects by prefix. Any keyword arguments (e.g. MaxKeys) are passed along to ListObjectsV2.
         """
-        async with self.session.resource("s3") as s3:
-            if _iterator is None:
-                paginator = s3.meta.client.get_paginator("list_objects")
-                _iterator = paginator.paginate(Bucket=self.bucket_name, Prefix=query)
-            async for page in _iterator:
-                objects = [await self._object_to_item(obj) for obj in page.get("Contents", [])]
-                next_page_fn = None
-                if page.get("IsTruncated"):
-                    async def next_page_fn():
-                        return await self.search_page(query, _iterator=_iterator)
-                return Page(self, objects, next_page_fn)
+        if resume_from is not None:
+            _token = decode_cursor(self, resume_from)["token"]
+        if _token is not None:
+            kwargs["ContinuationToken"] = _token
+        s3 = await self._ensure_client()
+        response = await s3.list_objects_v2(Bucket=self.bucket_name, Prefix=query, **kwargs)
+        objects = [await self._object_to_item(obj) for obj in response.get("Contents", [])]
+        next_page_fn = None
+        cursor = None
+        if response.get("IsTruncated"):
+            token = response["NextContinuationToken"]
+
+            async def next_page_fn():
+                return await self.search_page(query, _token=token, **kwargs)
 
+            cursor = encode_cursor(self, {"token": token})
+        return Page(self, objects, next_page_fn, cursor)
 
-    async def get(self, id: str) -> Item:
+    async def search_pages(self, query: str, *args, concurrency: Optional[int] = None,
+                           split_points: Optional[Sequence[str]] = None, prefetch: int = 0,
+                           **kwargs) -> AsyncGenerator[Page, None]:
+        """
+        Search for pages of objects by prefix. Accepts the same sharding options as list_pages, where the shards
+        are the prefixes up to the first "/" after the query.
+        """
+        if concurrency is None and split_points is None:
+            pages = super().search_pages(query, *args, prefetch=prefetch, **kwargs)
+        else:
+            pages = self._list_pages_in_shards(query, concurrency, split_points, **kwargs)
+        async with aclosing(pages):
+            async for page in pages:
+                yield page
+
+    async def _list_pages_in_shards(self, prefix: str, concurrency: Optional[int],
+                                    split_points: Optional[Sequence[str]], fields: Optional[Sequence[str]] = None,
+                                    resume_from: Optional[str] = None, **kwargs) -> AsyncGenerator[Page, None]:
+        if resume_from is not None:
+            raise OperationNotSupported("Listings in shards can't resume from a cursor")
+        objects = self._list_shards(prefix, concurrency or DEFAULT_LISTING_CONCURRENCY, split_points, **kwargs)
+        async with aclosing(objects) as batches:
+            async for batch in batches:
+                page = Page(self, [await self._object_to_item(obj) for obj in batch])
+                yield page if fields is None else page._project(fields)
+
+    async def _list_shards(self, prefix: str, concurrency: int, split_points: Optional[Sequence[str]],
+                           **kwargs) -> AsyncGenerator[list[dict], None]:
+        """
+        Yields the objects under the prefix a response at a time, from up to concurrency shards at once. Shards
+        are split at the split points if given, or else by the next "/" after the prefix, in which case the objects
+        directly under the prefix come first.
+        """
+        s3 = await self._ensure_client()
+        if split_points is None:
+            shards = []
+            paginator = s3.get_paginator("list_objects_v2")
+            async for response in paginator.paginate(Bucket=self.bucket_name, Prefix=prefix, Delimiter="/",
+                                                     **kwargs):
+                if response.get("Contents"):
+                    yield response["Contents"]
+                shards.extend((common["Prefix"], None, None) for common in response.get("CommonPrefixes", []))
+        else:
+            points = sorted(set(split_points))
+            shards = [(prefix, after, until) for after, until in zip([None, *points], [*points, None])]
+        if not shards:
+            return
+
+        pending = deque(shards)
+
+        async def list_pending() -> AsyncGenerator[list[dict], None]:
+            # Each of these lists one shard after another until none are left, so that only concurrency requests
+            # are ever in flight
+            while pending:
+                async with aclosing(self._list_shard(s3, *pending.popleft(), **kwargs)) as batches:
+                    async for batch in batches:
+                        yield batch
+
+        listers = [list_pending() for _ in range(min(concurrency, len(shards)))]
+        async with aclosing(merge(listers, buffer=concurrency)) as batches:
+            async for batch in batches:
+                yield batch
+
+    async def _list_shard(self, s3, prefix: str, after: Optional[str], until: Optional[str],
+                          **kwargs) -> AsyncGenerator[list[dict], None]:
+        # The keys under the prefix after one key (if given), up to and including another (if given). S3 lists keys
+        # in the order of their UTF-8 bytes, which is the order Python compares strings in.
+        if after is not None:
+            kwargs["StartAfter"] = after
+        paginator = s3.get_paginator("list_objects_v2")
+        async for response in paginator.paginate(Bucket=self.bucket_name, Prefix=prefix, **kwargs):
+            objects = response.get("Contents", [])
+            past_until = until is not None and objects and objects[-1]["Key"] > until
+            if past_until:
+                objects = [obj for obj in objects if obj["Key"] <= until]
+            if objects:
+                yield objects
+            if past_until:
+                return
+
+    async def get(self, id: str, fields: Optional[Sequence[str]] = None) -> Item:
         """
         Get an object by identifier
         """
-        async with self.session.resource("s3") as s3:
+        async with self.session.resource("s3", **self.client_kwargs) as s3:
             try:
                 obj = await s3.Object(self.bucket_name, id)
-                return await self._object_to_item(obj)
+                return (await self._object_to_item(obj)).project(fields)
             except Exception as e:
                 if hasattr(e, "response") and e.response["Error"]["Code"] == "404":
                     raise ItemNotFound(id)
                 raise
 
+    async def _get_many(self, ids: Sequence[str], concurrency: int, *args, fields: Optional[Sequence[str]] = None,
+                        **kwargs) -> AsyncGenerator[tuple[str, Optional[Item]], None]:
+        """
+        HEADs the objects over the shared client, with up to concurrency requests in flight at once.
+        """
+        s3 = await self._ensure_client()
+
+        async def head(id: str) -> tuple[str, Optional[Item]]:
+            try:
+                head = await s3.head_object(Bucket=self.bucket_name, Key=id)
+            except Exception as e:
+                if hasattr(e, "response") and e.response["Error"]["Code"] in ("404", "NoSuchKey"):
+                    return id, None
+                raise
+            item = await self._object_to_item({
+                "Key": id,
+                "LastModified": head["LastModified"],
+                "Size": head["ContentLength"],
+                "ETag": head["ETag"],
+                # Like get, which leaves it unset for the default storage class
+                "StorageClass": head.get("StorageClass"),
+            })
+            return id, item.project(fields)
+
+        async with aclosing(bounded_map(head, ids, concurrency, ordered=False)) as results:
+            async for result in results:
+                yield result
+
+    async def _changes_since(self, since: Optional[datetime], prefix: str = '',
+                             concurrency: int = DEFAULT_LISTING_CONCURRENCY,
+                             split_points: Optional[Sequence[str]] = None,
+                             **kwargs) -> AsyncGenerator[tuple[Item, datetime], None]:
+        """
+        S3 can't list objects by when they were modified, so every key under the prefix is still listed (though
+        no object is fetched), in up to concurrency shards at once as with list_pages.
+        """
+        async with aclosing(self._list_shards(prefix, concurrency, split_points, **kwargs)) as batches:
+            async for batch in batches:
+                for obj in batch:
+                    if since is None or obj["LastModified"] >= since:
+                        yield await self._object_to_item(obj), obj["LastModified"]
 
     async def _object_to_item(self, obj) -> Item:
         if isinstance(obj, dict):
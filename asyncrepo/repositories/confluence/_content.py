@@ -1,12 +1,30 @@
 import asyncio
-from typing import Optional
+from contextlib import aclosing
+from datetime import datetime
+from typing import AsyncGenerator, Optional, Sequence
 
 from asyncrepo.exceptions import ItemNotFound
-from asyncrepo.repository import Repository, Page, Item
+from asyncrepo.repository import BatchLoader, Repository, Page, Item
+from asyncrepo.utils.concurrency import bounded_map
 from asyncrepo.utils.confluence_client import ConfluenceClient
+from asyncrepo.utils.cursors import decode_cursor, encode_cursor
+from asyncrepo.utils.timestamps import minutes_since, parse_timestamp
+
+GET_MANY_CHUNK_SIZE = 100
+
+# Without fields, list, search and get only expand these, and return lightweight items whose bodies are loaded on
+# demand (see Item.load) with LOAD_EXPAND, for a whole page of items in one search
+METADATA_EXPAND = ('space', 'version')
+LOAD_EXPAND = ('body.view', 'body.storage', 'body.export_view')
 
 
 class _Content(Repository):
+    # Fields are the expansions to request (e.g. space, body.storage, version), in place of METADATA_EXPAND. The
+    # content's own fields, such as its id, type and title, are always returned.
+    pushes_down_fields = True
+    # Cursors hold the next link Confluence returns for the page after, along with its start
+    resumes_pages = True
+
     def __init__(self, base_url: str, username: str, password: str, base_path: str = "/wiki",
                  _type: Optional[str] = None, _space: Optional[str] = None):
         super().__init__()
@@ -33,33 +51,124 @@ class _Content(Repository):
                     base_url=self._base_url, base_path=self._base_path,
                     username=self._username, password=self._password)
 
-    async def get(self, id: str, strict: bool = True) -> Item:
+    async def close(self) -> None:
+        async with self._ensure_confluence_client_lock:
+            if self.confluence_client is not None:
+                await self.confluence_client.close()
+                self.confluence_client = None
+
+    async def get(self, id: str, strict: bool = True, fields: Optional[Sequence[str]] = None) -> Item:
         await self._ensure_confluence_client()
-        data = await self.confluence_client.get_content(id)
+        data = await self.confluence_client.get_content(id, METADATA_EXPAND if fields is None else fields)
         if strict and data['type'] != self._type:
             raise ItemNotFound(id, f"Resource was of type {data['type']} but expected {self._type}")
-        return Item(self, data['id'], data)
+        item = Item(self, data['id'], data)
+        if fields is None:
+            BatchLoader([item], self._load_bodies)
+        return item
 
-    async def _search_cql(self, cql: str, current: int = 0, **kwargs) -> Page:
+    async def _get_many(self, ids: Sequence[str], concurrency: int, strict: bool = True,
+                        fields: Optional[Sequence[str]] = None,
+                        **kwargs) -> AsyncGenerator[tuple[str, Optional[Item]], None]:
+        """
+        Looks content up with a single "id in (...)" search per chunk of ids, with up to concurrency searches in
+        flight at once. As with get, strict only finds content of this repository's type.
+        """
         await self._ensure_confluence_client()
-        data = await self.confluence_client.search(cql, start=current, **kwargs)
+
+        # Content IDs are numeric, so anything else can't be found (and shouldn't make it into the CQL)
+        numeric_ids = []
+        for id in ids:
+            if id.isdigit():
+                numeric_ids.append(id)
+            else:
+                yield id, None
+
+        async def fetch_chunk(chunk: Sequence[str]) -> list[tuple[str, Optional[Item]]]:
+            cql = f"id in ({', '.join(chunk)})"
+            if strict and self._type is not None:
+                cql = f"type={self._type} AND {cql}"
+            page = await self._search_cql(cql, limit=len(chunk), fields=fields)
+            wanted = set(chunk)
+            results = []
+            while page is not None:
+                for item in page:
+                    if item.id in wanted:
+                        wanted.discard(item.id)
+                        results.append((item.id, item))
+                page = await page.next_page()
+            results.extend((id, None) for id in wanted)
+            return results
+
+        chunks = [numeric_ids[i:i + GET_MANY_CHUNK_SIZE] for i in range(0, len(numeric_ids), GET_MANY_CHUNK_SIZE)]
+        async with aclosing(bounded_map(fetch_chunk, chunks, concurrency, ordered=False)) as results:
+            async for chunk_results in results:
+                for result in chunk_results:
+                    yield result
+
+    async def _search_cql(self, cql: str, current: int = 0, fields: Optional[Sequence[str]] = None,
+                          **kwargs) -> Page:
+        await self._ensure_confluence_client()
+        expand = METADATA_EXPAND if fields is None else fields
+        data = await self.confluence_client.search(cql, start=current, expand=expand, **kwargs)
         items = [Item(self, item['id'], item) for item in data['results']]
+        if fields is None and items:
+            BatchLoader(items, self._load_bodies)
         next_page_fn = None
+        cursor = None
         current += len(items)
         next_link = data.get('_links', {}).get('next')
         if next_link is not None:
             async def next_page_fn() -> Page:
                 kwargs['next_link'] = next_link
-                return await self._search_cql(cql, current, **kwargs)
-        return Page(self, items, next_page_fn)
+                return await self._search_cql(cql, current, fields, **kwargs)
 
-    async def list_page(self, *args, **kwargs) -> Page:
+            cursor = encode_cursor(self, {'start': current, 'next_link': next_link})
+        return Page(self, items, next_page_fn, cursor)
+
+    async def _load_bodies(self, items: Sequence[Item]) -> dict[str, dict]:
+        # Confluence may return fewer results per page than asked for when expanding bodies, so follow the pages
+        page = await self._search_cql(f"id in ({', '.join(item.id for item in items)})", limit=len(items),
+                                      fields=LOAD_EXPAND)
+        documents = {}
+        while page is not None:
+            for item in page:
+                documents[item.id] = {'body': item.document.get('body', {})}
+            page = await page.next_page()
+        return documents
+
+    async def list_page(self, *args, resume_from: Optional[str] = None, **kwargs) -> Page:
+        if resume_from is not None:
+            state = decode_cursor(self, resume_from)
+            kwargs.update(current=state['start'], next_link=state['next_link'])
         return await self._search_cql(self._prefix_cql('order by created DESC'), *args, **kwargs)
 
     async def search_page(self, query: str, *args, **kwargs) -> Page:
         query = query.replace('"', '\\"')
         return await self._search_cql(self._prefix_cql(f'text ~ "{query}" order by created DESC'), *args, **kwargs)
 
+    async def _changes_since(self, since: Optional[datetime], *args, fields: Optional[Sequence[str]] = None,
+                             **kwargs) -> AsyncGenerator[tuple[Item, datetime], None]:
+        """
+        Searches for content by when it was last modified, newest first, until reaching some modified before since,
+        so that content modified during the search only shifts what was already seen (see Issues._changes_since).
+        Bodies are loaded on demand, as with listing.
+        """
+        cql = 'order by lastmodified DESC'
+        if since is not None:
+            # As with Jira, CQL's absolute dates are in the user's time zone, so search a window relative to now
+            cql = f'lastmodified >= now("-{minutes_since(since)}m") {cql}'
+        if fields is not None and 'version' not in fields:
+            fields = [*fields, 'version']
+        page = await self._search_cql(self._prefix_cql(cql), *args, fields=fields, **kwargs)
+        while page is not None:
+            for item in page:
+                modified = parse_timestamp(item.document['version']['when'])
+                if since is not None and modified < since:
+                    return
+                yield item, modified
+            page = await page.next_page()
+
     def _prefix_cql(self, cql):
         if not self._start_clause:
             return cql
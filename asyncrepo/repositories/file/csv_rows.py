@@ -1,58 +1,290 @@
-from asyncrepo.exceptions import ItemNotFound
+import asyncio
+import json
+import os
+import tempfile
+from array import array
+from contextlib import aclosing
+from typing import AsyncGenerator, AsyncIterator, Optional, Sequence, Union
+
+from asyncrepo.exceptions import InvalidCursor, ItemNotFound
+from asyncrepo.repositories.file.rows import (INDEX, row_identifier, scan_for, scan_for_many, select_columns,
+                                              skip_rows)
 from asyncrepo.repository import Repository, Page, Item
+from asyncrepo.utils.compression import INFER
+from asyncrepo.utils.cursors import decode_cursor, encode_cursor
 from asyncrepo.utils.resource_streamer import ResourceStreamer
-
-INDEX = object()
+from asyncrepo.utils.row import Header
 
 
 class CSVRows(Repository):
     """
     CSV rows for a specified CSV (filepath or URL)
+
+    For local files, the first full scan also records where each row starts, so that get can read the row
+    directly instead of scanning for it. The offsets are kept for as long as the file's size and modification
+    time don't change, and can be saved alongside the file with offset_index_path to survive restarts.
+
+    Large local files can be parsed across a pool of processes instead (see ResourceStreamer.stream_csv_offsets),
+    and URLs can be downloaded over several connections (see ResourceStreamer). Compressed files and URLs are
+    decompressed as they are read, but have no row offsets, so get has to scan them.
+
+    Fields are column names. Every column is still parsed, but only the given ones are kept in the items.
+
+    With compact, listed rows are kept as read-only Rows, which share the CSV's header rather than repeating it in
+    a dict per row, so holding on to millions of items takes a fraction of the memory. Gets still return dicts.
+
+    Listings of local files resume from the byte offset of the last row listed, as long as the file hasn't changed
+    since. Other listings resume by skipping as many rows as were listed, which still means reading them.
     """
 
-    def __init__(self, filepath_or_url: str, identifier=INDEX, page_size: int = 20, **csv_reader_kwargs):
+    pushes_down_fields = True
+    resumes_pages = True
+
+    def __init__(self, filepath_or_url: str, identifier=INDEX, page_size: int = 20,
+                 offset_index_path: Optional[str] = None, processes: Optional[int] = None, connections: int = 1,
+                 compression: Optional[str] = INFER, compact: bool = False, **csv_reader_kwargs):
         self.filepath_or_url = filepath_or_url
-        self.streamer = ResourceStreamer(filepath_or_url)
+        self.streamer = ResourceStreamer(filepath_or_url, connections=connections, compression=compression)
         self.csv_reader_kwargs = csv_reader_kwargs
         self.page_size = page_size
         self.identifier = identifier
+        self.offset_index_path = offset_index_path
+        self.processes = processes
+        self.compact = compact
+        self._offsets: Optional[_OffsetIndex] = None
+        self._offsets_lock = asyncio.Lock()
 
-    async def list_page(self, *args, _stream=None, _index=0, **kwargs) -> Page:
+    async def list_page(self, *args, fields: Optional[Sequence[str]] = None, resume_from: Optional[str] = None,
+                        _stream=None, _index=0, _offsets=None, _header=None, _stat=None, **kwargs) -> Page:
         """
         List rows for the CSV
         """
         if _stream is None:
-            _stream = self.streamer.stream_csv(**self.csv_reader_kwargs)
+            resume = None
+            if resume_from is not None:
+                resume = decode_cursor(self, resume_from)
+                _index = resume['index']
+            _stream, _offsets, _stat = await self._stream_batches(resume)
         rows = []
-        async for row in _stream:
-            rows.append(Item(self, self._row_identifier(row, _index), row))
+        offset = None
+        for offset, row in await anext(_stream, []):
+            id = self._row_identifier(row, _index)
+            if fields is not None:
+                row = select_columns(row, fields)
+            elif self.compact:
+                if _header is None:
+                    _header = Header(row)
+                row = _header.compact(row)
+            rows.append(Item(self, id, row))
+            if _offsets is not None:
+                _offsets.add(id, offset)
             _index += 1
-            if len(rows) == self.page_size:
-                break
         next_page_fn = None
+        cursor = None
         if len(rows) == self.page_size:
             async def next_page_fn() -> Page:
-                return await self.list_page(*args, _stream=_stream, _index=_index, **kwargs)
-        return Page(self, rows, next_page_fn)
+                return await self.list_page(*args, fields=fields, _stream=_stream, _index=_index, _offsets=_offsets,
+                                            _header=_header, _stat=_stat, **kwargs)
+
+            cursor = self._cursor(_index, offset, _stat)
+        elif _offsets is not None:
+            async with self._offsets_lock:
+                await self._install_offsets(_offsets)
+        return Page(self, rows, next_page_fn, cursor)
 
-    async def get(self, id: str) -> Item:
+    async def get(self, id: str, fields: Optional[Sequence[str]] = None) -> Item:
         """
         Get a row by identifier
         """
         id = str(id)
-        index = 0
-        async for page in self.list_pages():
-            for item in page:
-                if item.id == id:
-                    return item
-                index += 1
-        raise ItemNotFound(id)
+        offsets = await self._ensure_offsets()
+        if offsets is None:
+            return await scan_for(self, id, fields=fields)
 
-    def _row_identifier(self, row: dict, index: int) -> str:
-        if self.identifier is INDEX:
-            return str(index)
-        if isinstance(self.identifier, str):
-            return row[self.identifier]
+        offset = offsets.get(id)
+        row = None if offset is None else await self.streamer.read_csv_row(offset, **self.csv_reader_kwargs)
+        if row is None:
+            raise ItemNotFound(id)
+        return Item(self, id, select_columns(row, fields))
+
+    async def _get_many(self, ids: Sequence[str], concurrency: int, *args, fields: Optional[Sequence[str]] = None,
+                        **kwargs) -> AsyncGenerator[tuple[str, Optional[Item]], None]:
+        """
+        Resolves every identifier in a single scan of the CSV, stopping as soon as all of them have been found.
+        For local files with row offsets, the rows are read directly instead, in file order.
+        """
+        offsets = await self._ensure_offsets()
+        if offsets is not None:
+            found = []
+            for id in ids:
+                offset = offsets.get(id)
+                if offset is None:
+                    yield id, None
+                else:
+                    found.append((offset, id))
+            for offset, id in sorted(found):
+                row = await self.streamer.read_csv_row(offset, **self.csv_reader_kwargs)
+                yield id, None if row is None else Item(self, id, select_columns(row, fields))
+            return
+
+        async with aclosing(scan_for_many(self, ids, fields=fields)) as results:
+            async for id, item in results:
+                yield id, item
+
+    async def _stream_batches(self, resume: Optional[dict] = None) -> tuple[
+            AsyncIterator[list[tuple[Optional[int], dict]]], Optional['_OffsetIndex'], Optional[os.stat_result]]:
+        """
+        Starts streaming pages worth of (offset, row) pairs, from the start or from where a cursor's state left off,
+        along with an empty offset index to fill in if the CSV is a local file without an up-to-date one and the
+        file's stat. Offsets and the stat are None for URLs and compressed files.
+        """
+        stat = await self._offsets_stat()
+        if stat is None:
+            batches = _without_offsets(self.streamer.stream_csv_batches(self.page_size, **self.csv_reader_kwargs))
+            if resume is not None:
+                batches = skip_rows(batches, resume['index'], self.page_size)
+            return batches, None, None
+        if resume is not None:
+            if resume.get('size') != stat.st_size or resume.get('mtime_ns') != stat.st_mtime_ns:
+                raise InvalidCursor('The CSV has changed since the cursor was made', self.filepath_or_url)
+            # The stream starts at the last row listed
+            batches = self.streamer.stream_csv_offset_batches(self.page_size, processes=self.processes,
+                                                              start=resume['offset'], **self.csv_reader_kwargs)
+            return skip_rows(batches, 1, self.page_size), None, stat
+        batches = self.streamer.stream_csv_offset_batches(self.page_size, processes=self.processes,
+                                                          **self.csv_reader_kwargs)
+        if self._offsets is not None and self._offsets.is_current(stat, self._offsets_key()):
+            return batches, None, stat
+        offsets = _OffsetIndex(stat.st_size, stat.st_mtime_ns, self._offsets_key(), self.identifier is INDEX)
+        return batches, offsets, stat
+
+    def _cursor(self, index: int, offset: Optional[int], stat: Optional[os.stat_result]) -> str:
+        # Index is that of the next row, and offset where the last row listed starts
+        if offset is None:
+            return encode_cursor(self, {'index': index})
+        return encode_cursor(self, {'index': index, 'offset': offset, 'size': stat.st_size,
+                                    'mtime_ns': stat.st_mtime_ns})
+
+    async def _ensure_offsets(self) -> Optional['_OffsetIndex']:
+        """
+        Returns the offset index of a local file, loading it from offset_index_path or building it with a full scan
+        if there isn't an up-to-date one yet. Returns None for URLs and compressed files.
+        """
+        stat = await self._offsets_stat()
+        if stat is None:
+            return None
+        key = self._offsets_key()
+        async with self._offsets_lock:
+            if self._offsets is not None and self._offsets.is_current(stat, key):
+                return self._offsets
+            if self.offset_index_path is not None:
+                offsets = await asyncio.to_thread(_OffsetIndex.load, self.offset_index_path)
+                if offsets is not None and offsets.is_current(stat, key):
+                    self._offsets = offsets
+                    return offsets
+
+            offsets = _OffsetIndex(stat.st_size, stat.st_mtime_ns, key, self.identifier is INDEX)
+            index = 0
+            batches = self.streamer.stream_csv_offset_batches(processes=self.processes, **self.csv_reader_kwargs)
+            async with aclosing(batches):
+                async for batch in batches:
+                    for offset, row in batch:
+                        offsets.add(self._row_identifier(row, index), offset)
+                        index += 1
+            await self._install_offsets(offsets)
+            return offsets
+
+    async def _offsets_stat(self) -> Optional[os.stat_result]:
+        # Rows can only be read by offset from uncompressed local files
+        stat = await self.streamer.stat()
+        if stat is None or await self.streamer.file_compression() is not None:
+            return None
+        return stat
+
+    async def _install_offsets(self, offsets: '_OffsetIndex') -> None:
+        self._offsets = offsets
+        if self.offset_index_path is not None:
+            await asyncio.to_thread(offsets.save, self.offset_index_path)
+
+    def _project(self, item: Item, fields: Sequence[str]) -> Item:
+        # Searches select columns after matching, the same way as list_page and get
+        return Item(self, item.id, select_columns(item.document, fields))
+
+    def _offsets_key(self) -> str:
+        # Offsets are only valid for the same identifier and parsing options they were built with
         if isinstance(self.identifier, tuple):
-            return str(tuple(str(index) if key is INDEX else row[key] for key in self.identifier))
-        raise ValueError("Invalid identifier")
+            identifier = [None if key is INDEX else key for key in self.identifier]
+        else:
+            identifier = None if self.identifier is INDEX else self.identifier
+        return json.dumps([identifier, sorted(self.csv_reader_kwargs.items())], default=str)
+
+    def _row_identifier(self, row: dict, index: int) -> str:
+        return row_identifier(self.identifier, row, index)
+
+
+class _OffsetIndex:
+    """
+    The byte offset of each row of a local CSV file by identifier, along with the size and modification time of
+    the file it was built from. Rows identified by index are kept in a compact array rather than a dict.
+    """
+
+    VERSION = 1
+
+    def __init__(self, size: int, mtime_ns: int, key: str, by_index: bool):
+        self.size = size
+        self.mtime_ns = mtime_ns
+        self.key = key
+        self.offsets: Union[array, dict[str, int]] = array('q') if by_index else {}
+
+    def add(self, id: str, offset: int) -> None:
+        if isinstance(self.offsets, array):
+            self.offsets.append(offset)
+        else:
+            # As with a scan, the first row with a duplicate identifier wins
+            self.offsets.setdefault(id, offset)
+
+    def get(self, id: str) -> Optional[int]:
+        if isinstance(self.offsets, dict):
+            return self.offsets.get(id)
+        if id.isdigit() and int(id) < len(self.offsets):
+            return self.offsets[int(id)]
+        return None
+
+    def is_current(self, stat: os.stat_result, key: str) -> bool:
+        return self.size == stat.st_size and self.mtime_ns == stat.st_mtime_ns and self.key == key
+
+    def save(self, path: str) -> None:
+        offsets = self.offsets.tolist() if isinstance(self.offsets, array) else self.offsets
+        # As for DiskResponseCache, each save gets its own temporary file, so that concurrent saves can't interleave
+        directory, name = os.path.split(os.path.abspath(path))
+        with tempfile.NamedTemporaryFile('w', dir=directory, prefix=name, suffix='.tmp', delete=False) as f:
+            try:
+                json.dump({'version': self.VERSION, 'size': self.size, 'mtime_ns': self.mtime_ns, 'key': self.key,
+                           'offsets': offsets}, f)
+            except BaseException:
+                f.close()
+                os.unlink(f.name)
+                raise
+        os.replace(f.name, path)
+
+    @classmethod
+    def load(cls, path: str) -> Optional['_OffsetIndex']:
+        try:
+            with open(path) as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if data.get('version') != cls.VERSION:
+            return None
+        index = cls(data['size'], data['mtime_ns'], data['key'], isinstance(data['offsets'], list))
+        if isinstance(data['offsets'], list):
+            index.offsets.fromlist(data['offsets'])
+        else:
+            index.offsets = data['offsets']
+        return index
+
+
+async def _without_offsets(batches: AsyncIterator[list[dict]]) -> AsyncGenerator[list[tuple[None, dict]], None]:
+    async with aclosing(batches):
+        async for batch in batches:
+            yield [(None, row) for row in batch]
@@ -0,0 +1,65 @@
+from contextlib import aclosing
+from typing import AsyncGenerator, Optional, Sequence
+
+from asyncrepo.repositories.file.rows import INDEX, row_identifier, scan_for, scan_for_many, skip_rows
+from asyncrepo.repository import Repository, Page, Item
+from asyncrepo.utils.compression import INFER
+from asyncrepo.utils.cursors import decode_cursor, encode_cursor
+from asyncrepo.utils.resource_streamer import ResourceStreamer
+
+
+class JSONLRows(Repository):
+    """
+    Rows of a specified JSON Lines file (filepath or URL), i.e. one JSON value per line
+
+    Rows keep their JSON types, and are identified the same way as CSVRows: by their index, by a key of the rows
+    (which must then be objects), or by a tuple of either. Compressed files and URLs are decompressed as they are
+    read (see ResourceStreamer). Listings resume by skipping as many rows as were listed, which still means reading
+    them.
+    """
+
+    resumes_pages = True
+
+    def __init__(self, filepath_or_url: str, identifier=INDEX, page_size: int = 20, connections: int = 1,
+                 compression: Optional[str] = INFER):
+        self.filepath_or_url = filepath_or_url
+        self.streamer = ResourceStreamer(filepath_or_url, connections=connections, compression=compression)
+        self.page_size = page_size
+        self.identifier = identifier
+
+    async def list_page(self, *args, resume_from: Optional[str] = None, _stream=None, _index=0, **kwargs) -> Page:
+        """
+        List rows for the file
+        """
+        if _stream is None:
+            _stream = self.streamer.stream_jsonl_batches(self.page_size)
+            if resume_from is not None:
+                _index = decode_cursor(self, resume_from)['index']
+                _stream = skip_rows(_stream, _index, self.page_size)
+        rows = []
+        for row in await anext(_stream, []):
+            rows.append(Item(self, row_identifier(self.identifier, row, _index), row))
+            _index += 1
+        next_page_fn = None
+        cursor = None
+        if len(rows) == self.page_size:
+            async def next_page_fn() -> Page:
+                return await self.list_page(*args, _stream=_stream, _index=_index, **kwargs)
+
+            cursor = encode_cursor(self, {'index': _index})
+        return Page(self, rows, next_page_fn, cursor)
+
+    async def get(self, id: str, fields: Optional[Sequence[str]] = None) -> Item:
+        """
+        Get a row by identifier
+        """
+        return await scan_for(self, str(id), fields=fields)
+
+    async def _get_many(self, ids: Sequence[str], concurrency: int, *args, fields: Optional[Sequence[str]] = None,
+                        **kwargs) -> AsyncGenerator[tuple[str, Optional[Item]], None]:
+        """
+        Resolves every identifier in a single scan of the file, stopping as soon as all of them have been found.
+        """
+        async with aclosing(scan_for_many(self, ids, fields=fields)) as results:
+            async for id, item in results:
+                yield id, item
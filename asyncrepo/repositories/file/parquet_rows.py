@@ -0,0 +1,238 @@
+import asyncio
+import io
+from itertools import islice
+from typing import AsyncGenerator, Iterator, Mapping, Optional, Sequence
+
+from asyncrepo.exceptions import ItemNotFound
+from asyncrepo.repositories.file.rows import INDEX, identifier_columns, row_identifier, select_columns
+from asyncrepo.repository import Repository, Page, Item
+from asyncrepo.utils.cursors import decode_cursor, encode_cursor
+from asyncrepo.utils.resource_streamer import ResourceStreamer
+from asyncrepo.utils.row import Header, Row
+
+try:
+    import pyarrow.parquet as pq
+except ImportError:
+    pq = None
+
+
+class ParquetRows(Repository):
+    """
+    Rows of a specified Parquet file (filepath or URL)
+
+    Rows are read a row group at a time, and only the given columns (plus any the identifier is made of) are
+    decoded, so listing a few columns of a wide file only reads those. URLs are read with Range requests, so only
+    the file's metadata and the column chunks which are needed are downloaded. Identifiers work the same way as
+    for CSVRows. Fields are the columns to read, in place of the repository's columns. With compact, listed
+    rows are kept as Rows sharing the file's column names (see CSVRows). Requires the pyarrow
+    package. Listings resume from the row group holding the next row, without reading the ones before it.
+    """
+
+    pushes_down_fields = True
+    resumes_pages = True
+
+    def __init__(self, filepath_or_url: str, identifier=INDEX, page_size: int = 20,
+                 columns: Optional[Sequence[str]] = None, compact: bool = False):
+        if pq is None:
+            raise ImportError('ParquetRows requires the pyarrow package')
+        self.filepath_or_url = filepath_or_url
+        self.streamer = ResourceStreamer(filepath_or_url)
+        self.page_size = page_size
+        self.identifier = identifier
+        self.columns = None if columns is None else list(columns)
+        self.compact = compact
+
+    @property
+    def projection(self) -> Optional[list[str]]:
+        """
+        The columns which are read, or None for all of them.
+        """
+        return self._projection(self.columns)
+
+    def _projection(self, fields: Optional[Sequence[str]]) -> Optional[list[str]]:
+        # The identifier's columns are always read (and returned) as well
+        if fields is None:
+            return None
+        return list(fields) + [key for key in identifier_columns(self.identifier) if key not in fields]
+
+    def _project(self, item: Item, fields: Sequence[str]) -> Item:
+        # Searches select columns after matching, the same way as list_page and get
+        return Item(self, item.id, select_columns(item.document, self._projection(fields)))
+
+    async def list_page(self, *args, fields: Optional[Sequence[str]] = None, resume_from: Optional[str] = None,
+                        _stream=None, _index=0, **kwargs) -> Page:
+        """
+        List rows for the file
+        """
+        if _stream is None:
+            if resume_from is not None:
+                _index = decode_cursor(self, resume_from)['index']
+            _stream = self._stream_pages(self._projection(self.columns if fields is None else fields), _index)
+        rows = []
+        batch, more = await anext(_stream, ([], False))
+        for row in batch:
+            rows.append(Item(self, row_identifier(self.identifier, row, _index), row))
+            _index += 1
+        next_page_fn = None
+        cursor = None
+        if more:
+            async def next_page_fn() -> Page:
+                return await self.list_page(*args, fields=fields, _stream=_stream, _index=_index, **kwargs)
+
+            cursor = encode_cursor(self, {'index': _index})
+        else:
+            await _stream.aclose()
+        return Page(self, rows, next_page_fn, cursor)
+
+    async def get(self, id: str, fields: Optional[Sequence[str]] = None) -> Item:
+        """
+        Get a row by identifier. Only the identifier's columns are read to find the row, and then only the row
+        group holding it.
+        """
+        id = str(id)
+        found = await self._find([id], fields)
+        if id not in found:
+            raise ItemNotFound(id)
+        return found[id]
+
+    async def _get_many(self, ids: Sequence[str], concurrency: int, *args, fields: Optional[Sequence[str]] = None,
+                        **kwargs) -> AsyncGenerator[tuple[str, Optional[Item]], None]:
+        """
+        Resolves every identifier from a single pass over the identifier's columns.
+        """
+        found = await self._find(ids, fields)
+        for id in ids:
+            yield id, found.get(id)
+
+    async def _find(self, ids: Sequence[str], fields: Optional[Sequence[str]]) -> dict[str, Item]:
+        parquet_file = await self._open()
+        try:
+            columns = self._projection(self.columns if fields is None else fields)
+            return await asyncio.to_thread(self._read_rows, parquet_file, ids, columns)
+        finally:
+            parquet_file.close()
+
+    async def _stream_pages(self, columns: Optional[list[str]],
+                            index: int) -> AsyncGenerator[tuple[list[Mapping], bool], None]:
+        """
+        Yields pages worth of rows from the one at index on, each with whether any rows follow it. The file is
+        closed once the rows run out, or when the stream is closed because the listing stopped early.
+        """
+        parquet_file = await self._open()
+        try:
+            rows = _iter_rows(parquet_file, self.page_size, columns, self.compact, index)
+            more = index < parquet_file.metadata.num_rows
+            while more:
+                batch = await asyncio.to_thread(lambda: list(islice(rows, self.page_size)))
+                index += len(batch)
+                more = len(batch) == self.page_size and index < parquet_file.metadata.num_rows
+                yield batch, more
+        finally:
+            parquet_file.close()
+
+    async def _open(self):
+        if await self.streamer.stat() is not None:
+            return await asyncio.to_thread(pq.ParquetFile, self.filepath_or_url, memory_map=True)
+        size = await self.streamer.content_length()
+        source = _RangeFile(self.streamer, size, asyncio.get_running_loop())
+        return await asyncio.to_thread(pq.ParquetFile, source)
+
+    def _read_rows(self, parquet_file, ids: Sequence[str], columns: Optional[Sequence[str]]) -> dict[str, Item]:
+        wanted = set(ids)
+        found = {}
+        start = 0
+        for group in range(parquet_file.metadata.num_row_groups):
+            size = parquet_file.metadata.row_group(group).num_rows
+            positions = self._positions(parquet_file, group, start, size, wanted)
+            if positions:
+                rows = parquet_file.read_row_group(group, columns=columns).to_pylist()
+                for id, position in positions.items():
+                    found[id] = Item(self, id, rows[position])
+                wanted.difference_update(positions)
+            start += size
+            if not wanted:
+                break
+        return found
+
+    def _positions(self, parquet_file, group: int, start: int, size: int, wanted: set[str]) -> dict[str, int]:
+        # Returns the position within the row group of each wanted row it holds
+        if self.identifier is INDEX:
+            return {id: int(id) - start for id in wanted if id.isdigit() and start <= int(id) < start + size}
+        columns = identifier_columns(self.identifier)
+        keys = parquet_file.read_row_group(group, columns=columns).to_pylist() if columns else [{}] * size
+        positions = {}
+        for position, key in enumerate(keys):
+            id = row_identifier(self.identifier, key, start + position)
+            if id in wanted:
+                # As with a scan, the first row with a duplicate identifier wins
+                positions.setdefault(id, position)
+        return positions
+
+
+def _iter_rows(parquet_file, batch_size: int, columns: Optional[list[str]], compact: bool,
+               start: int = 0) -> Iterator[Mapping]:
+    # Row groups before the one holding the start row aren't read at all
+    metadata = parquet_file.metadata
+    first_group = 0
+    while first_group < metadata.num_row_groups and start >= metadata.row_group(first_group).num_rows:
+        start -= metadata.row_group(first_group).num_rows
+        first_group += 1
+    batches = parquet_file.iter_batches(batch_size=batch_size, row_groups=range(first_group, metadata.num_row_groups),
+                                        columns=columns)
+    return islice(_batch_rows(batches, compact), start, None)
+
+
+def _batch_rows(batches: Iterator, compact: bool) -> Iterator[Mapping]:
+    header = None
+    for batch in batches:
+        if not compact:
+            yield from batch.to_pylist()
+            continue
+        if header is None:
+            header = Header(batch.schema.names)
+        # Converting a column at a time is also quicker than a row at a time
+        for values in zip(*[column.to_pylist() for column in batch.columns]):
+            yield Row(header, values)
+
+
+class _RangeFile(io.RawIOBase):
+    """
+    A read-only, seekable file over a resource, for libraries which read files synchronously. Each read is made
+    with ResourceStreamer.read_range on the event loop, so the file must only be read from other threads.
+    """
+
+    def __init__(self, streamer: ResourceStreamer, size: int, loop: asyncio.AbstractEventLoop):
+        super().__init__()
+        self._streamer = streamer
+        self._size = size
+        self._loop = loop
+        self._position = 0
+
+    def readable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return True
+
+    def tell(self) -> int:
+        return self._position
+
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        if whence == io.SEEK_CUR:
+            offset += self._position
+        elif whence == io.SEEK_END:
+            offset += self._size
+        if offset < 0:
+            raise ValueError('Negative seek position', offset)
+        self._position = offset
+        return offset
+
+    def readinto(self, buffer) -> int:
+        end = min(self._position + len(buffer), self._size)
+        if end <= self._position:
+            return 0
+        read = self._streamer.read_range(self._position, end)
+        data = asyncio.run_coroutine_threadsafe(read, self._loop).result()
+        buffer[:len(data)] = data
+        self._position += len(data)
+        return len(data)
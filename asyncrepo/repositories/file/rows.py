@@ -0,0 +1,97 @@
+from contextlib import aclosing
+from typing import Any, AsyncGenerator, AsyncIterator, Mapping, Optional, Sequence, TypeVar
+
+from asyncrepo.exceptions import ItemNotFound
+from asyncrepo.repository import Repository, Item
+
+# Identifies rows by their (zero-based) position in the file
+INDEX = object()
+
+T = TypeVar('T')
+
+
+def row_identifier(identifier, row: Any, index: int) -> str:
+    """
+    Returns the identifier of the row at the given index of a file, where identifier is INDEX, the name of a column
+    (or key), or a tuple of either.
+    """
+    if identifier is INDEX:
+        return str(index)
+    if isinstance(identifier, str):
+        return str(row[identifier])
+    if isinstance(identifier, tuple):
+        return str(tuple(str(index) if key is INDEX else row[key] for key in identifier))
+    raise ValueError("Invalid identifier")
+
+
+def identifier_columns(identifier) -> list[str]:
+    """
+    Returns the names of the columns (or keys) an identifier is made of.
+    """
+    if isinstance(identifier, str):
+        return [identifier]
+    if isinstance(identifier, tuple):
+        return [key for key in identifier if key is not INDEX]
+    return []
+
+
+def select_columns(row: Mapping, fields: Optional[Sequence[str]]) -> Mapping:
+    """
+    Returns the row with only the given columns, or the row itself if fields is None. Column names may contain
+    dots, so unlike Item.project they are taken literally.
+    """
+    if fields is None:
+        return row
+    return {field: row[field] for field in fields if field in row}
+
+
+async def scan_for(repository: Repository, id: str, **kwargs) -> Item:
+    """
+    Gets a row by listing the repository until it is found. Any keyword arguments are passed along to list_pages.
+    """
+    async with aclosing(repository.list_pages(**kwargs)) as pages:
+        async for page in pages:
+            for item in page:
+                if item.id == id:
+                    return item
+    raise ItemNotFound(id)
+
+
+async def scan_for_many(repository: Repository, ids: Sequence[str],
+                        **kwargs) -> AsyncGenerator[tuple[str, Optional[Item]], None]:
+    """
+    Gets rows by listing the repository once, stopping as soon as all of them have been found. Any keyword
+    arguments are passed along to list_pages.
+    """
+    wanted = set(ids)
+    async with aclosing(repository.list_pages(**kwargs)) as pages:
+        async for page in pages:
+            for item in page:
+                if item.id in wanted:
+                    wanted.discard(item.id)
+                    yield item.id, item
+            if not wanted:
+                return
+    for id in ids:
+        if id in wanted:
+            yield id, None
+
+
+async def skip_rows(batches: AsyncIterator[list[T]], count: int, batch_size: int) -> AsyncGenerator[list[T], None]:
+    """
+    Yields the rows of the batches after the first count of them, in lists of batch_size rows (except for the
+    last), for resuming a listing of a file which can't be read from where it left off.
+    """
+    buffer = []
+    async with aclosing(batches):
+        async for batch in batches:
+            if count:
+                skipped = min(count, len(batch))
+                batch = batch[skipped:]
+                count -= skipped
+            buffer.extend(batch)
+            while len(buffer) >= batch_size:
+                yield buffer[:batch_size]
+                del buffer[:batch_size]
+    if buffer:
+        yield buffer
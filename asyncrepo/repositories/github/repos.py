@@ -1,13 +1,16 @@
 import asyncio
-from typing import Optional
+from datetime import datetime
+from typing import AsyncGenerator, Optional, Sequence
 
-from github import UnknownObjectException
-from github.PaginatedList import PaginatedList
-from github.Repository import Repository as GithubRepository
-
-from asyncrepo.exceptions import ItemNotFound
 from asyncrepo.repository import Repository, Page, Item
+from asyncrepo.utils.cursors import decode_cursor, encode_cursor
 from asyncrepo.utils.github_client import GithubClient
+from asyncrepo.utils.timestamps import parse_timestamp
+
+
+# The query parameters of a listing, in the order PyGithub's get_repos took them
+LIST_PARAMS = ('type', 'sort', 'direction')
+AUTHENTICATED_LIST_PARAMS = ('visibility', 'affiliation', 'type', 'sort', 'direction')
 
 
 class Repos(Repository):
@@ -16,57 +19,87 @@ class Repos(Repository):
     the authenticated user's repos will be returned.
     """
 
+    # Cursors hold the URL of the next page from the Link header
+    resumes_pages = True
+
     def __init__(self, login_or_token: str, /, user: Optional[str] = None, org: Optional[str] = None,
                  github_kwargs: Optional[dict] = None):
         """
         Initialize a new Repositories repository for the specified user or organization.
         """
         super().__init__()
-        self._client = GithubClient(login_or_token, **(github_kwargs or {}))
+        self._client = None
+        self._login_or_token = login_or_token
+        self._github_kwargs = github_kwargs or {}
+        self._ensure_client_lock = asyncio.Lock()
 
         if user and org:
             raise ValueError('Cannot specify both user and org')
 
-        self._user_or_org = self._user = self._user_login = self._org = self._org_name = None
-        self._list_kwargs = {}
-        if user:
-            self._user_login = user
-        elif org:
-            self._org_name = org
-            self._list_kwargs['affiliation'] = 'owner'
-
-        self._ensure_user_or_org_lock = asyncio.Lock()
-
-    async def _ensure_user_or_org(self) -> None:
-        async with self._ensure_user_or_org_lock:
-            if self._user_or_org is None:
-                if self._user_login is not None:
-                    self._user_or_org = self._user = await self._client.get_user(self._user_login)
-                elif self._org_name is not None:
-                    self._user_or_org = self._org = await self._client.get_organization(self._org_name)
-                else:
-                    # Default to the authenticated user
-                    self._user_or_org = self._user = await self._client.get_user()
-
-    async def list_page(self, *args, **kwargs) -> Page:
+        self._user_login = user or None
+        self._org_name = org or None
+        self._authenticated_user = False
+        self._ensure_user_login_lock = asyncio.Lock()
+
+    async def _ensure_client(self) -> None:
+        async with self._ensure_client_lock:
+            if self._client is None:
+                self._client = GithubClient(self._login_or_token, **self._github_kwargs)
+
+    async def close(self) -> None:
+        async with self._ensure_client_lock:
+            if self._client is not None:
+                await self._client.close()
+                self._client = None
+
+    async def _ensure_user_login(self) -> None:
+        """
+        Look up the login of the authenticated user if neither a user nor an organization was specified. This is
+        only needed to scope searches; listing and getting never need it.
+        """
+        await self._ensure_client()
+        async with self._ensure_user_login_lock:
+            if self._user_login is None and self._org_name is None:
+                self._user_login = (await self._client.get_user())['login']
+                self._authenticated_user = True
+
+    async def list_page(self, *args, resume_from: Optional[str] = None, **kwargs) -> Page:
         """
         List the repo for the user or organization.
+
+        Any arguments are passed along as query parameters. Positional ones are taken in the order PyGithub's
+        get_repos took them: type, sort and direction, or visibility, affiliation, type, sort and direction for
+        the authenticated user's repos.
         """
-        await self._ensure_user_or_org()
-        paginated_list = self._user_or_org.get_repos(*args, **kwargs, **self._list_kwargs)
-        return await self._page_from_paginated_list(paginated_list)
+        await self._ensure_client()
+        if resume_from is not None:
+            # The next URL already has the query parameters
+            return await self._page_from_url(decode_cursor(self, resume_from)['url'])
+        if self._org_name is not None:
+            path = f"/orgs/{self._org_name}/repos"
+            names = LIST_PARAMS
+        elif self._user_login is not None and not self._authenticated_user:
+            path = f"/users/{self._user_login}/repos"
+            names = LIST_PARAMS
+        else:
+            path = '/user/repos'
+            names = AUTHENTICATED_LIST_PARAMS
+        if len(args) > len(names):
+            raise TypeError(f"list_page takes at most {len(names)} positional arguments here ({len(args)} given)")
+        for name, value in zip(names, args):
+            if name in kwargs:
+                raise TypeError(f"list_page got multiple values for {name}")
+            kwargs[name] = value
+        params = {'per_page': self._client.per_page, **kwargs}
+        return await self._page_from_url(path, params)
 
-    async def get(self, id: str) -> Item:
+    async def get(self, id: str, fields: Optional[Sequence[str]] = None) -> Item:
         """
         Get the repository with the specified identifier. This will return any repository the client has access to,
         regardless of whether it's associated with the user or organization.
         """
-        await self._ensure_user_or_org()
-        try:
-            repo = await self._client.get_repo(id)
-        except UnknownObjectException:
-            raise ItemNotFound(id)
-        return await self._item_from_github_repo(repo)
+        await self._ensure_client()
+        return self._item_from_raw(await self._client.get_repo(id)).project(fields)
 
     async def search_page(self, query: str, *args, **kwargs) -> 'Page':
         """
@@ -74,26 +107,45 @@ class Repos(Repository):
         There is no guarantee that a specially constructed query could not cause this to
         return results for a repo not associated with the user or organization.
         """
-        await self._ensure_user_or_org()
+        await self._ensure_user_login()
         qualifiers = {}
-        if self._user is not None:
-            qualifiers['user'] = self._user.login
-        if self._org is not None:
-            qualifiers['org'] = self._org.name
-        paginated_list = self._client.search_repositories(query, *args, **kwargs, **qualifiers)
-        return await self._page_from_paginated_list(paginated_list)
-
-    async def _page_from_paginated_list(self, paginated_list: PaginatedList, page=0, seen=0) -> Page:
+        if self._org_name is not None:
+            qualifiers['org'] = self._org_name
+        else:
+            qualifiers['user'] = self._user_login
+        data, next_url = await self._client.search_repositories(query, *args, **kwargs, **qualifiers)
+        return self._page_from_payload(data['items'], next_url)
+
+    async def _changes_since(self, since: Optional[datetime], *args,
+                             **kwargs) -> AsyncGenerator[tuple[Item, datetime], None]:
+        """
+        Lists repos by when they were last updated, newest first, until reaching one updated before since.
+        """
+        page = await self.list_page(*args, **{**kwargs, 'sort': 'updated', 'direction': 'desc'})
+        while page is not None:
+            for item in page:
+                updated = parse_timestamp(item.document['updated_at'])
+                if since is not None and updated < since:
+                    return
+                yield item, updated
+            page = await page.next_page()
+
+    async def _page_from_url(self, url: str, params: Optional[dict] = None) -> Page:
+        data, next_url = await self._client.get_page(url, params)
+        if isinstance(data, dict):
+            # Search results are wrapped in an object, while lists are plain arrays
+            data = data['items']
+        return self._page_from_payload(data, next_url)
+
+    def _page_from_payload(self, data: list[dict], next_url: Optional[str]) -> Page:
         next_page = None
-        items = await asyncio.gather(*[self._item_from_github_repo(repo) for repo in await paginated_list.get_page_async(page)])
-        seen += len(items)
-        if seen < await paginated_list.total_count_async():
+        cursor = None
+        if next_url is not None:
             async def next_page() -> 'Page':
-                return await self._page_from_paginated_list(paginated_list, page=page + 1, seen=seen)
-        return Page(self, items, next_page)
+                return await self._page_from_url(next_url)
 
-    async def _item_from_github_repo(self, repo: GithubRepository) -> Item:
-        return Item(self, repo.full_name, await repo.raw_data_async())
+            cursor = encode_cursor(self, {'url': next_url})
+        return Page(self, [self._item_from_raw(raw) for raw in data], next_page, cursor)
 
     def _item_from_raw(self, raw: dict) -> Item:
         return Item(self, raw['full_name'], raw)
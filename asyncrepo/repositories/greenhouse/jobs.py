@@ -1,6 +1,8 @@
+from typing import Optional, Sequence
+
 from asyncrepo.exceptions import ItemNotFound
 from asyncrepo.repository import Repository, Page, Item
-from asyncrepo.utils.http_client import HttpClient
+from asyncrepo.utils.http_client import connection_pool
 
 _LIST_ENDPOINT = '/v1/boards/{board_token}/jobs'
 _ITEM_ENDPOINT = '/v1/boards/{board_token}/jobs/{job_id}'
@@ -31,13 +33,13 @@ class Jobs(Repository):
         :param content: Unless disabled, include the full post description, department, and office of each job post.
         """
         params = {'content': str(content).lower()} if content else {}
-        async with HttpClient(self.base_url) as client:
-            async with client.get(self._list_endpoint(), params=params) as r:
-                r.raise_for_status()
-                data = await r.json()
-                return self._page_from_payload(data)
+        client = connection_pool.session(self.base_url)
+        async with client.get(self._list_endpoint(), params=params) as r:
+            r.raise_for_status()
+            data = await r.json()
+            return self._page_from_payload(data)
 
-    async def get(self, job_id: str, questions: bool = False) -> 'Item':
+    async def get(self, job_id: str, questions: bool = False, fields: Optional[Sequence[str]] = None) -> 'Item':
         """
         Get a job by ID.
 
@@ -45,15 +47,16 @@ class Jobs(Repository):
 
         :param job_id: The job ID.
         :param questions: If enabled, include additional questions fields in the response.
+        :param fields: If given, only these fields of the job are returned (see Item.project).
         """
         params = {'questions': str(questions).lower()} if questions else {}
-        async with HttpClient(self.base_url) as client:
-            async with client.get(self._item_endpoint(job_id), params=params) as r:
-                if r.status == 404:
-                    raise ItemNotFound(job_id)
-                r.raise_for_status()
-                data = await r.json()
-                return self._item_from_payload(data)
+        client = connection_pool.session(self.base_url)
+        async with client.get(self._item_endpoint(job_id), params=params) as r:
+            if r.status == 404:
+                raise ItemNotFound(job_id)
+            r.raise_for_status()
+            data = await r.json()
+            return self._item_from_payload(data).project(fields)
 
     def _page_from_payload(self, data: dict) -> 'Page':
         return Page(self, [self._item_from_payload(item) for item in data['jobs']], None)
@@ -1,10 +1,24 @@
 import asyncio
+from contextlib import aclosing
+from datetime import datetime
+from typing import AsyncGenerator, Optional, Sequence
 
 from asyncrepo.repository import Repository, Page, Item
+from asyncrepo.utils.concurrency import bounded_map
+from asyncrepo.utils.cursors import decode_cursor, encode_cursor
 from asyncrepo.utils.jira_client import JiraClient
+from asyncrepo.utils.timestamps import minutes_since, parse_timestamp
+
+# The most issues Jira returns for a single search request
+GET_MANY_CHUNK_SIZE = 100
 
 
 class Issues(Repository):
+    # Fields are Jira field names (e.g. summary, status), which are returned under the issue's "fields"
+    pushes_down_fields = True
+    # Cursors hold the startAt of the next page
+    resumes_pages = True
+
     def __init__(self, base_url: str, username: str, password: str):
         self.jira_client = None
         self._base_url = base_url
@@ -17,12 +31,47 @@ class Issues(Repository):
             if self.jira_client is None:
                 self.jira_client = JiraClient(self._base_url, self._username, self._password)
 
-    async def get(self, id: str) -> Item:
+    async def close(self) -> None:
+        async with self._ensure_jira_client_lock:
+            if self.jira_client is not None:
+                await self.jira_client.close()
+                self.jira_client = None
+
+    async def get(self, id: str, fields: Optional[Sequence[str]] = None) -> Item:
         await self._ensure_jira_client()
-        data = await self.jira_client.get_issue(id)
+        data = await self.jira_client.get_issue(id, fields)
         return Item(self, data['id'], data)
 
-    async def _search_jql(self, jql: str, current: int = 0, *args, **kwargs) -> Page:
+    async def _get_many(self, ids: Sequence[str], concurrency: int, *args, fields: Optional[Sequence[str]] = None,
+                        **kwargs) -> AsyncGenerator[tuple[str, Optional[Item]], None]:
+        """
+        Looks issues up by id or key with a single "id in (...)" search per chunk of ids, with up to concurrency
+        searches in flight at once.
+        """
+        await self._ensure_jira_client()
+
+        async def fetch_chunk(chunk: Sequence[str]) -> list[tuple[str, Optional[Item]]]:
+            ids_or_keys = ', '.join('"{}"'.format(id.replace('"', '\\"')) for id in chunk)
+            page = await self._search_jql(f'id in ({ids_or_keys})', max_results=len(chunk), fields=fields)
+            # Keys are matched case-insensitively, as Jira does
+            wanted = {id.upper(): id for id in chunk}
+            results = []
+            while page is not None:
+                for item in page:
+                    for id_or_key in (item.document['id'], item.document.get('key', '')):
+                        if (id := wanted.pop(id_or_key.upper(), None)) is not None:
+                            results.append((id, item))
+                page = await page.next_page()
+            results.extend((id, None) for id in wanted.values())
+            return results
+
+        chunks = [ids[i:i + GET_MANY_CHUNK_SIZE] for i in range(0, len(ids), GET_MANY_CHUNK_SIZE)]
+        async with aclosing(bounded_map(fetch_chunk, chunks, concurrency, ordered=False)) as results:
+            async for chunk_results in results:
+                for result in chunk_results:
+                    yield result
+
+    async def _search_jql(self, jql: str, *args, current: int = 0, **kwargs) -> Page:
         await self._ensure_jira_client()
         data = await self.jira_client.search(jql, start_at=current, *args, **kwargs)
         items = [Item(self, item['id'], item) for item in data['issues']]
@@ -30,12 +79,125 @@ class Issues(Repository):
         current += len(items)
         if data['total'] > current:
             async def next_page_fn() -> Page:
-                return await self._search_jql(jql, current, *args, **kwargs)
-        return Page(self, items, next_page_fn)
+                return await self._search_jql(jql, *args, current=current, **kwargs)
+        return Page(self, items, next_page_fn, self._cursor(current, data['total']))
+
+    async def _search_jql_pages_concurrently(self, jql: str, concurrency: int, ordered: bool, *args,
+                                             current: int = 0, **kwargs) -> AsyncGenerator[Page, None]:
+        """
+        Once the first page reveals the total, requests every remaining startAt window at once, with up to
+        concurrency requests in flight. The pages are yielded in order unless ordered is False, in which case they
+        are yielded as soon as they arrive. The pages are not linked, so their next_page() is always None, and only
+        ordered pages have cursors, since resuming from an unordered one would skip pages which hadn't arrived yet.
+
+        As with serial pagination, issues created or deleted during the crawl shift the windows.
+        """
+        await self._ensure_jira_client()
+        data = await self.jira_client.search(jql, start_at=current, *args, **kwargs)
+        yield self._window_page(data, current, ordered)
+
+        # Jira may return fewer results per page than were asked for, so step by what it actually used
+        step = data.get('maxResults') or len(data['issues'])
+        if not step:
+            return
 
-    async def list_page(self, *args, **kwargs) -> Page:
-        return await self._search_jql('order by created DESC', *args, **kwargs)
+        async def fetch_window(start_at: int) -> Page:
+            window = await self.jira_client.search(jql, start_at=start_at, *args, **kwargs)
+            return self._window_page(window, start_at, ordered)
+
+        windows = range(current + len(data['issues']), data['total'], step)
+        async with aclosing(bounded_map(fetch_window, windows, concurrency, ordered=ordered)) as pages:
+            async for page in pages:
+                yield page
+
+    def _window_page(self, data: dict, start_at: int, ordered: bool) -> Page:
+        items = [Item(self, item['id'], item) for item in data['issues']]
+        return Page(self, items, cursor=self._cursor(start_at + len(items), data['total']) if ordered else None)
+
+    def _cursor(self, start_at: int, total: int) -> Optional[str]:
+        return encode_cursor(self, {'start_at': start_at}) if start_at < total else None
+
+    async def list_page(self, *args, resume_from: Optional[str] = None, **kwargs) -> Page:
+        if resume_from is not None:
+            kwargs['current'] = decode_cursor(self, resume_from)['start_at']
+        return await self._search_jql(self._list_jql(), *args, **kwargs)
+
+    async def list_pages(self, *args, concurrency: Optional[int] = None, ordered: bool = True,
+                         prefetch: int = 0, resume_from: Optional[str] = None, **kwargs) -> AsyncGenerator[Page, None]:
+        """
+        List pages of issues.
+
+        :param concurrency: If set, fetch all pages after the first concurrently, with at most this many requests
+            in flight at once.
+        :param ordered: When fetching concurrently, whether pages must be yielded in order. If disabled, pages
+            are yielded as soon as they arrive.
+        :param prefetch: The number of pages to fetch ahead when not fetching concurrently. Concurrent fetches
+            already run ahead of the consumer, so it can't be combined with concurrency.
+        :param resume_from: A page's cursor, to carry on from the page after it (see Repository.list_pages), whether
+            fetching concurrently or not.
+        """
+        _check_prefetch(concurrency, prefetch)
+        if concurrency is None:
+            pages = super().list_pages(*args, prefetch=prefetch, resume_from=resume_from, **kwargs)
+        else:
+            if resume_from is not None:
+                kwargs['current'] = decode_cursor(self, resume_from)['start_at']
+            pages = self._search_jql_pages_concurrently(self._list_jql(), concurrency, ordered, *args, **kwargs)
+        async with aclosing(pages):
+            async for page in pages:
+                yield page
 
     async def search_page(self, query: str, *args, **kwargs) -> Page:
+        return await self._search_jql(self._search_jql_query(query), *args, **kwargs)
+
+    async def search_pages(self, query: str, *args, concurrency: Optional[int] = None, ordered: bool = True,
+                           prefetch: int = 0, **kwargs) -> AsyncGenerator[Page, None]:
+        """
+        Search for pages of issues. Accepts the same concurrency options as list_pages.
+        """
+        _check_prefetch(concurrency, prefetch)
+        if concurrency is None:
+            pages = super().search_pages(query, *args, prefetch=prefetch, **kwargs)
+        else:
+            pages = self._search_jql_pages_concurrently(self._search_jql_query(query), concurrency, ordered,
+                                                        *args, **kwargs)
+        async with aclosing(pages):
+            async for page in pages:
+                yield page
+
+    async def _changes_since(self, since: Optional[datetime], *args, fields: Optional[Sequence[str]] = None,
+                             **kwargs) -> AsyncGenerator[tuple[Item, datetime], None]:
+        """
+        Searches for issues by when they were updated, newest first, until reaching one updated before since. An
+        issue updated during the search moves to the front, shifting the ones already seen back a place rather than
+        skipping any, and is picked up by the next call since it changed after the newest one seen.
+        """
+        jql = 'order by updated DESC'
+        if since is not None:
+            # JQL's absolute dates are in the user's time zone and to the minute, so search a relative window
+            # instead and then compare the exact times
+            jql = f'updated >= -{minutes_since(since)}m {jql}'
+        if fields is not None and 'updated' not in fields:
+            fields = [*fields, 'updated']
+        page = await self._search_jql(jql, *args, fields=fields, **kwargs)
+        while page is not None:
+            for item in page:
+                updated = parse_timestamp(item.document['fields']['updated'])
+                if since is not None and updated < since:
+                    return
+                yield item, updated
+            page = await page.next_page()
+
+    @staticmethod
+    def _list_jql() -> str:
+        return 'order by created DESC'
+
+    @staticmethod
+    def _search_jql_query(query: str) -> str:
         query = query.replace('"', '\\"')
-        return await self._search_jql(f'text ~ "{query}" order by created DESC', *args, **kwargs)
+        return f'text ~ "{query}" order by created DESC'
+
+
+def _check_prefetch(concurrency: Optional[int], prefetch: int) -> None:
+    if concurrency is not None and prefetch > 0:
+        raise ValueError("prefetch can't be combined with concurrency")
@@ -1,7 +1,16 @@
+import asyncio
 from abc import ABC, abstractmethod
-from typing import AsyncGenerator, Optional, Callable, Awaitable, Iterator, TypeVar
+from contextlib import aclosing
+from datetime import datetime
+from typing import Any, AsyncGenerator, Optional, Callable, Awaitable, Iterable, Iterator, Mapping, Sequence, TypeVar
 
-from asyncrepo.utils.text import matches
+from asyncrepo.exceptions import ItemNotFound, OperationNotSupported
+from asyncrepo.utils.concurrency import bounded_map
+from asyncrepo.utils.projection import MISSING, lookup, project
+from asyncrepo.utils.text import normalized
+from asyncrepo.utils.timestamps import format_timestamp, parse_timestamp
+
+DEFAULT_GET_MANY_CONCURRENCY = 10
 
 
 class Repository(ABC):
@@ -9,31 +18,75 @@ class Repository(ABC):
     A repository can search, list, and retrieve items from some source.
     """
 
+    # Whether list_page, search_page and get take a fields argument and push it down to the source, so that only
+    # those fields are fetched. For other repositories, list_pages and search_pages project the items themselves.
+    pushes_down_fields = False
+
+    # Whether list_page takes a resume_from cursor (see Page.cursor), so that list_pages can carry on from it
+    resumes_pages = False
+
     async def __aiter__(self) -> AsyncGenerator['Item', None]:
         async for item in self.list():
             yield item
 
+    async def __aenter__(self: 'RepositoryImplementation') -> 'RepositoryImplementation':
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb) -> None:
+        await self.close()
+
+    async def close(self) -> None:
+        """
+        Release any resources held by the repository.
+
+        Connections themselves belong to the shared connection pool and stay open for other repositories;
+        use asyncrepo.utils.http_client.connection_pool.close() to shut those down.
+        """
+
     async def list(self, *args, **kwargs) -> AsyncGenerator['Item', None]:
         async for page in self.list_pages(*args, **kwargs):
             for item in page:
                 yield item
 
-    async def list_pages(self, *args, **kwargs) -> AsyncGenerator['Page', None]:
-        page = await self.list_page(*args, **kwargs)
-        while page:
-            yield page
-            page = await page.next_page()
+    async def list_pages(self, *args, prefetch: int = 0, fields: Optional[Sequence[str]] = None,
+                         resume_from: Optional[str] = None, **kwargs) -> AsyncGenerator['Page', None]:
+        """
+        List pages of items in the repository.
+
+        :param prefetch: The number of pages to fetch ahead of the consumer, so that requests for the next pages
+            overlap with the processing of the current one. Pages are fetched sequentially either way.
+        :param fields: If given, only these fields of each item's document are returned (see Item.project). What
+            a field is depends on the repository when it pushes them down to its source.
+        :param resume_from: A page's cursor, to carry on from the page after it (e.g. after a restart) rather than
+            from the start. The other arguments must be the same as for the listing it came from.
+        :raises OperationNotSupported: If resuming from a cursor and the repository can't.
+        """
+        if resume_from is not None:
+            if not self.resumes_pages:
+                raise OperationNotSupported(f"{type(self).__name__} can't resume listing from a cursor")
+            kwargs['resume_from'] = resume_from
+        page = await self._with_fields(self.list_page, fields, *args, **kwargs)
+        async with aclosing(_follow_pages(page, prefetch, lambda p: bool(p))) as pages:
+            async for page in pages:
+                yield page
 
     async def search(self, query: str, *args, **kwargs) -> AsyncGenerator['Item', None]:
         async for page in self.search_pages(query, *args, **kwargs):
             for item in page:
                 yield item
 
-    async def search_pages(self, query: str, *args, **kwargs) -> AsyncGenerator['Page', None]:
-        page = await self.search_page(query, *args, **kwargs)
-        while page is not None:
-            yield page
-            page = await page.next_page()
+    async def search_pages(self, query: str, *args, prefetch: int = 0, fields: Optional[Sequence[str]] = None,
+                           **kwargs) -> AsyncGenerator['Page', None]:
+        """
+        Search for pages of items in the repository.
+
+        :param prefetch: The number of pages to fetch ahead of the consumer, as with list_pages.
+        :param fields: The fields of each item's document to return, as with list_pages.
+        """
+        page = await self._with_fields(self.search_page, fields, query, *args, **kwargs)
+        async with aclosing(_follow_pages(page, prefetch, lambda p: p is not None)) as pages:
+            async for page in pages:
+                yield page
 
     async def search_page(self, query: str, *args, **kwargs) -> 'Page':
         """
@@ -52,20 +105,182 @@ class Repository(ABC):
     async def get(self, id: str) -> 'Item':
         raise NotImplementedError()
 
-    async def _list_search(self, query: str, *args, **kwargs) -> 'Page':
+    def get_many(self, ids: Iterable[str], *args, concurrency: int = DEFAULT_GET_MANY_CONCURRENCY,
+                 **kwargs) -> 'GetManyResult':
+        """
+        Get every item with one of the specified identifiers.
+
+        Items are yielded as they are resolved, so not necessarily in the order of ids. Identifiers which weren't
+        found are collected in the result's missing list instead. By default this makes up to concurrency calls to
+        get at a time, but repositories which can fetch many items in one request override it to do so.
+        """
+        ids = list(dict.fromkeys(str(id) for id in ids))
+        return GetManyResult(self._get_many(ids, concurrency, *args, **kwargs))
+
+    async def _get_many(self, ids: Sequence[str], concurrency: int, *args,
+                        **kwargs) -> AsyncGenerator[tuple[str, Optional['Item']], None]:
+        """
+        Yields (id, item) for each requested identifier as it is resolved, with None for the item if not found.
+        """
+        async def get_or_none(id: str) -> tuple[str, Optional['Item']]:
+            try:
+                return id, await self.get(id, *args, **kwargs)
+            except ItemNotFound:
+                return id, None
+
+        async with aclosing(bounded_map(get_or_none, ids, concurrency, ordered=False)) as results:
+            async for result in results:
+                yield result
+
+    def changes_since(self, cursor: Optional[str] = None, *args, **kwargs) -> 'Changes':
+        """
+        Get every item created or changed since the cursor from an earlier call, or every item if it's None. Once
+        iteration is over, the result's cursor is the one to pass next time. Items changed right at the cursor may
+        be returned again, and deleted items aren't reported.
+
+        :raises OperationNotSupported: If the repository can't tell which items changed.
+        """
+        since = None if cursor is None else parse_timestamp(cursor)
+        return Changes(self._changes_since(since, *args, **kwargs), cursor)
+
+    def _changes_since(self, since: Optional[datetime], *args,
+                       **kwargs) -> AsyncGenerator[tuple['Item', datetime], None]:
+        """
+        Yields (item, changed_at) for each item changed at or after since (or every item if it's None), where
+        changed_at is when the source says it last changed.
+        """
+        raise OperationNotSupported(f"{type(self).__name__} can't tell which items changed")
+
+    async def _list_search(self, query: str, *args, fields: Optional[Sequence[str]] = None, **kwargs) -> 'Page':
+        # Items are matched on their whole document, so any projection comes after
         page = await self.list_page(*args, **kwargs)
-        return await page._list_search(query)
+        page = await page._list_search(query)
+        return page if fields is None else page._project(fields)
+
+    def _project(self, item: 'Item', fields: Sequence[str]) -> 'Item':
+        """
+        Returns the item with only the given fields of its document, for listings and searches which select them
+        after the fact. Repositories whose fields aren't dotted paths (see Item.project) override this to select them
+        the way their own list_page and get do.
+        """
+        return item.project(fields)
+
+    async def _with_fields(self, page_fn: Callable[..., Awaitable['Page']], fields: Optional[Sequence[str]],
+                           *args, **kwargs) -> 'Page':
+        if fields is None:
+            return await page_fn(*args, **kwargs)
+        if self.pushes_down_fields:
+            return await page_fn(*args, fields=fields, **kwargs)
+        page = await page_fn(*args, **kwargs)
+        return page._project(fields)
 
 
 RepositoryImplementation = TypeVar('RepositoryImplementation', bound=Repository)
 
 
+async def _follow_pages(page: Optional['Page'], prefetch: int,
+                        has_page: Callable[[Optional['Page']], bool]) -> AsyncGenerator['Page', None]:
+    """
+    Yields the page and every page after it for as long as has_page holds.
+
+    With a positive prefetch, the following pages are fetched by a background task into a queue holding up to
+    prefetch pages. The task is cancelled as soon as the consumer stops iterating.
+    """
+    if prefetch <= 0:
+        while has_page(page):
+            yield page
+            page = await page.next_page()
+        return
+
+    queue = asyncio.Queue(maxsize=prefetch)
+    done = object()
+    stopping = False
+
+    async def fetch_ahead(page: Optional['Page']) -> None:
+        try:
+            while has_page(page):
+                await queue.put(page)
+                page = await page.next_page()
+        except BaseException as e:
+            # Anything but our own cancellation is forwarded, CancelledError included, or the consumer would wait
+            # on the queue forever
+            if not stopping:
+                await queue.put(e)
+        else:
+            await queue.put(done)
+
+    task = asyncio.create_task(fetch_ahead(page))
+    try:
+        while (page := await queue.get()) is not done:
+            if isinstance(page, BaseException):
+                raise page
+            yield page
+    finally:
+        stopping = True
+        task.cancel()
+        try:
+            await task
+        except asyncio.CancelledError:
+            pass
+
+
+class GetManyResult:
+    """
+    The result of Repository.get_many: an async iterator over the items found, yielding each as soon as it is
+    resolved. Once iteration is over, missing lists the identifiers which weren't found.
+    """
+
+    def __init__(self, results: AsyncGenerator[tuple[str, Optional['Item']], None]):
+        self._results = results
+        self.missing: list[str] = []
+
+    async def __aiter__(self) -> AsyncGenerator['Item', None]:
+        async with aclosing(self._results) as results:
+            async for id, item in results:
+                if item is None:
+                    self.missing.append(id)
+                else:
+                    yield item
+
+
+class Changes:
+    """
+    The result of Repository.changes_since: an async iterator over the changed items. Once iteration is over,
+    cursor is when the latest of them changed, according to the source, or the cursor that was passed in if
+    nothing changed. Items may come in any order, so the cursor isn't moved if iteration stops early.
+    """
+
+    def __init__(self, results: AsyncGenerator[tuple['Item', datetime], None], cursor: Optional[str]):
+        self._results = results
+        self.cursor = cursor
+
+    async def __aiter__(self) -> AsyncGenerator['Item', None]:
+        latest = None if self.cursor is None else parse_timestamp(self.cursor)
+        async with aclosing(self._results) as results:
+            async for item, changed_at in results:
+                if latest is None or changed_at > latest:
+                    latest = changed_at
+                yield item
+        if latest is not None:
+            self.cursor = format_timestamp(latest)
+
+
 class Page:
+    """
+    A page of items. If there are more pages and the repository can resume from it, cursor is an opaque string to
+    pass to list_pages as resume_from to carry on from the page after this one, which can be stored and used from
+    another process. Otherwise it's None.
+    """
+
+    # Slots rather than a __dict__ per instance, which adds up for listings of millions of items
+    __slots__ = ('repository', 'items', '_next_page_fn', 'cursor')
+
     def __init__(self, repository: RepositoryImplementation, items: list['Item'],
-                 next_page_fn: Optional[Callable[[], Awaitable['Page']]] = None):
+                 next_page_fn: Optional[Callable[[], Awaitable['Page']]] = None, cursor: Optional[str] = None):
         self.repository = repository
         self.items = items
         self._next_page_fn = next_page_fn
+        self.cursor = cursor
 
     def __iter__(self) -> Iterator['Item']:
         return iter(self.items)
@@ -81,24 +296,135 @@ class Page:
             return None
         return await self._next_page_fn()
 
+    async def load(self) -> 'Page':
+        """
+        Load the rest of every lightweight item on the page (see Item.load), in one request per batch they were
+        fetched in rather than one per item.
+        """
+        loaders = {id(item._loader): item._loader for item in self.items if item._loader is not None}
+        await asyncio.gather(*[loader.load() for loader in loaders.values()])
+        return self
+
     async def _list_search(self, query: str) -> 'Page':
-        self.items = [item for item in self.items if item.matches(query)]
+        return self._filter(normalized(query))
+
+    def _filter(self, normalized_query: str) -> 'Page':
+        self.items = [item for item in self.items if normalized_query in item.search_text]
         if self._next_page_fn is not None:
             old_next_page_fn = self._next_page_fn
 
             async def _next_page_fn() -> 'Page':
                 page = await old_next_page_fn()
-                return await page._list_search(query)
+                return page._filter(normalized_query)
+
+            self._next_page_fn = _next_page_fn
+        return self
+
+    def _project(self, fields: Sequence[str]) -> 'Page':
+        self.items = [self.repository._project(item, fields) for item in self.items]
+        if self._next_page_fn is not None:
+            old_next_page_fn = self._next_page_fn
+
+            async def _next_page_fn() -> 'Page':
+                page = await old_next_page_fn()
+                return page._project(fields)
 
             self._next_page_fn = _next_page_fn
         return self
 
 
 class Item:
-    def __init__(self, repository: RepositoryImplementation, id: str, document: dict):
+    __slots__ = ('repository', 'id', 'document', '_search_text', '_loader')
+
+    def __init__(self, repository: RepositoryImplementation, id: str, document: Mapping):
         self.repository = repository
         self.id = id
         self.document = document
+        self._search_text = None
+        self._loader: Optional[BatchLoader] = None
+
+    @property
+    def is_loaded(self) -> bool:
+        """
+        Whether the item's document is complete, rather than a lightweight one still to be loaded (see load).
+        """
+        return self._loader is None
+
+    async def load(self) -> 'Item':
+        """
+        Load the rest of a lightweight item's document, such as a Confluence page's body. Every other item fetched
+        in the same batch (e.g. the rest of its page) is loaded with it, in the same request. Returns the item.
+        """
+        if self._loader is not None:
+            await self._loader.load()
+        return self
+
+    async def field(self, path: str) -> Any:
+        """
+        Returns the value at a key or dotted path of keys into the document, loading the rest of the document
+        first if the item is lightweight and doesn't have it yet.
+
+        :raises KeyError: If the document doesn't have the field.
+        """
+        value = lookup(self.document, path)
+        if value is MISSING and self._loader is not None:
+            await self.load()
+            value = lookup(self.document, path)
+        if value is MISSING:
+            raise KeyError(path)
+        return value
+
+    @property
+    def search_text(self) -> str:
+        """
+        The document's text, normalized for naive search. It's computed the first time it's needed and then kept,
+        so it won't reflect later changes to the document.
+        """
+        if self._search_text is None:
+            self._search_text = normalized(str(self.document))
+        return self._search_text
 
     def matches(self, query: str) -> bool:
-        return matches(query, self.document)
+        return normalized(query) in self.search_text
+
+    def project(self, fields: Optional[Sequence[str]]) -> 'Item':
+        """
+        Returns the item with only the given fields of its document, where a field is a key or a dotted path of
+        keys into nested dictionaries. Returns the item itself if fields is None.
+        """
+        if fields is None:
+            return self
+        return Item(self.repository, self.id, project(self.document, fields))
+
+
+class BatchLoader:
+    """
+    Loads the rest of the documents of a batch of lightweight items, such as a page of search results, with a
+    single call to load_fn the first time any of them is loaded. load_fn returns the rest of each item's document
+    by identifier, which is merged into it.
+    """
+
+    def __init__(self, items: Sequence[Item], load_fn: Callable[[Sequence[Item]], Awaitable[dict[str, dict]]]):
+        self.items = items
+        self._load_fn = load_fn
+        self._task: Optional[asyncio.Future] = None
+        for item in items:
+            item._loader = self
+
+    async def load(self) -> None:
+        if self._task is None:
+            self._task = asyncio.ensure_future(self._load())
+        # Shielded so that one caller giving up doesn't cancel the load for every other item in the batch
+        await asyncio.shield(self._task)
+
+    async def _load(self) -> None:
+        try:
+            documents = await self._load_fn(self.items)
+        except BaseException:
+            # Let the next load try again
+            self._task = None
+            raise
+        for item in self.items:
+            item.document.update(documents.get(item.id, {}))
+            item._search_text = None
+            item._loader = None
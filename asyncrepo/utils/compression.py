@@ -0,0 +1,105 @@
+import bz2
+import lzma
+import zlib
+from pathlib import PurePosixPath
+from typing import Optional
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+# Recognize the compression from the data itself
+INFER = 'infer'
+
+# The compressions which can be decompressed, by file extension
+EXTENSIONS = {
+    '.gz': 'gzip',
+    '.gzip': 'gzip',
+    '.bz2': 'bz2',
+    '.xz': 'xz',
+    '.lzma': 'xz',
+    '.zst': 'zstd',
+    '.zstd': 'zstd',
+}
+
+# The first bytes of each compressed format. bzip2 only has a three byte magic number, which plain text could start
+# with, so its block (or end of stream) magic number is checked as well.
+_MAGIC = [
+    (b'\x1f\x8b', 'gzip'),
+    (b'\xfd7zXZ\x00', 'xz'),
+    (b'(\xb5/\xfd', 'zstd'),
+]
+_BZ2_MAGIC = b'BZh'
+_BZ2_BLOCK_MAGIC = (b'1AY&SY', b'\x17rE8P\x90')
+
+# The number of bytes needed to recognize any format by its magic number
+MAGIC_SIZE = 10
+
+
+def compression_from_path(path: str) -> Optional[str]:
+    """
+    Returns the compression of a file or URL path from its extension, or None if it has no compressed extension.
+    """
+    return EXTENSIONS.get(PurePosixPath(path).suffix.lower())
+
+
+def compression_from_magic(head: bytes) -> Optional[str]:
+    """
+    Returns the compression of data from its first MAGIC_SIZE bytes, or None if they aren't a compressed format's.
+    """
+    for magic, compression in _MAGIC:
+        if head.startswith(magic):
+            return compression
+    if head.startswith(_BZ2_MAGIC) and head[3:4] in b'123456789' and head[4:10] in _BZ2_BLOCK_MAGIC:
+        return 'bz2'
+    return None
+
+
+class Decompressor:
+    """
+    Decompresses data a block at a time. Data may hold several compressed streams one after the other, as written
+    by e.g. pigz, bgzip or appending to a compressed file, which are decompressed as one.
+    """
+
+    def __init__(self, compression: str):
+        if compression not in EXTENSIONS.values():
+            raise ValueError('Unsupported compression', compression)
+        if compression == 'zstd' and zstandard is None:
+            raise ImportError('Decompressing zstd requires the zstandard package')
+        self.compression = compression
+        self._decompressor = self._new_decompressor()
+        self._started = False
+
+    def decompress(self, data: bytes) -> bytes:
+        chunks = []
+        while True:
+            if not self._started:
+                # Compressed files are sometimes padded with zeros after the last stream
+                data = data.lstrip(b'\x00')
+            if not data:
+                break
+            self._started = True
+            chunks.append(self._decompressor.decompress(data))
+            if not self._decompressor.eof:
+                break
+            data = self._decompressor.unused_data
+            self._decompressor = self._new_decompressor()
+            self._started = False
+        return b''.join(chunks)
+
+    def finish(self) -> None:
+        """
+        Checks that the compressed data wasn't cut short, once all of it has been passed to decompress.
+        """
+        if self._started:
+            raise EOFError(f'Compressed {self.compression} data ended before the end of the stream')
+
+    def _new_decompressor(self):
+        if self.compression == 'gzip':
+            return zlib.decompressobj(16 + zlib.MAX_WBITS)
+        if self.compression == 'bz2':
+            return bz2.BZ2Decompressor()
+        if self.compression == 'xz':
+            return lzma.LZMADecompressor()
+        return zstandard.ZstdDecompressor().decompressobj()
@@ -0,0 +1,97 @@
+import asyncio
+from collections import deque
+from typing import AsyncGenerator, AsyncIterator, Awaitable, Callable, Iterable, TypeVar
+
+T = TypeVar('T')
+R = TypeVar('R')
+
+
+async def bounded_map(fn: Callable[[T], Awaitable[R]], args: Iterable[T], limit: int,
+                      ordered: bool = True) -> AsyncGenerator[R, None]:
+    """
+    Yields the result of awaiting fn(arg) for each arg, with up to limit calls running at a time.
+
+    Results are yielded in the order of args, or as soon as each call completes if ordered is False. In ordered
+    mode, completed results wait behind the oldest running call, so at most limit results are ever held.
+    Calls that are still running when the consumer stops iterating are cancelled.
+    """
+    if limit < 1:
+        raise ValueError("limit must be at least 1")
+    args = iter(args)
+    pending = deque() if ordered else set()
+
+    def launch() -> bool:
+        for arg in args:
+            task = asyncio.ensure_future(fn(arg))
+            if ordered:
+                pending.append(task)
+            else:
+                pending.add(task)
+            return True
+        return False
+
+    try:
+        while len(pending) < limit and launch():
+            pass
+        while pending:
+            if ordered:
+                result = await pending[0]
+                pending.popleft()
+                launch()
+                yield result
+            else:
+                done, _ = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    pending.discard(task)
+                    launch()
+                for task in done:
+                    yield task.result()
+    finally:
+        for task in pending:
+            task.cancel()
+        if pending:
+            await asyncio.gather(*pending, return_exceptions=True)
+
+
+async def merge(iterators: Iterable[AsyncIterator[T]], buffer: int = 1) -> AsyncGenerator[T, None]:
+    """
+    Yields the values of every iterator as soon as any of them produces one, consuming them all concurrently.
+
+    Up to buffer values are held while the consumer is busy, after which the iterators wait for it. An exception
+    from any iterator is raised once the values produced before it have been yielded. All iterators are cancelled
+    and closed when the consumer stops iterating.
+    """
+    if buffer < 1:
+        raise ValueError("buffer must be at least 1")
+    queue = asyncio.Queue(maxsize=buffer)
+    done = object()
+
+    async def pump(iterator: AsyncIterator[T]) -> None:
+        try:
+            async for value in iterator:
+                await queue.put((value, None))
+            await queue.put((done, None))
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            await queue.put((None, e))
+        finally:
+            if hasattr(iterator, 'aclose'):
+                await iterator.aclose()
+
+    tasks = [asyncio.create_task(pump(iterator)) for iterator in iterators]
+    remaining = len(tasks)
+    try:
+        while remaining:
+            value, error = await queue.get()
+            if error is not None:
+                raise error
+            if value is done:
+                remaining -= 1
+                continue
+            yield value
+    finally:
+        for task in tasks:
+            task.cancel()
+        if tasks:
+            await asyncio.gather(*tasks, return_exceptions=True)
@@ -0,0 +1,31 @@
+import base64
+import binascii
+import json
+from typing import Any
+
+from asyncrepo.exceptions import InvalidCursor
+
+
+def encode_cursor(repository: Any, state: dict) -> str:
+    """
+    Returns an opaque cursor for a position in a listing of a repository, holding a JSON serializable state. Cursors
+    are plain ASCII strings without padding (safe to store anywhere or put in a URL), and name the type of
+    repository they're for so that they can't be mixed up.
+    """
+    data = json.dumps({'repository': type(repository).__name__, **state}, separators=(',', ':'))
+    return base64.urlsafe_b64encode(data.encode()).decode().rstrip('=')
+
+
+def decode_cursor(repository: Any, cursor: str) -> dict:
+    """
+    Returns the state of a cursor made by encode_cursor for the same type of repository.
+
+    :raises InvalidCursor: If it isn't such a cursor.
+    """
+    try:
+        state = json.loads(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)))
+    except (TypeError, ValueError, binascii.Error):
+        raise InvalidCursor('Malformed cursor', cursor) from None
+    if not isinstance(state, dict) or state.pop('repository', None) != type(repository).__name__:
+        raise InvalidCursor(f'Not a cursor for {type(repository).__name__}', cursor)
+    return state
@@ -0,0 +1,177 @@
+import asyncio
+import hashlib
+import json
+import os
+import tempfile
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from pathlib import Path
+from typing import Optional
+
+DEFAULT_MAX_SIZE = 64 * 1024 * 1024
+DEFAULT_MAX_ENTRY_SIZE = 8 * 1024 * 1024
+
+# Headers which describe the original transfer rather than the (decoded) body that is cached
+_TRANSFER_HEADERS = frozenset({'content-encoding', 'content-length', 'transfer-encoding', 'connection'})
+
+
+class CacheEntry:
+    """
+    A cached response body along with the validators needed to revalidate it.
+    """
+
+    def __init__(self, status: int, headers: list[tuple[str, str]], body: bytes):
+        self.status = status
+        self.headers = [(key, value) for key, value in headers if key.lower() not in _TRANSFER_HEADERS]
+        self.body = body
+
+    @property
+    def etag(self) -> Optional[str]:
+        return self._header('ETag')
+
+    @property
+    def last_modified(self) -> Optional[str]:
+        return self._header('Last-Modified')
+
+    @property
+    def size(self) -> int:
+        return len(self.body)
+
+    def _header(self, name: str) -> Optional[str]:
+        for key, value in self.headers:
+            if key.lower() == name.lower():
+                return value
+        return None
+
+
+class ResponseCache(ABC):
+    """
+    A size bounded store of responses, evicting the least recently used entries first.
+    """
+
+    def __init__(self, max_size: int = DEFAULT_MAX_SIZE, max_entry_size: int = DEFAULT_MAX_ENTRY_SIZE):
+        self.max_size = max_size
+        self.max_entry_size = max_entry_size
+
+    @abstractmethod
+    async def get(self, key: str) -> Optional[CacheEntry]:
+        raise NotImplementedError()
+
+    @abstractmethod
+    async def set(self, key: str, entry: CacheEntry) -> None:
+        raise NotImplementedError()
+
+
+class MemoryResponseCache(ResponseCache):
+    """
+    Keeps responses in memory for the life of the process.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._entries: OrderedDict[str, CacheEntry] = OrderedDict()
+        self._size = 0
+
+    async def get(self, key: str) -> Optional[CacheEntry]:
+        entry = self._entries.get(key)
+        if entry is not None:
+            self._entries.move_to_end(key)
+        return entry
+
+    async def set(self, key: str, entry: CacheEntry) -> None:
+        if entry.size > self.max_entry_size:
+            return
+        if key in self._entries:
+            self._size -= self._entries.pop(key).size
+        self._entries[key] = entry
+        self._size += entry.size
+        while self._size > self.max_size:
+            _, evicted = self._entries.popitem(last=False)
+            self._size -= evicted.size
+
+
+class DiskResponseCache(ResponseCache):
+    """
+    Keeps responses as files in a directory, so they survive restarts. Recency is tracked through the files'
+    modification times, and file operations run in a thread to keep the event loop free.
+    """
+
+    def __init__(self, directory, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self._sizes: OrderedDict[str, int] = OrderedDict()
+        files = sorted(self.directory.glob('*.cache'), key=lambda path: path.stat().st_mtime)
+        for path in files:
+            self._sizes[path.stem] = path.stat().st_size
+        self._size = sum(self._sizes.values())
+
+    async def get(self, key: str) -> Optional[CacheEntry]:
+        key = _file_key(key)
+        if key not in self._sizes:
+            return None
+        self._sizes.move_to_end(key)
+        try:
+            return await asyncio.to_thread(self._read, self._path(key))
+        except (OSError, ValueError):
+            self._forget(key)
+            return None
+
+    async def set(self, key: str, entry: CacheEntry) -> None:
+        if entry.size > self.max_entry_size:
+            return
+        key = _file_key(key)
+        size = await asyncio.to_thread(self._write, self._path(key), entry)
+        self._forget(key)
+        self._sizes[key] = size
+        self._size += size
+        evicted = []
+        while self._size > self.max_size:
+            evicted_key, evicted_size = self._sizes.popitem(last=False)
+            self._size -= evicted_size
+            evicted.append(self._path(evicted_key))
+        if evicted:
+            await asyncio.to_thread(_unlink_all, evicted)
+
+    def _forget(self, key: str) -> None:
+        if key in self._sizes:
+            self._size -= self._sizes.pop(key)
+
+    def _path(self, key: str) -> Path:
+        return self.directory / f"{key}.cache"
+
+    @staticmethod
+    def _read(path: Path) -> CacheEntry:
+        with open(path, 'rb') as f:
+            meta = json.loads(f.readline())
+            body = f.read()
+        os.utime(path)
+        return CacheEntry(meta['status'], [tuple(header) for header in meta['headers']], body)
+
+    @staticmethod
+    def _write(path: Path, entry: CacheEntry) -> int:
+        meta = json.dumps({'status': entry.status, 'headers': entry.headers}).encode() + b'\n'
+        # Each write gets its own temporary file, so concurrent writes of the same key can't interleave. Whichever
+        # is replaced last wins, whole.
+        with tempfile.NamedTemporaryFile(dir=path.parent, prefix=path.stem, suffix='.tmp', delete=False) as f:
+            try:
+                f.write(meta)
+                f.write(entry.body)
+            except BaseException:
+                f.close()
+                os.unlink(f.name)
+                raise
+        os.replace(f.name, path)
+        return len(meta) + entry.size
+
+
+def _file_key(key: str) -> str:
+    return hashlib.sha256(key.encode()).hexdigest()
+
+
+def _unlink_all(paths: list[Path]) -> None:
+    for path in paths:
+        try:
+            path.unlink()
+        except FileNotFoundError:
+            pass
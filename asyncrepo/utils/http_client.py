@@ -1,23 +1,376 @@
 import asyncio
+import hashlib
+import json
+import random
+import re
 import ssl
 import warnings
+import weakref
+from collections.abc import Mapping
+from datetime import datetime, timezone
+from email.message import Message
+from email.utils import parsedate_to_datetime
+from typing import AsyncGenerator, Optional
 
 import certifi
 import aiohttp
+from multidict import CIMultiDict, CIMultiDictProxy, MultiDict, MultiDictProxy
+from yarl import URL
+
+from asyncrepo.utils.http_cache import CacheEntry, ResponseCache
 
 warnings.filterwarnings("ignore", message="Inheritance class HttpClient from ClientSession is discouraged")
 warnings.filterwarnings("ignore", message="Inheritance class BasicAuthHttpClient from ClientSession is discouraged")
 
+DEFAULT_LIMIT = 100
+DEFAULT_LIMIT_PER_HOST = 20
+DEFAULT_TTL_DNS_CACHE = 300
+DEFAULT_KEEPALIVE_TIMEOUT = 30
+
+DEFAULT_RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+IDEMPOTENT_METHODS = frozenset({'GET', 'HEAD', 'OPTIONS', 'PUT', 'DELETE', 'TRACE'})
+
+_ssl_context = None
+
+
+def _default_ssl_context() -> ssl.SSLContext:
+    # A single context is shared by every client. aiohttp keys pooled connections by their SSL context,
+    # so a context per client would mean connections could never be reused between clients.
+    global _ssl_context
+    if _ssl_context is None:
+        _ssl_context = ssl.create_default_context(cafile=certifi.where())
+    return _ssl_context
+
+
+class RetryPolicy:
+    """
+    Decides whether and when a client retries a failed request.
+
+    Idempotent requests (e.g. GET) are retried on connection errors, timeouts and any of the retry statuses, up to
+    idempotent_retries times. Other requests have their own, smaller budget of retries and are only retried when
+    the server refused them outright (429 or 503), since otherwise they may already have taken effect.
+
+    Delays back off exponentially with full jitter, so that many clients failing at the same moment don't all come
+    back at the same moment either. A Retry-After header takes precedence over the backoff, plus a little jitter.
+    """
+
+    def __init__(self, idempotent_retries: int = 4, retries: int = 1, backoff: float = 0.25,
+                 max_backoff: float = 30.0, max_retry_after: float = 120.0,
+                 statuses: frozenset = DEFAULT_RETRY_STATUSES):
+        self.idempotent_retries = idempotent_retries
+        self.retries = retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.max_retry_after = max_retry_after
+        self.statuses = statuses
+
+    def should_retry(self, method: str, attempt: int, response: Optional[aiohttp.ClientResponse] = None) -> bool:
+        """
+        Whether to retry after the given attempt (counting from 0) returned the response, or raised a connection
+        error or timeout if there is no response.
+        """
+        if method.upper() in IDEMPOTENT_METHODS:
+            return attempt < self.idempotent_retries and (response is None or response.status in self.statuses)
+        return attempt < self.retries and response is not None and response.status in (429, 503)
+
+    def delay(self, attempt: int, response: Optional[aiohttp.ClientResponse] = None) -> float:
+        """
+        The number of seconds to wait before retrying after the given attempt.
+        """
+        jitter = random.uniform(0, min(self.max_backoff, self.backoff * 2 ** attempt))
+        retry_after = _retry_after(response) if response is not None else None
+        if retry_after is None:
+            return jitter
+        return min(retry_after, self.max_retry_after) + random.uniform(0, self.backoff)
+
+
+def _retry_after(response: aiohttp.ClientResponse) -> Optional[float]:
+    value = response.headers.get('Retry-After')
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, (parsedate_to_datetime(value) - datetime.now(timezone.utc)).total_seconds())
+    except (TypeError, ValueError):
+        return None
+
+
+class ConnectionPool:
+    """
+    A process-wide registry of connectors and sessions keyed by base URL.
+
+    Clients created through the pool share keep-alive connections (and therefore TLS sessions and DNS lookups)
+    instead of paying for a new handshake on every call. Connectors are bound to the event loop they were
+    created on, so the registry is kept separately for each running loop.
+    """
+
+    def __init__(self, limit: int = DEFAULT_LIMIT, limit_per_host: int = DEFAULT_LIMIT_PER_HOST,
+                 ttl_dns_cache: Optional[int] = DEFAULT_TTL_DNS_CACHE,
+                 keepalive_timeout: float = DEFAULT_KEEPALIVE_TIMEOUT,
+                 retry_policy: Optional[RetryPolicy] = None, cache: Optional[ResponseCache] = None):
+        self.limit = limit
+        self.limit_per_host = limit_per_host
+        self.ttl_dns_cache = ttl_dns_cache
+        self.keepalive_timeout = keepalive_timeout
+        self.retry_policy = retry_policy or RetryPolicy()
+        self.cache = cache
+        self._connectors = weakref.WeakKeyDictionary()
+        self._sessions = weakref.WeakKeyDictionary()
+
+    def configure(self, **kwargs) -> None:
+        """
+        Update the pool settings. The retry_policy and cache apply to every client that doesn't have its own right
+        away.
+        The connector settings (limit, limit_per_host, ttl_dns_cache, keepalive_timeout) apply to connectors
+        created from now on, so call close() first if existing connectors should pick them up.
+        """
+        for key, value in kwargs.items():
+            if not hasattr(self, key) or key.startswith('_'):
+                raise TypeError(f"Unknown connection pool setting: {key}")
+            setattr(self, key, value)
+
+    def connector(self, base_url=None) -> aiohttp.TCPConnector:
+        """
+        Get the shared connector for the base URL, creating it if needed. Must be called from a coroutine.
+        """
+        connectors = self._connectors.setdefault(asyncio.get_running_loop(), {})
+        key = _pool_key(base_url)
+        connector = connectors.get(key)
+        if connector is None or connector.closed:
+            connector = connectors[key] = aiohttp.TCPConnector(
+                limit=self.limit,
+                limit_per_host=self.limit_per_host,
+                use_dns_cache=self.ttl_dns_cache is not None,
+                ttl_dns_cache=self.ttl_dns_cache,
+                keepalive_timeout=self.keepalive_timeout)
+        return connector
+
+    def session(self, base_url=None) -> 'HttpClient':
+        """
+        Get the shared, unauthenticated session for the base URL, creating it if needed. Must be called from a
+        coroutine. The session belongs to the pool, so callers should not close it.
+        """
+        sessions = self._sessions.setdefault(asyncio.get_running_loop(), {})
+        key = _pool_key(base_url)
+        session = sessions.get(key)
+        if session is None or session.closed:
+            session = sessions[key] = HttpClient(base_url)
+        return session
+
+    async def close(self) -> None:
+        """
+        Close every session and connector created for the running event loop.
+        """
+        loop = asyncio.get_running_loop()
+        sessions = self._sessions.pop(loop, {})
+        connectors = self._connectors.pop(loop, {})
+        for session in sessions.values():
+            await session.close()
+        for connector in connectors.values():
+            await connector.close()
+
+
+def _pool_key(base_url) -> Optional[str]:
+    if base_url is None:
+        return None
+    return str(URL(str(base_url)))
+
+
+connection_pool = ConnectionPool()
+
 
 class HttpClient(aiohttp.ClientSession):
-    def __init__(self, *args, add_ssl_context=True, **kwargs):
-        super().__init__(*args, **kwargs)
-        self.__ssl_context = ssl.create_default_context(cafile=certifi.where()) if add_ssl_context else None
+    """
+    The session all clients are built on. It adds pooled connections, retries and, when a cache is configured,
+    conditional requests: JSON responses carrying an ETag or Last-Modified validator are cached, later requests
+    for them send If-None-Match / If-Modified-Since, and a 304 is answered with the cached body.
+    """
 
-    async def _request(self, *args, **kwargs):
-        if self.__ssl_context and not kwargs.get("ssl"):
+    def __init__(self, base_url=None, *, add_ssl_context=True, retry_policy: Optional[RetryPolicy] = None,
+                 cache: Optional[ResponseCache] = None, **kwargs):
+        # Unless told otherwise, clients borrow their connector from the shared pool. Closing the client
+        # then only closes the session, leaving the pooled connections open for other clients.
+        if 'connector' not in kwargs:
+            kwargs['connector'] = connection_pool.connector(base_url)
+            kwargs.setdefault('connector_owner', False)
+        super().__init__(base_url, **kwargs)
+        self.__ssl_context = _default_ssl_context() if add_ssl_context else None
+        self.retry_policy = retry_policy
+        self.cache = cache
+
+    async def _request(self, method, str_or_url, *, cache: bool = True, **kwargs):
+        # Requests whose body is streamed, such as file downloads, pass cache=False so that it isn't read up front
+        if self.__ssl_context and "ssl" not in kwargs:
             kwargs["ssl"] = self.__ssl_context
-        return await super()._request(*args, **kwargs)
+        response_cache = self.cache or connection_pool.cache
+        if not cache or response_cache is None or method.upper() != 'GET':
+            return await self._request_with_retries(method, str_or_url, **kwargs)
+
+        key = self._cache_key(str_or_url, kwargs)
+        entry = await response_cache.get(key)
+        if entry is not None:
+            headers = CIMultiDict(kwargs.get('headers') or {})
+            if entry.etag:
+                headers.setdefault('If-None-Match', entry.etag)
+            if entry.last_modified:
+                headers.setdefault('If-Modified-Since', entry.last_modified)
+            kwargs['headers'] = headers
+
+        response = await self._request_with_retries(method, str_or_url, **kwargs)
+        if response.status == 304 and entry is not None:
+            return CachedResponse(response, entry)
+        if response.status == 200 and _is_cacheable(response, response_cache):
+            # The body has been read in full to cache it, so it's served from memory from here on
+            entry = CacheEntry(response.status, list(response.headers.items()), await response.read())
+            await response_cache.set(key, entry)
+            return CachedResponse(response, entry)
+        return response
+
+    async def _request_with_retries(self, method, str_or_url, **kwargs):
+        retry_policy = self.retry_policy or connection_pool.retry_policy
+        attempt = 0
+        while True:
+            try:
+                response = await super()._request(method, str_or_url, **kwargs)
+            except (aiohttp.ClientConnectionError, asyncio.TimeoutError):
+                if not retry_policy.should_retry(method, attempt):
+                    raise
+                delay = retry_policy.delay(attempt)
+            else:
+                if not retry_policy.should_retry(method, attempt, response):
+                    return response
+                delay = retry_policy.delay(attempt, response)
+                response.release()
+            await asyncio.sleep(delay)
+            attempt += 1
+
+    def _cache_key(self, str_or_url, kwargs: dict) -> str:
+        params = kwargs.get('params')
+        if isinstance(params, Mapping):
+            params = sorted((str(key), str(value)) for key, value in params.items())
+        # Responses may differ by who is asking, so the credentials are part of the key (as a digest)
+        auth = kwargs.get('auth') or self._default_auth
+        credentials = [auth.encode() if auth is not None else '',
+                       self.headers.get('Authorization', ''),
+                       CIMultiDict(kwargs.get('headers') or {}).get('Authorization', '')]
+        digest = hashlib.sha256('\n'.join(credentials).encode()).hexdigest()
+        return json.dumps([str(self._build_url(str_or_url)), params, digest], default=str)
+
+
+def _is_cacheable(response: aiohttp.ClientResponse, cache: ResponseCache) -> bool:
+    # Only API responses are cached. Reading the body here would otherwise defeat streaming large downloads.
+    if not response.content_type.endswith('json'):
+        return False
+    if 'no-store' in response.headers.get('Cache-Control', ''):
+        return False
+    if 'ETag' not in response.headers and 'Last-Modified' not in response.headers:
+        return False
+    return (response.content_length or 0) <= cache.max_entry_size
+
+
+class CachedResponse:
+    """
+    A response whose body comes from the cache: either a 304 which revalidated a cached entry, or a response which
+    was read in full to be cached. It has the parts of aiohttp.ClientResponse that clients use, with the status,
+    headers and body of the entry (content streams the body from memory), and passes anything else, such as url
+    and release(), through to the actual response.
+    """
+
+    def __init__(self, response: aiohttp.ClientResponse, entry: CacheEntry):
+        self._response = response
+        self._body = entry.body
+        self.status = entry.status
+        self.reason = 'OK'
+        self.headers = CIMultiDictProxy(CIMultiDict(entry.headers))
+        self.content = _BodyReader(entry.body)
+        self.content_length = len(entry.body)
+        content_type = Message()
+        content_type['Content-Type'] = self.headers.get('Content-Type', 'application/octet-stream')
+        self.content_type = content_type.get_content_type()
+        self.charset = content_type.get_param('charset')
+
+    def __getattr__(self, name):
+        return getattr(self._response, name)
+
+    async def __aenter__(self) -> 'CachedResponse':
+        await self._response.__aenter__()
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        await self._response.__aexit__(*exc_info)
+
+    @property
+    def ok(self) -> bool:
+        return self.status < 400
+
+    def raise_for_status(self) -> None:
+        # Only successful responses are cached
+        pass
+
+    async def read(self) -> bytes:
+        return self._body
+
+    async def text(self, encoding: Optional[str] = None, errors: str = 'strict') -> str:
+        return self._body.decode(encoding or self.charset or 'utf-8', errors)
+
+    async def json(self, *, encoding: Optional[str] = None, loads=json.loads, content_type=None):
+        # Only JSON responses are cached, so there's no content type to check
+        return loads(await self.text(encoding))
+
+    @property
+    def links(self) -> MultiDictProxy:
+        # Parsed from the cached Link headers as aiohttp parses a response's own
+        links = MultiDict()
+        for value in re.split(r',(?=\s*<)', ', '.join(self.headers.getall('Link', []))):
+            match = re.match(r'\s*<(.*)>(.*)', value)
+            if match is None:
+                continue
+            url, params = match.groups()
+            link = MultiDict()
+            for param in params.split(';')[1:]:
+                if (param_match := _LINK_PARAM.match(param)) is not None:
+                    link.add(*param_match.groups())
+            link.add('url', self.url.join(URL(url)))
+            links.add(link.get('rel', url), MultiDictProxy(link))
+        return MultiDictProxy(links)
+
+
+_LINK_PARAM = re.compile(r'^\s*([^=\s]+)\s*=\s*"?([^"]*)"?\s*$')
+
+
+class _BodyReader:
+    """
+    Reads a body from memory the way a response's content (an aiohttp StreamReader) is read.
+    """
+
+    def __init__(self, body: bytes):
+        self._body = body
+        self._position = 0
+
+    def at_eof(self) -> bool:
+        return self._position >= len(self._body)
+
+    async def read(self, n: int = -1) -> bytes:
+        end = len(self._body) if n < 0 else self._position + n
+        data = self._body[self._position:end]
+        self._position += len(data)
+        return data
+
+    async def readany(self) -> bytes:
+        return await self.read()
+
+    def iter_chunked(self, n: int) -> AsyncGenerator[bytes, None]:
+        return self._iter(n)
+
+    def iter_any(self) -> AsyncGenerator[bytes, None]:
+        return self._iter(-1)
+
+    async def _iter(self, n: int) -> AsyncGenerator[bytes, None]:
+        while data := await self.read(n):
+            yield data
 
 
 class BasicAuthHttpClient(HttpClient):
@@ -1,4 +1,5 @@
 import warnings
+from typing import Optional, Sequence
 
 from asyncrepo.exceptions import ItemNotFound
 from asyncrepo.utils.http_client import BasicAuthHttpClient
@@ -10,8 +11,9 @@ class JiraClient(BasicAuthHttpClient):
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
 
-    async def get_issue(self, issue_id_or_key: str) -> dict:
-        async with self.get(f"/rest/api/latest/issue/{issue_id_or_key}") as response:
+    async def get_issue(self, issue_id_or_key: str, fields: Optional[Sequence[str]] = None) -> dict:
+        params = {} if fields is None else {'fields': ','.join(fields)}
+        async with self.get(f"/rest/api/latest/issue/{issue_id_or_key}", params=params) as response:
             if response.status == 404:
                 raise ItemNotFound(issue_id_or_key)
             response.raise_for_status()
@@ -19,13 +21,16 @@ class JiraClient(BasicAuthHttpClient):
 
     async def search(self, query: str = '', max_results: int = 100,
                      start_at: int = 0,
-                     validate_query: str = 'none') -> dict:
+                     validate_query: str = 'none',
+                     fields: Optional[Sequence[str]] = None) -> dict:
         params = {
             'jql': query,
             'startAt': start_at,
             'maxResults': max_results,
             'validateQuery': validate_query,
         }
+        if fields is not None:
+            params['fields'] = ','.join(fields)
         async with self.get('/rest/api/latest/search', params=params) as response:
             response.raise_for_status()
             data = await response.json()
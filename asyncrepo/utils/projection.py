@@ -0,0 +1,35 @@
+from collections.abc import Mapping
+from typing import Any, Iterable
+
+# Returned by lookup for fields which a document doesn't have
+MISSING = object()
+
+
+def lookup(document: Any, field: str) -> Any:
+    """
+    Returns the value of a field of a document, where a field is a key of the document or a dotted path of keys
+    into nested mappings (e.g. "fields.status"). Returns MISSING if the document doesn't have the field.
+    """
+    value = document
+    for key in field.split('.'):
+        value = value.get(key, MISSING) if isinstance(value, Mapping) else MISSING
+        if value is MISSING:
+            break
+    return value
+
+
+def project(document: Any, fields: Iterable[str]) -> dict:
+    """
+    Returns only the given fields of a document (see lookup). Fields which the document doesn't have are left out.
+    """
+    projected = {}
+    for field in fields:
+        value = lookup(document, field)
+        if value is MISSING:
+            continue
+        keys = field.split('.')
+        target = projected
+        for key in keys[:-1]:
+            target = target.setdefault(key, {})
+        target[keys[-1]] = value
+    return projected
@@ -1,32 +1,297 @@
+import asyncio
 import codecs
+import csv
+import json
+import mmap
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import aclosing
+from itertools import accumulate
 from pathlib import Path
-from typing import Optional
+from typing import AsyncGenerator, AsyncIterator, Iterator, Optional, TypeVar
 
-import aiocsv
+import aiohttp
 from aiopath.path import AsyncPath
-from anyio import AsyncFile
+from yarl import URL
 
-from asyncrepo.utils.http_client import HttpClient
+from asyncrepo.utils.compression import (INFER, MAGIC_SIZE, Decompressor, compression_from_magic,
+                                         compression_from_path)
+from asyncrepo.utils.concurrency import bounded_map
+from asyncrepo.utils.http_client import RetryPolicy, connection_pool
+
+
+T = TypeVar('T')
+
+# The number of rows per batch, which is also how many rows are parsed per trip to the thread reading a local file
+DEFAULT_BATCH_SIZE = 1000
+# The size of the byte ranges a local file is split into when parsing it across processes
+DEFAULT_CHUNK_SIZE = 8 * 1024 * 1024
+# The size of the byte ranges a URL is split into when downloading it over several connections
+DEFAULT_RANGE_SIZE = 4 * 1024 * 1024
+_BLOCK_SIZE = 1024 * 1024
+_FIRST_BLOCK_SIZE = 4 * 1024
+
+
+# Errors partway through a response body, after which a download can be resumed with a Range request
+_RESUMABLE_ERRORS = (aiohttp.ClientPayloadError, aiohttp.ClientConnectionError, asyncio.TimeoutError)
 
 
 class ResourceStreamer:
-    def __init__(self, filepath_or_url: str, is_file: Optional[bool] = None, size=None):
+    """
+    Streams a local file or URL.
+
+    URLs are downloaded with a single GET. If the server accepts Range requests, a download that fails partway is
+    resumed from the last byte received rather than starting over, as many times as the connection pool's retry
+    policy allows for a request. With connections > 1, the URL is instead downloaded as ranges of range_size bytes
+    over that many connections at once. Ranges are still read in order, so up to connections ranges are held in
+    memory while waiting for the oldest one to complete.
+
+    Compressed resources (gzip, bz2, xz or zstd, the last of which needs the zstandard package) are decompressed as
+    they are streamed. By default, the compression is recognized from the file extension or, failing that, from the
+    first bytes of the data. Since HTTP clients already decode a Content-Encoding they support, a URL sent with one
+    is only recognized from its first bytes, as its extension no longer describes what is received.
+    """
+
+    def __init__(self, filepath_or_url: str, is_file: Optional[bool] = None, size=None, encoding: str = 'utf-8',
+                 connections: int = 1, range_size: int = DEFAULT_RANGE_SIZE, compression: Optional[str] = INFER):
+        if connections < 1:
+            raise ValueError("connections must be at least 1")
         self.filepath_or_url = filepath_or_url
         self.is_file = is_file
         self.size = size
+        self.encoding = encoding
+        self.connections = connections
+        self.range_size = range_size
+        self.compression = compression
 
     async def stream_csv(self, **csv_reader_kwargs):
+        async with aclosing(self.stream_csv_batches(**csv_reader_kwargs)) as batches:
+            async for batch in batches:
+                for row in batch:
+                    yield row
+
+    async def stream_csv_batches(self, batch_size: int = DEFAULT_BATCH_SIZE,
+                                 **csv_reader_kwargs) -> AsyncGenerator[list[dict], None]:
+        """
+        Streams the rows of the CSV in lists of batch_size rows (the last of which may be shorter). The data is
+        read in large blocks and parsed a block at a time with the csv module, off the event loop.
+        """
+        filepath = None
+        if self.is_file in [None, True]:
+            filepath = await self._resolve_filepath()
+        if filepath is not None and await self._file_compression(filepath) is None:
+            batches = self.stream_csv_offset_batches(batch_size, **csv_reader_kwargs)
+            async with aclosing(batches):
+                async for batch in batches:
+                    yield [row for _, row in batch]
+            return
+        blocks, decoder = await self._open_blocks(filepath)
+        async with aclosing(_stream_csv_text_batches(blocks, decoder, batch_size, csv_reader_kwargs)) as batches:
+            async for batch in batches:
+                yield batch
+
+    async def stream_jsonl(self):
+        async with aclosing(self.stream_jsonl_batches()) as batches:
+            async for batch in batches:
+                for value in batch:
+                    yield value
+
+    async def stream_jsonl_batches(self, batch_size: int = DEFAULT_BATCH_SIZE) -> AsyncGenerator[list, None]:
+        """
+        Streams the values of a JSON Lines resource (one JSON value per line, skipping blank lines) in lists of
+        batch_size values (the last of which may be shorter). Lines are parsed a block at a time, off the event loop.
+        """
         filepath = None
         if self.is_file in [None, True]:
             filepath = await self._resolve_filepath()
+        blocks, decoder = await self._open_blocks(filepath)
+        async with aclosing(_stream_jsonl_text_batches(blocks, decoder, batch_size)) as batches:
+            async for batch in batches:
+                yield batch
+
+    async def content_length(self) -> int:
+        """
+        Returns the size of the resource in bytes, as it is stored (i.e. before any decompression).
+        """
+        stat = await self.stat()
+        if stat is not None:
+            return stat.st_size
+        async with connection_pool.session().head(self.filepath_or_url, headers={'Accept-Encoding': 'identity'}) as r:
+            r.raise_for_status()
+            if r.content_length is None:
+                raise ValueError('The size of the resource is unknown', self.filepath_or_url)
+            return r.content_length
+
+    async def read_range(self, start: int, end: int) -> bytes:
+        """
+        Reads bytes start up to (not including) end of the resource, as it is stored. URLs are read with a Range
+        request, so the server must support them.
+        """
+        filepath = await self._resolve_filepath() if self.is_file is not False else None
         if filepath is not None:
-            async for row in self._stream_csv_filepath(filepath, **csv_reader_kwargs):
-                yield row
-        elif self.is_file in [None, False]:
-            async for row in self._stream_csv_url(self.filepath_or_url, **csv_reader_kwargs):
-                yield row
-        else:
-            raise ValueError('Invalid filepath or URL', self.filepath_or_url)
+            return await asyncio.to_thread(_read_file_range, filepath, start, end)
+        response = await _request_range(connection_pool.session(), self.filepath_or_url, start, end)
+        async with response:
+            if response.status != 206:
+                response.raise_for_status()
+                raise ValueError('The server does not support range requests', self.filepath_or_url)
+            return await response.read()
+
+    async def stat(self) -> Optional[os.stat_result]:
+        """
+        Returns the status of the file if the resource is a local file, or None otherwise.
+        """
+        if self.is_file is False:
+            return None
+        filepath = await self._resolve_filepath()
+        if filepath is None:
+            return None
+        return await filepath.stat()
+
+    async def file_compression(self) -> Optional[str]:
+        """
+        Returns the compression of the resource if it is a compressed local file, or None otherwise.
+        """
+        if self.is_file is False:
+            return None
+        filepath = await self._resolve_filepath()
+        if filepath is None:
+            return None
+        return await self._file_compression(filepath)
+
+    async def _file_compression(self, filepath: AsyncPath) -> Optional[str]:
+        if self.compression != INFER:
+            return self.compression
+        compression = compression_from_path(str(filepath))
+        if compression is None:
+            compression = compression_from_magic(await asyncio.to_thread(_read_head, filepath))
+        return compression
+
+    async def stream_csv_offsets(self, processes: Optional[int] = None, chunk_size: int = DEFAULT_CHUNK_SIZE,
+                                 **csv_reader_kwargs) -> AsyncGenerator[tuple[int, dict], None]:
+        """
+        Streams the rows of a local CSV file, each along with the byte offset its record starts at, which can later
+        be passed to read_csv_row. Takes the same options as stream_csv_offset_batches.
+        """
+        batches = self.stream_csv_offset_batches(processes=processes, chunk_size=chunk_size, **csv_reader_kwargs)
+        async with aclosing(batches):
+            async for batch in batches:
+                for row in batch:
+                    yield row
+
+    async def stream_csv_offset_batches(self, batch_size: int = DEFAULT_BATCH_SIZE, processes: Optional[int] = None,
+                                        chunk_size: int = DEFAULT_CHUNK_SIZE, start: Optional[int] = None,
+                                        **csv_reader_kwargs) -> AsyncGenerator[list[tuple[int, dict]], None]:
+        """
+        Streams the rows of a local CSV file in lists of batch_size (offset, row) pairs, where offset is the byte
+        offset the row's record starts at.
+
+        :param processes: If set, the file is split into ranges of about chunk_size bytes, which are parsed by a pool
+            of this many processes. Rows are still yielded in order. Ranges are split where the number of quote
+            characters seen so far is even, so this requires quote characters to only be used for quoting (as
+            RFC 4180 requires) and does not support an escapechar.
+        :param chunk_size: The size of the ranges to split the file into when parsing across processes.
+        :param start: If set, rows are streamed from the record starting at this byte offset (one of the offsets
+            streamed before) rather than from the first.
+        """
+        filepath = await self._resolve_filepath()
+        if filepath is None:
+            raise ValueError('Row offsets are only available for local files', self.filepath_or_url)
+        if await self._file_compression(filepath) is not None:
+            raise ValueError('Row offsets are only available for uncompressed files', self.filepath_or_url)
+        if processes:
+            ranges = self._stream_csv_ranges_in_processes(filepath, processes, chunk_size, start, csv_reader_kwargs)
+            async with aclosing(_rebatch(ranges, batch_size)) as batches:
+                async for batch in batches:
+                    yield batch
+            return
+
+        mapped = await asyncio.to_thread(_MappedFile, filepath)
+        try:
+            lines = _CSVLines(mapped, self.encoding)
+            reader = csv.DictReader(iter(lines), **csv_reader_kwargs)
+            # The header is read up front, so that it isn't counted as part of the first row
+            fieldnames = await asyncio.to_thread(lambda: reader.fieldnames)
+            if start is not None:
+                lines = _CSVLines(mapped, self.encoding, start)
+                reader = csv.DictReader(iter(lines), **{**csv_reader_kwargs, 'fieldnames': fieldnames})
+            while True:
+                batch = await asyncio.to_thread(_read_csv_rows, reader, lines, batch_size)
+                if batch:
+                    yield batch
+                if len(batch) < batch_size:
+                    return
+        finally:
+            mapped.close()
+
+    async def _stream_csv_ranges_in_processes(self, filepath: AsyncPath, processes: int, chunk_size: int,
+                                              start: Optional[int],
+                                              csv_reader_kwargs: dict) -> AsyncGenerator[list[tuple[int, dict]], None]:
+        if csv_reader_kwargs.get('escapechar') is not None:
+            raise ValueError('CSV files with an escapechar can only be parsed in a single process')
+        path = str(filepath)
+        fieldnames, body_start, size = await asyncio.to_thread(self._read_csv_header, path, csv_reader_kwargs)
+        if start is not None:
+            body_start = max(body_start, start)
+        csv_reader_kwargs = {**csv_reader_kwargs, 'fieldnames': fieldnames}
+        quotechar = None
+        if csv_reader_kwargs.get('quoting') != csv.QUOTE_NONE:
+            quotechar = csv_reader_kwargs.get('quotechar', '"').encode(_body_encoding(self.encoding))
+
+        loop = asyncio.get_running_loop()
+        pool = ProcessPoolExecutor(processes)
+        try:
+            # A range can only start at a newline outside quotes, i.e. one preceded by an even number of quote
+            # characters. Counting them is cheap enough to do for the whole file up front, across the pool.
+            nominal = list(range(body_start, size, chunk_size))
+            parities = [0] * len(nominal)
+            if quotechar is not None:
+                counts = await asyncio.gather(*[
+                    loop.run_in_executor(pool, _count_bytes, path, start, min(start + chunk_size, size), quotechar)
+                    for start in nominal[:-1]])
+                for i, count in enumerate(counts):
+                    parities[i + 1] = (parities[i] + count) % 2
+            starts = await asyncio.to_thread(_record_starts, path, nominal[1:], parities[1:], quotechar)
+            bounds = sorted({body_start, size, *starts})
+            ranges = [(start, end) for start, end in zip(bounds, bounds[1:]) if start < end]
+
+            async def parse(byte_range: tuple[int, int]) -> list[tuple[int, dict]]:
+                return await loop.run_in_executor(pool, _parse_csv_range, path, *byte_range, self.encoding,
+                                                  csv_reader_kwargs)
+
+            # Parsed ranges wait behind the one being yielded, so up to two per process are held in memory
+            async with aclosing(bounded_map(parse, ranges, processes * 2)) as results:
+                async for rows in results:
+                    yield rows
+        finally:
+            pool.shutdown(wait=False, cancel_futures=True)
+
+    def _read_csv_header(self, path: str, csv_reader_kwargs: dict) -> tuple[list[str], int, int]:
+        with _MappedFile(path) as mapped:
+            lines = _CSVLines(mapped, self.encoding)
+            reader = csv.DictReader(iter(lines), **csv_reader_kwargs)
+            fieldnames = reader.fieldnames
+            return fieldnames, lines.offset_of(reader.reader.line_num), mapped.size
+
+    async def read_csv_row(self, offset: int, **csv_reader_kwargs) -> Optional[dict]:
+        """
+        Reads the row of a local CSV file whose record starts at the given byte offset, or None if there are no
+        rows from there on.
+        """
+        filepath = await self._resolve_filepath()
+        if filepath is None:
+            raise ValueError('Rows can only be read by offset from local files', self.filepath_or_url)
+        if await self._file_compression(filepath) is not None:
+            raise ValueError('Rows can only be read by offset from uncompressed files', self.filepath_or_url)
+        return await asyncio.to_thread(self._read_csv_row, filepath, offset, csv_reader_kwargs)
+
+    def _read_csv_row(self, filepath: AsyncPath, offset: int, csv_reader_kwargs: dict) -> Optional[dict]:
+        # Only the header and the row itself are ever decoded
+        with _MappedFile(filepath) as mapped:
+            fieldnames = csv.DictReader(iter(_CSVLines(mapped, self.encoding)), **csv_reader_kwargs).fieldnames
+            lines = _CSVLines(mapped, self.encoding, offset)
+            return next(csv.DictReader(iter(lines), **{**csv_reader_kwargs, 'fieldnames': fieldnames}), None)
 
     async def _resolve_filepath(self):
         try:
@@ -47,33 +312,533 @@ class ResourceStreamer:
             return None
         return path
 
-    async def _stream_csv_url(self, url: str, **csv_reader_kwargs):
-        async with HttpClient() as client:
-            async with client.get(url) as r:
-                encoding = r.headers.get('Content-Type', '').split('charset=')
-                encoding = encoding[1] if len(encoding) > 1 else 'utf-8'
-                reader = AsyncTextReaderWrapper(r.content, encoding, errors='strict')
-                async for row in aiocsv.AsyncDictReader(reader, **csv_reader_kwargs):
-                    yield row
+    async def _open_blocks(self, filepath: Optional[AsyncPath]) -> tuple[AsyncGenerator[bytes, None], '_BlockDecoder']:
+        """
+        Starts reading the blocks of the local file (if there is one) or the URL, along with a decoder to text for
+        them.
+        """
+        if filepath is not None:
+            return _read_file_blocks(filepath), _BlockDecoder(self.encoding, await self._file_compression(filepath))
+        if self.is_file not in [None, False]:
+            raise ValueError('Invalid filepath or URL', self.filepath_or_url)
+        response, blocks = await self._download(self.filepath_or_url)
+        encoding = response.headers.get('Content-Type', '').split('charset=')
+        encoding = encoding[1] if len(encoding) > 1 else 'utf-8'
+        compression = self.compression
+        if compression == INFER and 'Content-Encoding' not in response.headers:
+            compression = compression_from_path(URL(self.filepath_or_url).path) or INFER
+        return blocks, _BlockDecoder(encoding, compression)
+
+    async def _download(self, url: str) -> tuple[aiohttp.ClientResponse, AsyncGenerator[bytes, None]]:
+        """
+        Starts downloading the URL, returning the first response (for its headers) and the blocks of the body.
+        """
+        client = connection_pool.session()
+        retry_policy = client.retry_policy or connection_pool.retry_policy
+        if self.connections > 1:
+            # The first range doubles as a check that the server supports ranges at all
+            response = await _request_range(client, url, 0, self.range_size)
+            size = _range_total(response)
+            if size is not None:
+                return response, self._download_ranges(client, url, response, size, retry_policy)
+            # Otherwise the whole resource may have been sent instead, which is fine to read as it is
+            if response.status != 200:
+                response.release()
+                response = await client.get(url, cache=False)
+        else:
+            # Downloads are streamed, so they bypass the response cache, which would read them whole
+            response = await client.get(url, cache=False)
+
+        if (response.headers.get('Accept-Ranges') == 'bytes' and response.content_length is not None
+                and 'Content-Encoding' not in response.headers):
+            return response, _read_resumable(client, url, response, 0, response.content_length, retry_policy)
+        return response, _read_response(response)
+
+    async def _download_ranges(self, client: aiohttp.ClientSession, url: str, first: aiohttp.ClientResponse,
+                               size: int, retry_policy: RetryPolicy) -> AsyncGenerator[bytes, None]:
+        async def fetch(byte_range: tuple[int, int]) -> bytes:
+            start, end = byte_range
+            response = first if start == 0 else await _request_range(client, url, start, end, first)
+            if response.status != 206:
+                response.release()
+                raise ValueError('The resource changed while it was being downloaded', url)
+            blocks = _read_resumable(client, url, response, start, end, retry_policy)
+            return b''.join([block async for block in blocks])
+
+        ranges = [(start, min(start + self.range_size, size)) for start in range(0, size, self.range_size)]
+        try:
+            # Completed ranges wait behind the oldest one still downloading, which bounds how many are held
+            async with aclosing(bounded_map(fetch, ranges, self.connections)) as results:
+                async for data in results:
+                    for start in range(0, len(data), _BLOCK_SIZE):
+                        yield data[start:start + _BLOCK_SIZE]
+        finally:
+            first.release()
+
+
+async def _request_range(client: aiohttp.ClientSession, url: str, start: int, end: Optional[int],
+                         original: Optional[aiohttp.ClientResponse] = None) -> aiohttp.ClientResponse:
+    """
+    Requests bytes start up to (not including) end of the URL, or to the end of it if end is None. If the original
+    response is given, the range is only sent if the resource hasn't changed since, and the whole resource is
+    sent instead otherwise.
+    """
+    # Ranges count the bytes that are sent, so they only line up with each other if nothing is compressed
+    headers = {'Range': f'bytes={start}-' if end is None else f'bytes={start}-{end - 1}',
+               'Accept-Encoding': 'identity'}
+    if original is not None:
+        validator = _validator(original)
+        if validator is not None:
+            headers['If-Range'] = validator
+    return await client.get(url, headers=headers, cache=False)
+
+
+def _validator(response: aiohttp.ClientResponse) -> Optional[str]:
+    # Weak ETags can't be used with If-Range
+    etag = response.headers.get('ETag')
+    if etag and not etag.startswith('W/'):
+        return etag
+    return response.headers.get('Last-Modified')
+
+
+def _range_total(response: aiohttp.ClientResponse) -> Optional[int]:
+    """
+    Returns the full size of the resource from a partial response, or None if it isn't one or the size is unknown.
+    """
+    if response.status != 206 or 'Content-Encoding' in response.headers:
+        return None
+    total = response.headers.get('Content-Range', '').rpartition('/')[2]
+    return int(total) if total.isdigit() else None
+
+
+async def _read_response(response: aiohttp.ClientResponse) -> AsyncGenerator[bytes, None]:
+    try:
+        async for block in response.content.iter_chunked(_BLOCK_SIZE):
+            yield block
+    finally:
+        response.release()
+
+
+async def _read_resumable(client: aiohttp.ClientSession, url: str, response: aiohttp.ClientResponse, start: int,
+                          end: int, retry_policy: RetryPolicy) -> AsyncGenerator[bytes, None]:
+    """
+    Yields the body of the response, which holds bytes start up to end of the URL. If it fails partway, the rest is
+    requested with a Range request, for as long as the retry policy allows without any progress in between.
+    """
+    original = response
+    position = start
+    attempt = 0
+    while True:
+        try:
+            async for block in response.content.iter_chunked(_BLOCK_SIZE):
+                position += len(block)
+                attempt = 0
+                yield block
+            if position >= end:
+                return
+            error = aiohttp.ClientPayloadError(f'Response ended at byte {position} of {end}')
+        except _RESUMABLE_ERRORS as e:
+            error = e
+        finally:
+            response.release()
+        if not retry_policy.should_retry('GET', attempt):
+            raise error
+        await asyncio.sleep(retry_policy.delay(attempt))
+        attempt += 1
+        response = await _request_range(client, url, position, end, original)
+        if response.status != 206 or _range_start(response) != position:
+            response.release()
+            raise ValueError('The resource changed while it was being downloaded', url)
+
+
+def _range_start(response: aiohttp.ClientResponse) -> Optional[int]:
+    start = response.headers.get('Content-Range', '').removeprefix('bytes ').partition('-')[0]
+    return int(start) if start.isdigit() else None
+
+
+async def _read_file_blocks(filepath: AsyncPath) -> AsyncGenerator[bytes, None]:
+    f = await asyncio.to_thread(open, filepath, 'rb')
+    try:
+        while True:
+            block = await asyncio.to_thread(f.read, _BLOCK_SIZE)
+            if not block:
+                return
+            yield block
+    finally:
+        f.close()
+
+
+def _read_head(filepath: AsyncPath) -> bytes:
+    with open(filepath, 'rb') as f:
+        return f.read(MAGIC_SIZE)
+
+
+def _read_file_range(filepath: AsyncPath, start: int, end: int) -> bytes:
+    with open(filepath, 'rb') as f:
+        return os.pread(f.fileno(), max(0, end - start), start)
+
+
+class _MappedFile:
+    """
+    A read-only memory map of a local file. Lines are found by searching the mapped bytes and decoded straight from
+    views of them, so nothing is copied until a line is actually needed, and re-reading a file that is still in the
+    page cache doesn't touch the disk.
+    """
+
+    def __init__(self, path):
+        self._file = open(path, 'rb')
+        self.size = os.fstat(self._file.fileno()).st_size
+        # Empty files can't be mapped, but have nothing to read anyway
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ) if self.size else None
+        self.data = self._map if self._map is not None else b''
+        self.view = memoryview(self.data)
+
+    def __enter__(self) -> '_MappedFile':
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb) -> None:
+        self.close()
+
+    def close(self) -> None:
+        self.view.release()
+        if self._map is not None:
+            self._map.close()
+        self._file.close()
+
+
+class _CSVLines:
+    """
+    The lines of a mapped file, from offset up to end, for a csv reader. Lines are decoded a block at a time,
+    starting small so that reading a single row decodes little more than that row, and growing for scans.
+
+    The byte offsets of the lines are kept from the last one asked for onwards, so that the offset of the record
+    a reader is about to read is offset_of(reader.line_num).
+
+    Lines end at LF (which covers CRLF), or at CR in files whose first line ends with a lone CR.
+    """
+
+    def __init__(self, mapped: _MappedFile, encoding: str, offset: int = 0, end: Optional[int] = None):
+        self._data = mapped.data
+        self._view = mapped.view
+        if offset == 0 and codecs.lookup(encoding).name == 'utf-8-sig':
+            # The BOM is skipped here rather than by the codec, so that its bytes still count towards the offsets
+            # and a U+FEFF which happens to start a later block isn't dropped
+            if self._data[:len(codecs.BOM_UTF8)] == codecs.BOM_UTF8:
+                offset = len(codecs.BOM_UTF8)
+        self._encoding = _body_encoding(encoding)
+        self._newline = _line_break(self._data, mapped.size)
+        self._start = offset
+        self._end = mapped.size if end is None else end
+        self._first_line = 0
+        self._last_asked = 0
+        self._offsets = [offset]
+
+    def __iter__(self) -> Iterator[str]:
+        position = self._start
+        block_size = _FIRST_BLOCK_SIZE
+        while position < self._end:
+            # Blocks end on a newline, so that no line is split between them
+            block_end = min(position + block_size, self._end)
+            if block_end < self._end:
+                newline = self._data.rfind(self._newline, position, block_end)
+                if newline < 0:
+                    newline = self._data.find(self._newline, block_end, self._end)
+                block_end = self._end if newline < 0 else newline + 1
+            text = str(self._view[position:block_end], self._encoding)
+            newline = '\r' if self._newline == b'\r' else '\n'
+            lines = text.split(newline)
+            last_line = lines.pop()
+            lines = [line + newline for line in lines]
+            if last_line:
+                lines.append(last_line)
+            lengths = map(len, lines) if text.isascii() else (len(line.encode(self._encoding)) for line in lines)
+            # Offsets before the last one asked for are never needed again
+            del self._offsets[:self._last_asked - self._first_line]
+            self._first_line = self._last_asked
+            self._offsets.pop()
+            self._offsets.extend(accumulate(lengths, initial=position))
+            position = block_end
+            block_size = min(block_size * 4, _BLOCK_SIZE)
+            yield from lines
+
+    def offset_of(self, line_number: int) -> int:
+        """
+        Returns the byte offset of the line with the given (zero-based) number, which must not be before the last
+        one asked for.
+        """
+        self._last_asked = line_number
+        return self._offsets[line_number - self._first_line]
+
+
+def _body_encoding(encoding: str) -> str:
+    """
+    Returns the encoding of the text after any byte order mark, which is what blocks of it are decoded with.
+    """
+    return 'utf-8' if codecs.lookup(encoding).name == 'utf-8-sig' else encoding
+
+
+def _line_break(data, size: int) -> bytes:
+    """
+    Returns the byte that lines of the data end with: CR if the first line ends with a lone CR, otherwise LF.
+    """
+    lf = data.find(b'\n', 0, size)
+    cr = data.find(b'\r', 0, size if lf < 0 else lf)
+    if cr >= 0 and cr + 1 != lf:
+        return b'\r'
+    return b'\n'
+
+
+def _text_line_break(text: str) -> Optional[str]:
+    """
+    Returns the character that lines of the text end with, as _line_break does for bytes, or None if the text so
+    far doesn't show it yet.
+    """
+    lf = text.find('\n')
+    cr = text.find('\r', 0, len(text) if lf < 0 else lf)
+    if cr < 0:
+        return None if lf < 0 else '\n'
+    if cr + 1 == len(text):
+        # The next block may start with the LF of a CRLF
+        return None
+    return '\n' if cr + 1 == lf else '\r'
+
+
+def _read_csv_rows(reader: csv.DictReader, lines: _CSVLines,
+                   limit: Optional[int] = None) -> list[tuple[int, dict]]:
+    # Rows are built from the underlying reader the same way DictReader builds them, minus the per-row overhead
+    # of going through DictReader itself, which dominates the cost of a scan
+    fieldnames = reader.fieldnames
+    if fieldnames is None:
+        return []
+    width = len(fieldnames)
+    restkey, restval = reader.restkey, reader.restval
+    records = reader.reader
+    rows = []
+    while limit is None or len(rows) < limit:
+        offset = lines.offset_of(records.line_num)
+        record = next(records, None)
+        while record == []:
+            record = next(records, None)
+        if record is None:
+            break
+        row = dict(zip(fieldnames, record))
+        if len(record) > width:
+            row[restkey] = record[width:]
+        elif len(record) < width:
+            for key in fieldnames[len(record):]:
+                row[key] = restval
+        rows.append((offset, row))
+    return rows
+
+
+class _NeedMoreText(Exception):
+    pass
+
+
+class _CSVTextFeed:
+    """
+    Feeds lines to a csv reader from text that arrives a block at a time. If the reader runs out of lines partway
+    through a record, _NeedMoreText is raised and the record's lines are replayed once more text has been added,
+    since the reader can't pick up a record where it left off.
+    """
+
+    def __init__(self):
+        self._lines = deque()
+        self._partial_line = ''
+        self._record_lines = []
+        self._newline = None
+        self.closed = False
+
+    def __iter__(self) -> '_CSVTextFeed':
+        return self
+
+    def __next__(self) -> str:
+        if self._lines:
+            line = self._lines.popleft()
+            self._record_lines.append(line)
+            return line
+        if self.closed:
+            raise StopIteration
+        raise _NeedMoreText()
+
+    def add(self, text: str) -> None:
+        # As for _CSVLines, lines end at LF (which covers CRLF), or at CR if the first line ends with a lone CR.
+        # Text is held back until the first line break shows which.
+        text = self._partial_line + text
+        if self._newline is None:
+            self._newline = _text_line_break(text)
+            if self._newline is None:
+                self._partial_line = text
+                return
+        lines = text.split(self._newline)
+        self._partial_line = lines.pop()
+        self._lines.extend(line + self._newline for line in lines)
+
+    def close(self) -> None:
+        if self._newline is None:
+            self._newline = '\r' if '\r' in self._partial_line else '\n'
+            self.add('')
+        if self._partial_line:
+            self._lines.append(self._partial_line)
+            self._partial_line = ''
+        self.closed = True
+
+    def mark(self) -> None:
+        """
+        Marks the lines read so far as a complete record.
+        """
+        self._record_lines.clear()
+
+    def rewind(self) -> None:
+        """
+        Puts the lines of the incomplete record back, to be read again.
+        """
+        self._lines.extendleft(reversed(self._record_lines))
+        self._record_lines.clear()
+
+
+def _parse_csv_text(reader: csv.DictReader, feed: _CSVTextFeed) -> list[dict]:
+    rows = []
+    try:
+        # The header is read on its own first, so that it's never replayed as part of a row
+        _ = reader.fieldnames
+        feed.mark()
+        while True:
+            rows.append(next(reader))
+            feed.mark()
+    except _NeedMoreText:
+        feed.rewind()
+    except StopIteration:
+        pass
+    return rows
+
+
+class _BlockDecoder:
+    """
+    Decodes the blocks of a possibly compressed stream of bytes to text. If the compression is INFER, it is
+    recognized from the first bytes of the stream.
+    """
+
+    def __init__(self, encoding: str, compression: Optional[str]):
+        self._decoder = codecs.getincrementaldecoder(encoding)(errors='strict')
+        self._compression = compression
+        self._decompressor = None if compression in (None, INFER) else Decompressor(compression)
+        self._head = b''
+
+    def decode(self, block: bytes, final: bool = False) -> str:
+        if self._compression == INFER:
+            self._head += block
+            if len(self._head) < MAGIC_SIZE and not final:
+                return ''
+            block, self._head = self._head, b''
+            self._compression = compression_from_magic(block[:MAGIC_SIZE])
+            if self._compression is not None:
+                self._decompressor = Decompressor(self._compression)
+        if self._decompressor is not None:
+            block = self._decompressor.decompress(block)
+            if final:
+                self._decompressor.finish()
+        return self._decoder.decode(block, final)
+
+
+async def _stream_csv_text_batches(blocks: AsyncIterator[bytes], decoder: _BlockDecoder, batch_size: int,
+                                   csv_reader_kwargs: dict) -> AsyncGenerator[list[dict], None]:
+    feed = _CSVTextFeed()
+    reader = csv.DictReader(feed, **csv_reader_kwargs)
+    rows = []
+
+    def parse(block: bytes, final: bool = False) -> list[dict]:
+        feed.add(decoder.decode(block, final))
+        if final:
+            feed.close()
+        return _parse_csv_text(reader, feed)
+
+    async with aclosing(blocks):
+        async for block in blocks:
+            rows.extend(await asyncio.to_thread(parse, block))
+            while len(rows) >= batch_size:
+                yield rows[:batch_size]
+                del rows[:batch_size]
+    rows.extend(await asyncio.to_thread(parse, b'', True))
+    for start in range(0, len(rows), batch_size):
+        yield rows[start:start + batch_size]
+
+
+async def _stream_jsonl_text_batches(blocks: AsyncIterator[bytes], decoder: _BlockDecoder,
+                                     batch_size: int) -> AsyncGenerator[list, None]:
+    partial_line = ''
+    values = []
+
+    def parse(block: bytes, final: bool = False) -> list:
+        nonlocal partial_line
+        lines = (partial_line + decoder.decode(block, final)).split('\n')
+        partial_line = '' if final else lines.pop()
+        return [json.loads(line) for line in lines if line.strip()]
+
+    async with aclosing(blocks):
+        async for block in blocks:
+            values.extend(await asyncio.to_thread(parse, block))
+            while len(values) >= batch_size:
+                yield values[:batch_size]
+                del values[:batch_size]
+    values.extend(await asyncio.to_thread(parse, b'', True))
+    for start in range(0, len(values), batch_size):
+        yield values[start:start + batch_size]
+
+
+async def _rebatch(batches: AsyncIterator[list[T]], batch_size: int) -> AsyncGenerator[list[T], None]:
+    """
+    Yields the items of the batches in lists of batch_size items, except for the last.
+    """
+    buffer = []
+    async with aclosing(batches):
+        async for batch in batches:
+            buffer.extend(batch)
+            while len(buffer) >= batch_size:
+                yield buffer[:batch_size]
+                del buffer[:batch_size]
+    if buffer:
+        yield buffer
 
 
-    async def _stream_csv_filepath(self, filepath: AsyncPath, **csv_reader_kwargs):
-        async with filepath.open('r') as f:
-            async for row in aiocsv.AsyncDictReader(f, **csv_reader_kwargs):
-                yield row
+# The functions below run in worker processes, so they take paths rather than open files
 
 
-class AsyncTextReaderWrapper:
-    def __init__(self, obj, encoding, errors="strict"):
-        self.obj = obj
+def _parse_csv_range(path: str, start: int, end: int, encoding: str,
+                     csv_reader_kwargs: dict) -> list[tuple[int, dict]]:
+    with _MappedFile(path) as mapped:
+        lines = _CSVLines(mapped, encoding, start, end)
+        return _read_csv_rows(csv.DictReader(iter(lines), **csv_reader_kwargs), lines)
 
-        decoder_factory = codecs.getincrementaldecoder(encoding)
-        self.decoder = decoder_factory(errors)
 
-    async def read(self, size):
-        raw_data = await self.obj.read(size)
+def _count_bytes(path: str, start: int, end: int, byte: bytes) -> int:
+    count = 0
+    with open(path, 'rb') as f:
+        f.seek(start)
+        while start < end:
+            block = f.read(min(_BLOCK_SIZE, end - start))
+            if not block:
+                break
+            count += block.count(byte)
+            start += len(block)
+    return count
 
-        if not raw_data:
-            return self.decoder.decode(b"", final=True)
 
-        return self.decoder.decode(raw_data, final=False)
+def _record_starts(path: str, positions: list[int], parities: list[int], quotechar: Optional[bytes]) -> list[int]:
+    """
+    Returns, for each position, where the first record starting at or after it begins, given the parity of the
+    number of quote characters before the position.
+    """
+    starts = []
+    with open(path, 'rb') as f:
+        for position, parity in zip(positions, parities):
+            f.seek(position)
+            while True:
+                line = f.readline()
+                position += len(line)
+                if quotechar is not None:
+                    parity = (parity + line.count(quotechar)) % 2
+                if not line or parity == 0:
+                    break
+            starts.append(position)
+    return starts
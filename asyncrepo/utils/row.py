@@ -0,0 +1,53 @@
+from collections.abc import Mapping
+from typing import Any, Iterator, Sequence
+
+
+class Header:
+    """
+    The column names of a table, shared by every Row of it.
+    """
+
+    __slots__ = ('names', '_positions')
+
+    def __init__(self, names: Sequence[str]):
+        self.names = tuple(names)
+        # As when building a dict from the names, the last of any duplicate names wins
+        self._positions = {name: position for position, name in enumerate(self.names)}
+
+    def row(self, values: Sequence) -> 'Row':
+        return Row(self, tuple(values))
+
+    def compact(self, row: dict) -> Mapping:
+        """
+        Returns a Row with the values of a dict whose keys are exactly the header's names, in order (such as a row
+        from csv.DictReader), or the dict itself if they aren't (e.g. for a record with extra fields).
+        """
+        if len(row) == len(self.names) and tuple(row) == self.names:
+            return Row(self, tuple(row.values()))
+        return row
+
+
+class Row(Mapping):
+    """
+    A read-only mapping of a header's names to a row's values. Rows only hold a tuple of values and share their
+    header, so they take a fraction of the memory of a dict per row. Use dict(row) for a dict.
+    """
+
+    __slots__ = ('header', '_values')
+
+    def __init__(self, header: Header, values: tuple):
+        self.header = header
+        self._values = values
+
+    def __getitem__(self, name: str) -> Any:
+        return self._values[self.header._positions[name]]
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.header._positions)
+
+    def __len__(self) -> int:
+        return len(self.header._positions)
+
+    def __repr__(self) -> str:
+        # The same as the dict's, which naive search and indexing normalize
+        return repr(dict(self))
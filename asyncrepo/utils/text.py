@@ -1,5 +1,10 @@
+import re
 from typing import Any
 
+# Matches runs of anything str.isalnum() rejects (\w is alphanumerics plus the underscore)
+_NON_ALPHANUMERIC = re.compile(r'[\W_]+')
+_ALPHANUMERIC = re.compile(r'[^\W_]+')
+
 
 def matches(query: str, obj: Any) -> bool:
     """
@@ -10,6 +15,13 @@ def matches(query: str, obj: Any) -> bool:
 
 def normalized(text: str) -> str:
     """
-    Returns the given text normalized for comparison.
+    Returns the given text normalized for comparison: lowercase, with only alphanumeric characters kept.
+    """
+    return _NON_ALPHANUMERIC.sub('', text).lower()
+
+
+def tokens(text: str) -> list[str]:
+    """
+    Returns the words of the given text for indexing: lowercase runs of alphanumeric characters.
     """
-    return ''.join(c.lower() for c in text if c.isalnum())
+    return [token.lower() for token in _ALPHANUMERIC.findall(text)]
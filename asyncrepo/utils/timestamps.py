@@ -0,0 +1,37 @@
+import math
+import re
+from datetime import datetime, timezone
+
+# A UTC offset without a colon (e.g. +0000, as Jira writes them), which fromisoformat only accepts from Python 3.11
+_COMPACT_OFFSET = re.compile(r'([+-]\d{2})(\d{2})$')
+
+
+def parse_timestamp(text: str) -> datetime:
+    """
+    Returns the time of an ISO 8601 timestamp (such as the sources' "2022-05-01T10:20:30.000Z" or
+    "2022-05-01T10:20:30.000+0000"), in UTC. Timestamps without an offset are taken to be in UTC.
+    """
+    if text.endswith('Z'):
+        text = text[:-1] + '+00:00'
+    text = _COMPACT_OFFSET.sub(r'\1:\2', text)
+    parsed = datetime.fromisoformat(text)
+    if parsed.tzinfo is None:
+        return parsed.replace(tzinfo=timezone.utc)
+    return parsed.astimezone(timezone.utc)
+
+
+def format_timestamp(time: datetime) -> str:
+    """
+    Returns an ISO 8601 timestamp of a time, in UTC, which parse_timestamp reads back.
+    """
+    return time.astimezone(timezone.utc).isoformat()
+
+
+def minutes_since(time: datetime, margin: int = 1) -> int:
+    """
+    Returns the number of minutes from a time until now, rounded up, plus margin minutes to allow for clock skew
+    between here and a source. For queries relative to the source's own clock (e.g. JQL's "updated >= -15m"),
+    which unlike its absolute dates don't depend on the user's time zone.
+    """
+    elapsed = (datetime.now(timezone.utc) - time).total_seconds()
+    return max(math.ceil(elapsed / 60), 0) + margin
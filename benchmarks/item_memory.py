@@ -0,0 +1,67 @@
+"""
+Measures the memory held per listed item in bytes: items with a __dict__ holding a dict per row (as before),
+slotted items holding a dict per row, and slotted items holding Rows which share a single header (as CSVRows does
+now). Also lists a generated CSV file with CSVRows, with and without compact rows.
+
+Usage: python benchmarks/item_memory.py [items]
+"""
+import asyncio
+import gc
+import sys
+import tempfile
+import tracemalloc
+from pathlib import Path
+
+from asyncrepo.repositories.file.csv_rows import CSVRows
+from asyncrepo.repository import Item
+from asyncrepo.utils.row import Header
+
+ITEMS = int(sys.argv[1]) if len(sys.argv) > 1 else 200_000
+COLUMNS = ['date', 'county', 'state', 'fips', 'cases', 'deaths']
+
+
+class DictItem(Item):
+    # Without __slots__ of its own, a subclass gets a __dict__ per instance again
+    pass
+
+
+def record(i: int) -> list[str]:
+    return ['2020-03-01', f'County number {i}', 'New York', str(36000 + i % 1000), str(i * 7), str(i % 13)]
+
+
+def measure(label: str, build) -> None:
+    gc.collect()
+    tracemalloc.start()
+    items = build()
+    gc.collect()
+    used, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"{label:>22}: {used / len(items):>6,.0f} bytes/item")
+    del items
+
+
+def run_csv(path: str, compact: bool) -> list[Item]:
+    # The file is scanned first, so that the offsets CSVRows records for local files aren't counted
+    repository = CSVRows(path, page_size=1000, compact=compact)
+
+    async def listing() -> list[Item]:
+        await repository.get('0')
+        return [item async for item in repository.list()]
+
+    return asyncio.run(listing())
+
+
+if __name__ == '__main__':
+    print(f"{ITEMS:,} items of {len(COLUMNS)} columns")
+    header = Header(COLUMNS)
+    measure('dict items, dict rows', lambda: [DictItem(None, str(i), dict(zip(COLUMNS, record(i))))
+                                              for i in range(ITEMS)])
+    measure('slotted items, dicts', lambda: [Item(None, str(i), dict(zip(COLUMNS, record(i))))
+                                             for i in range(ITEMS)])
+    measure('slotted items, Rows', lambda: [Item(None, str(i), header.row(record(i))) for i in range(ITEMS)])
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = Path(directory) / 'rows.csv'
+        path.write_text(','.join(COLUMNS) + '\n' + ''.join(','.join(record(i)) + '\n' for i in range(ITEMS)))
+        measure('CSVRows, dicts', lambda: run_csv(str(path), False))
+        measure('CSVRows, compact', lambda: run_csv(str(path), True))
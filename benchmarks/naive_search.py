@@ -0,0 +1,82 @@
+"""
+Measures naive search throughput in items/sec through Repository.search, which re-lists the repository and
+builds fresh items for every query, so each document is still normalized once per query. Compares the old
+matching, which normalized the query and the document for every item with a per-character generator, against
+the current one (the query normalized once per search, the document with a regex).
+
+Usage: python benchmarks/naive_search.py [items] [queries]
+"""
+import asyncio
+import sys
+import time
+
+from asyncrepo.repository import Item, Page, Repository
+
+ITEMS = int(sys.argv[1]) if len(sys.argv) > 1 else 20_000
+QUERIES = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+PAGE_SIZE = 1000
+
+
+class DocumentsRepository(Repository):
+    """
+    An in-memory repository which, like the real ones, builds new items every time it's listed.
+    """
+
+    def __init__(self, documents: list[dict]):
+        self.documents = documents
+
+    async def list_page(self, start: int = 0) -> Page:
+        end = min(start + PAGE_SIZE, len(self.documents))
+        items = [Item(self, str(i), self.documents[i]) for i in range(start, end)]
+        next_page_fn = None
+        if end < len(self.documents):
+            async def next_page_fn() -> Page:
+                return await self.list_page(end)
+        return Page(self, items, next_page_fn)
+
+    async def get(self, id: str) -> Item:
+        return Item(self, id, self.documents[int(id)])
+
+
+def old_normalized(text: str) -> str:
+    return ''.join(c.lower() for c in text if c.isalnum())
+
+
+def old_matches(query: str, obj) -> bool:
+    return old_normalized(query) in old_normalized(str(obj))
+
+
+async def before(repository: Repository, query: str) -> int:
+    return sum([1 async for item in repository.list() if old_matches(query, item.document)])
+
+
+async def after(repository: Repository, query: str) -> int:
+    return len([item async for item in repository.search(query)])
+
+
+def make_documents() -> list[dict]:
+    return [{
+        'date': '2020-03-01',
+        'county': f'County number {i}',
+        'state': 'New York',
+        'cases': str(i * 7),
+        'deaths': str(i % 13),
+        'fips': str(36000 + i % 1000),
+    } for i in range(ITEMS)]
+
+
+async def run(label: str, search) -> None:
+    repository = DocumentsRepository(make_documents())
+    queries = [f'county number {i * 101}' for i in range(QUERIES)]
+    start = time.perf_counter()
+    hits = 0
+    for query in queries:
+        hits += await search(repository, query)
+    elapsed = time.perf_counter() - start
+    print(f"{label:>6}: {ITEMS * QUERIES / elapsed:>12,.0f} items/sec ({hits} hits)")
+
+
+if __name__ == '__main__':
+    print(f"{ITEMS:,} items, {QUERIES} queries")
+    asyncio.run(run('before', before))
+    asyncio.run(run('after', after))
@@ -2,10 +2,14 @@ import asyncio
 
 import pytest
 
+from asyncrepo.utils.http_client import connection_pool
+
 
 @pytest.fixture(autouse=True)
 async def fixture():
     yield
+    # Each test runs on its own event loop, so the pooled connections for it have to go with it
+    await connection_pool.close()
     # (Not so) graceful shutdown
     # https://docs.aiohttp.org/en/stable/client_advanced.html#graceful-shutdown
     await asyncio.sleep(2.5)
@@ -1,12 +1,13 @@
 import os
 
+import boto3
 import pytest
 import uuid
 
 from dotenv import load_dotenv
 
 from asyncrepo.repository import Page, Item, Repository
-from asyncrepo.exceptions import ItemNotFound
+from asyncrepo.exceptions import ItemNotFound, OperationNotSupported
 from asyncrepo.repositories.aws.s3_objects import S3Objects
 
 
@@ -82,3 +83,86 @@ async def test_search_page_not_found():
             total_buckets += 1
     assert total_pages == 1
     assert total_buckets == 0
+
+
+@pytest.mark.asyncio
+async def test_changes_since():
+    changes = get_repository().changes_since()
+    assert "hello_world_1.txt" in [item.id async for item in changes]
+    assert changes.cursor is not None
+    # Only the objects modified at the cursor itself are returned again
+    later = get_repository().changes_since(changes.cursor)
+    items = [item async for item in later]
+    assert all(item.document["LastModified"] == changes.cursor for item in items)
+    assert later.cursor == changes.cursor
+
+
+# The tests below run against a local moto server rather than AWS
+
+MOTO_BUCKET = "asyncrepo-test"
+# Spread over several prefixes, plus a few keys without a "/"
+MOTO_KEYS = sorted([f"logs/{day:02}/{n:03}.json" for day in range(1, 6) for n in range(23)]
+                   + [f"images/{n}.png" for n in range(7)] + ["readme.txt", "index.html", "zzz"])
+
+
+@pytest.fixture(scope="module")
+def moto_endpoint():
+    server_module = pytest.importorskip("moto.server")
+    server = server_module.ThreadedMotoServer(ip_address="127.0.0.1", port=0, verbose=False)
+    server.start()
+    host, port = server.get_host_and_port()
+    endpoint = f"http://{host}:{port}"
+    s3 = boto3.client("s3", endpoint_url=endpoint, aws_access_key_id="testing", aws_secret_access_key="testing",
+                      region_name="us-east-1")
+    s3.create_bucket(Bucket=MOTO_BUCKET)
+    for key in MOTO_KEYS:
+        s3.put_object(Bucket=MOTO_BUCKET, Key=key, Body=key.encode())
+    yield endpoint
+    server.stop()
+
+
+def get_moto_repository(endpoint):
+    return S3Objects(MOTO_BUCKET,
+                     aioboto_session_kwargs={"aws_access_key_id": "testing", "aws_secret_access_key": "testing",
+                                             "region_name": "us-east-1"},
+                     aioboto_client_kwargs={"endpoint_url": endpoint})
+
+
+@pytest.mark.asyncio
+async def test_list_pages_with_continuation_tokens(moto_endpoint):
+    async with get_moto_repository(moto_endpoint) as repository:
+        pages = [page async for page in repository.list_pages(MaxKeys=10)]
+        assert [item.id for page in pages for item in page] == MOTO_KEYS
+        assert [page.cursor is None for page in pages] == [False] * 12 + [True]
+        resumed = [page async for page in repository.list_pages(MaxKeys=10, resume_from=pages[4].cursor)]
+        assert [item.id for page in resumed for item in page] == MOTO_KEYS[50:]
+        assert [item.id async for item in repository.search("logs/03/", MaxKeys=10)] == [
+            f"logs/03/{n:03}.json" for n in range(23)]
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("split_points", [None, ["images/3.png", "logs/02/", "logs/04/022.json", "readme.txt"]])
+async def test_list_pages_in_shards(moto_endpoint, split_points):
+    async with get_moto_repository(moto_endpoint) as repository:
+        pages = [page async for page in repository.list_pages(concurrency=3, split_points=split_points, MaxKeys=10)]
+        keys = [item.id for page in pages for item in page]
+        assert sorted(keys) == MOTO_KEYS
+        assert all(len(page) <= 10 and page.cursor is None for page in pages)
+
+        items = [item async for item in repository.search("logs/", concurrency=2, fields=["Key"], MaxKeys=10)]
+        assert sorted(item.id for item in items) == [key for key in MOTO_KEYS if key.startswith("logs/")]
+        assert items[0].document == {"Key": items[0].id}
+
+        cursor = (await repository.list_page(MaxKeys=10)).cursor
+        with pytest.raises(OperationNotSupported):
+            await anext(repository.list_pages(concurrency=2, resume_from=cursor))
+
+
+@pytest.mark.asyncio
+async def test_changes_since_lists_in_shards(moto_endpoint):
+    async with get_moto_repository(moto_endpoint) as repository:
+        changes = repository.changes_since(concurrency=2, split_points=["logs/"])
+        assert sorted([item.id async for item in changes]) == MOTO_KEYS
+        later = repository.changes_since(changes.cursor, prefix="logs/")
+        assert all(item.id.startswith("logs/") for item in [item async for item in later])
+        assert later.cursor == changes.cursor
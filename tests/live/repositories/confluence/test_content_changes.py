@@ -0,0 +1,62 @@
+from typing import Callable, Optional
+from urllib.parse import parse_qs, urlparse
+
+import pytest
+
+from asyncrepo.repositories.confluence.pages import Pages
+from asyncrepo.utils.timestamps import format_timestamp, parse_timestamp
+
+
+def modified_at(minute: int) -> str:
+    return f'2022-05-01T10:{minute:02d}:00.000Z'
+
+
+class FakeConfluenceClient:
+    """
+    Searches content in memory, ordered by when it was last modified as the CQL asks (its filters are ignored),
+    and calls on_search with the number of searches so far after answering each one.
+    """
+
+    def __init__(self, content: dict[str, dict], on_search: Callable[[int], None]):
+        self.content = content
+        self.on_search = on_search
+        self.searches = 0
+
+    async def search(self, query: str = '', limit: int = 100, start: int = 0, expand=(),
+                     next_link: Optional[str] = None) -> dict:
+        if next_link is not None:
+            start = int(parse_qs(urlparse(next_link).query)['start'][0])
+        ordered = sorted(self.content.values(), key=lambda content: content['version']['when'],
+                         reverse='lastmodified DESC' in query)
+        data = {'results': [{'id': content['id'], 'version': dict(content['version'])}
+                            for content in ordered[start:start + limit]],
+                '_links': {}}
+        if start + limit < len(ordered):
+            data['_links']['next'] = f'/rest/api/content/search?start={start + limit}&limit={limit}'
+        self.searches += 1
+        self.on_search(self.searches)
+        return data
+
+
+@pytest.mark.asyncio
+async def test_changes_since_picks_up_content_modified_during_the_feed():
+    content = {str(id): {'id': str(id), 'version': {'when': modified_at(id)}} for id in range(6)}
+
+    def on_search(searches: int):
+        if searches == 1:
+            # Once the first page is out, modify a page which has already been returned and one which hasn't
+            content['5']['version']['when'] = modified_at(30)
+            content['1']['version']['when'] = modified_at(31)
+
+    repository = Pages('https://example.atlassian.net', 'username', 'token')
+    repository.confluence_client = FakeConfluenceClient(content, on_search)
+
+    changes = repository.changes_since(limit=2)
+    first = {item.id async for item in changes}
+    assert changes.cursor == format_timestamp(parse_timestamp(modified_at(5)))
+
+    changes = repository.changes_since(changes.cursor, limit=2)
+    second = {item.id async for item in changes}
+    assert {'1', '5'} <= second
+    assert first | second == set(content)
+    assert changes.cursor == format_timestamp(parse_timestamp(modified_at(31)))
@@ -70,6 +70,16 @@ async def test_list():
         assert str(known_page.id) in identifiers
 
 
+@pytest.mark.asyncio
+async def test_list_resumes_from_a_cursor():
+    pages = [page async for page in get_repository().list_pages(limit=2)]
+    assert pages[0].cursor is not None
+    assert pages[-1].cursor is None
+    resumed = [page async for page in get_repository().list_pages(limit=2, resume_from=pages[1].cursor)]
+    assert [item.id for page in resumed for item in page] == [item.id for page in pages[2:] for item in page]
+    assert [page.cursor for page in resumed] == [page.cursor for page in pages[2:]]
+
+
 @pytest.mark.asyncio
 async def test_get_when_identifier_id_exists():
     item = await get_repository().get(str(KNOWN_PAGES[0].id))
@@ -82,6 +92,40 @@ async def test_get_when_identifier_does_not_exist():
         await get_repository().get('1333337')
 
 
+@pytest.mark.asyncio
+@pytest.mark.flaky(reruns=5)
+async def test_get_many():
+    result = get_repository().get_many([str(known_page.id) for known_page in KNOWN_PAGES] + ['1333337'])
+    items = {item.id: item async for item in result}
+    for known_page in KNOWN_PAGES:
+        assert_item_matches_test_page(items[str(known_page.id)], known_page)
+    assert result.missing == ['1333337']
+
+
+@pytest.mark.asyncio
+async def test_bodies_are_loaded_on_demand():
+    repository = get_repository()
+    async for page in repository.list_pages(limit=5):
+        assert all('body' not in item.document and 'space' in item.document for item in page)
+        await page.load()
+        assert all('storage' in item.document['body'] for item in page)
+    item = await repository.get(str(KNOWN_PAGES[0].id))
+    assert not item.is_loaded
+    assert isinstance(await item.field('body.view.value'), str)
+    assert_item_matches_test_page(item, KNOWN_PAGES[0])
+
+
+@pytest.mark.asyncio
+async def test_fields_are_pushed_down():
+    repository = get_repository()
+    async for item in repository.list(fields=['body.storage']):
+        assert 'storage' in item.document['body']
+        assert 'view' not in item.document['body']
+    item = await repository.get(str(KNOWN_PAGES[0].id), fields=['space'])
+    assert_item_matches_test_page(item, KNOWN_PAGES[0])
+    assert 'space' in item.document
+
+
 @pytest.mark.asyncio
 @pytest.mark.flaky(reruns=5)
 async def test_search():
@@ -101,3 +145,14 @@ async def test_search():
         assert_item_matches_test_page(seen[str(test_item.id)], test_item)
 
     await asyncio.gather(*[assert_test_item_can_be_searched(t) for t in KNOWN_PAGES])
+
+
+@pytest.mark.asyncio
+async def test_changes_since():
+    changes = get_repository().changes_since()
+    identifiers = [item.id async for item in changes]
+    for known_page in KNOWN_PAGES:
+        assert str(known_page.id) in identifiers
+    later = get_repository().changes_since(changes.cursor)
+    assert len([item async for item in later]) < len(identifiers)
+    assert later.cursor == changes.cursor
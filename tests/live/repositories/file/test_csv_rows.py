@@ -1,5 +1,10 @@
+import asyncio
+import gzip
+import json
+
 import pytest
 
+from asyncrepo.exceptions import InvalidCursor, ItemNotFound
 from asyncrepo.repositories.file.csv_rows import CSVRows
 from asyncrepo.repository import Item, Page
 
@@ -54,3 +59,147 @@ async def test_can_search():
         if total_items == 10:
             break
     assert total_items == 10
+
+
+@pytest.mark.asyncio
+async def test_can_get_many_items_from_a_local_file(tmp_path):
+    filepath = tmp_path / 'numbers.csv'
+    filepath.write_text('number,square\n' + ''.join(f'{i},{i * i}\n' for i in range(100)))
+    repository = CSVRows(str(filepath), identifier='number', page_size=7)
+    result = repository.get_many(['42', '7', '1000'])
+    items = {item.id: item.document async for item in result}
+    assert items == {'42': {'number': '42', 'square': '1764'}, '7': {'number': '7', 'square': '49'}}
+    assert result.missing == ['1000']
+
+
+@pytest.mark.asyncio
+async def test_can_get_items_from_a_local_file_by_offset(tmp_path):
+    filepath = tmp_path / 'notes.csv'
+    filepath.write_text('key,note\n' + ''.join(f'k{i},"line one\nline ""{i}"""\n' for i in range(100)))
+    index_path = tmp_path / 'notes.csv.offsets'
+    repository = CSVRows(str(filepath), identifier='key', offset_index_path=str(index_path))
+    item = await repository.get('k42')
+    assert item.document == {'key': 'k42', 'note': 'line one\nline "42"'}
+    assert index_path.exists()
+    with pytest.raises(ItemNotFound):
+        await repository.get('k100')
+
+    # A new repository reads the saved offsets rather than scanning the file again
+    repository = CSVRows(str(filepath), identifier='key', offset_index_path=str(index_path))
+    repository.streamer.stream_csv_offsets = None
+    assert (await repository.get('k99')).document['note'] == 'line one\nline "99"'
+
+
+@pytest.mark.asyncio
+async def test_concurrent_offset_index_saves_do_not_clash(tmp_path):
+    filepath = tmp_path / 'numbers.csv'
+    filepath.write_text('number\n' + ''.join(f'{i}\n' for i in range(20000)))
+    index_path = str(tmp_path / 'numbers.csv.offsets')
+    repositories = [CSVRows(str(filepath), offset_index_path=index_path) for _ in range(4)]
+    items = await asyncio.gather(*[repository.get('19999') for repository in repositories])
+    assert all(item.document == {'number': '19999'} for item in items)
+    assert list(tmp_path.glob('*.tmp')) == []
+    repository = CSVRows(str(filepath), offset_index_path=index_path)
+    repository.streamer.stream_csv_offset_batches = None
+    assert (await repository.get('12345')).document == {'number': '12345'}
+
+
+@pytest.mark.asyncio
+async def test_offsets_are_rebuilt_when_the_file_changes(tmp_path):
+    filepath = tmp_path / 'numbers.csv'
+    filepath.write_text('number\n' + ''.join(f'{i}\n' for i in range(10)))
+    repository = CSVRows(str(filepath), offset_index_path=str(tmp_path / 'numbers.csv.offsets'))
+    assert len([item async for item in repository.list()]) == 10
+    assert (await repository.get('9')).document == {'number': '9'}
+
+    filepath.write_text('number\n' + ''.join(f'{i * 2}\n' for i in range(20)))
+    assert (await repository.get('19')).document == {'number': '38'}
+    repository = CSVRows(str(filepath), offset_index_path=str(tmp_path / 'numbers.csv.offsets'))
+    assert (await repository.get('9')).document == {'number': '18'}
+
+
+@pytest.mark.asyncio
+async def test_can_get_items_from_a_compressed_local_file(tmp_path):
+    filepath = tmp_path / 'numbers.csv.gz'
+    filepath.write_bytes(gzip.compress(('number,square\n' + ''.join(f'{i},{i * i}\n' for i in range(100))).encode()))
+    repository = CSVRows(str(filepath), identifier='number', page_size=7)
+    assert len([item async for item in repository.list()]) == 100
+    assert (await repository.get('42')).document == {'number': '42', 'square': '1764'}
+    with pytest.raises(ItemNotFound):
+        await repository.get('100')
+
+
+@pytest.mark.asyncio
+async def test_can_select_columns(tmp_path):
+    filepath = tmp_path / 'numbers.csv'
+    filepath.write_text('number,square,cube\n' + ''.join(f'{i},{i * i},{i ** 3}\n' for i in range(100)))
+    repository = CSVRows(str(filepath), identifier='number', page_size=7)
+    items = [item async for item in repository.list(fields=['cube', 'missing'])]
+    assert [item.id for item in items] == [str(i) for i in range(100)]
+    assert items[5].document == {'cube': '125'}
+    assert (await repository.get('9', fields=['square'])).document == {'square': '81'}
+    result = repository.get_many(['3', '4'], fields=['number', 'square'])
+    assert {item.id: item.document async for item in result} == {'3': {'number': '3', 'square': '9'},
+                                                                  '4': {'number': '4', 'square': '16'}}
+    # Searches still match every column
+    items = [item async for item in repository.search('9261', fields=['number'])]
+    assert [item.document for item in items] == [{'number': '21'}]
+
+
+@pytest.mark.asyncio
+async def test_column_names_with_dots_are_selected_literally(tmp_path):
+    filepath = tmp_path / 'dotted.csv'
+    filepath.write_text('id,a.b\n' + ''.join(f'{i},value {i}\n' for i in range(10)))
+    repository = CSVRows(str(filepath), identifier='id')
+    listed = [item.document async for item in repository.list(fields=['a.b'])]
+    assert listed[3] == {'a.b': 'value 3'}
+    assert [item.document async for item in repository.search('value 3', fields=['a.b'])] == [{'a.b': 'value 3'}]
+    assert (await repository.get('3', fields=['a.b'])).document == {'a.b': 'value 3'}
+
+
+@pytest.mark.asyncio
+async def test_listed_rows_are_dicts_like_gotten_ones(tmp_path):
+    filepath = tmp_path / 'numbers.csv'
+    filepath.write_text('number,square\n' + ''.join(f'{i},{i * i}\n' for i in range(30)))
+    repository = CSVRows(str(filepath), page_size=7)
+    items = [item async for item in repository.list()]
+    assert all(type(item.document) is dict for item in items)
+    assert json.loads(json.dumps(items[3].document)) == (await repository.get('3')).document
+
+
+@pytest.mark.asyncio
+async def test_listed_rows_share_the_header(tmp_path):
+    filepath = tmp_path / 'numbers.csv'
+    filepath.write_text('number,square\n' + ''.join(f'{i},{i * i}\n' for i in range(30)) + '30\n31,961,extra\n')
+    items = [item async for item in CSVRows(str(filepath), page_size=7, compact=True).list()]
+    assert [item.document for item in items] == [item.document async for item in CSVRows(str(filepath)).list()]
+    assert len({id(item.document.header) for item in items[:30]}) == 1
+    # Missing fields are None as usual, and rows with extra fields are kept as dicts
+    assert items[30].document == {'number': '30', 'square': None}
+    assert items[31].document == {'number': '31', 'square': '961', None: ['extra']}
+    assert isinstance(items[31].document, dict)
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("filename", ['numbers.csv', 'numbers.csv.gz'])
+async def test_can_resume_listing_from_a_cursor(tmp_path, filename):
+    filepath = tmp_path / filename
+    data = ('number,note\n' + ''.join(f'{i},"line\n{i}"\n' for i in range(30))).encode()
+    filepath.write_bytes(gzip.compress(data) if filename.endswith('.gz') else data)
+    pages = [page async for page in CSVRows(str(filepath), page_size=7).list_pages()]
+    assert [page.cursor is None for page in pages] == [False] * 4 + [True]
+
+    resumed = [page async for page in CSVRows(str(filepath), page_size=7).list_pages(resume_from=pages[2].cursor)]
+    assert [item.id for page in resumed for item in page] == [str(i) for i in range(21, 30)]
+    assert [item.document['note'] for page in resumed for item in page] == [f'line\n{i}' for i in range(21, 30)]
+    assert [page.cursor for page in resumed] == [page.cursor for page in pages[3:]]
+
+
+@pytest.mark.asyncio
+async def test_cursors_of_a_local_file_are_invalid_once_it_changes(tmp_path):
+    filepath = tmp_path / 'numbers.csv'
+    filepath.write_text('number\n' + ''.join(f'{i}\n' for i in range(30)))
+    page = await CSVRows(str(filepath), page_size=7).list_page()
+    filepath.write_text('number\n' + ''.join(f'{i}\n' for i in range(40)))
+    with pytest.raises(InvalidCursor):
+        await anext(CSVRows(str(filepath), page_size=7).list_pages(resume_from=page.cursor))
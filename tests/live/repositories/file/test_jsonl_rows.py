@@ -0,0 +1,65 @@
+import gzip
+import json
+
+import pytest
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+
+from asyncrepo.exceptions import ItemNotFound
+from asyncrepo.repositories.file.jsonl_rows import JSONLRows
+
+ROWS = [{'id': i, 'name': f'row {i}', 'tags': ['even'] if i % 2 == 0 else [], 'score': i / 4} for i in range(50)]
+
+
+def jsonl(rows: list) -> bytes:
+    # With a blank line and no trailing newline, both of which are allowed
+    return ('\n'.join(json.dumps(row) for row in rows[:10]) + '\n\n'
+            + '\n'.join(json.dumps(row) for row in rows[10:])).encode()
+
+
+@pytest.mark.asyncio
+async def test_can_list_and_get_rows_from_a_local_file(tmp_path):
+    filepath = tmp_path / 'rows.jsonl'
+    filepath.write_bytes(jsonl(ROWS))
+    repository = JSONLRows(str(filepath), page_size=7)
+    pages = [page async for page in repository.list_pages()]
+    assert [len(page) for page in pages] == [7] * 7 + [1]
+    assert [item.document for page in pages for item in page] == ROWS
+    assert [item.id for page in pages for item in page] == [str(i) for i in range(50)]
+
+    repository = JSONLRows(str(filepath), identifier='name')
+    assert (await repository.get('row 42')).document == ROWS[42]
+    with pytest.raises(ItemNotFound):
+        await repository.get('row 50')
+    result = repository.get_many(['row 3', 'row 4', 'row 99'])
+    assert {item.id async for item in result} == {'row 3', 'row 4'}
+    assert result.missing == ['row 99']
+
+    assert (await repository.get('row 8', fields=['score', 'tags'])).document == {'score': 2.0, 'tags': ['even']}
+    assert [item.document async for item in repository.list(fields=['id'])] == [{'id': i} for i in range(50)]
+
+
+@pytest.mark.asyncio
+async def test_can_list_rows_from_a_compressed_url():
+    async def handler(request):
+        return web.Response(body=gzip.compress(jsonl(ROWS)))
+
+    app = web.Application()
+    app.router.add_get('/rows.jsonl.gz', handler)
+    async with TestServer(app) as server:
+        repository = JSONLRows(str(server.make_url('/rows.jsonl.gz')), identifier=('id', 'name'), page_size=20)
+        items = [item async for item in repository.list()]
+    assert [item.document for item in items] == ROWS
+    assert items[3].id == str((3, 'row 3'))
+
+
+@pytest.mark.asyncio
+async def test_can_resume_listing_from_a_cursor(tmp_path):
+    filepath = tmp_path / 'rows.jsonl'
+    filepath.write_bytes(jsonl(ROWS))
+    pages = [page async for page in JSONLRows(str(filepath), page_size=7).list_pages()]
+    resumed = [page async for page in JSONLRows(str(filepath), page_size=7).list_pages(resume_from=pages[3].cursor)]
+    assert [len(page) for page in resumed] == [7] * 3 + [1]
+    assert [item.document for page in resumed for item in page] == ROWS[28:]
+    assert [item.id for page in resumed for item in page] == [str(i) for i in range(28, 50)]
+    assert [page.cursor for page in resumed] == [page.cursor for page in pages[4:]]
@@ -0,0 +1,117 @@
+import asyncio
+import gc
+from contextlib import aclosing
+
+import pytest
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+
+from asyncrepo.exceptions import ItemNotFound
+from asyncrepo.repositories.file.parquet_rows import ParquetRows
+from asyncrepo.repositories.file.rows import INDEX
+
+pa = pytest.importorskip('pyarrow')
+pq = pytest.importorskip('pyarrow.parquet')
+
+ROWS = [{'key': f'k{i}', 'number': i, 'ratio': i / 8, 'note': 'x' * (i % 7), 'flag': i % 3 == 0} for i in range(95)]
+
+
+@pytest.fixture
+def parquet_path(tmp_path):
+    filepath = tmp_path / 'rows.parquet'
+    pq.write_table(pa.Table.from_pylist(ROWS), filepath, row_group_size=30)
+    return filepath
+
+
+@pytest.mark.asyncio
+async def test_can_list_pages_across_row_groups(parquet_path):
+    repository = ParquetRows(str(parquet_path), page_size=20)
+    pages = [page async for page in repository.list_pages()]
+    assert [len(page) for page in pages] == [20] * 4 + [15]
+    assert [item.document for page in pages for item in page] == ROWS
+    assert [item.id for page in pages for item in page] == [str(i) for i in range(95)]
+
+
+@pytest.mark.asyncio
+async def test_listing_closes_the_file_when_stopped_early(parquet_path, monkeypatch):
+    repository = ParquetRows(str(parquet_path), page_size=20)
+    opened = []
+    open_file = repository._open
+
+    async def recording_open():
+        opened.append(await open_file())
+        return opened[-1]
+
+    monkeypatch.setattr(repository, '_open', recording_open)
+    assert len([item async for item in repository.list()]) == len(ROWS)
+    assert opened[0].closed
+
+    async with aclosing(repository.list()) as items:
+        async for _ in items:
+            break
+    gc.collect()
+    await asyncio.sleep(0.01)
+    assert opened[1].closed
+
+
+@pytest.mark.asyncio
+async def test_can_resume_listing_from_a_cursor(parquet_path):
+    pages = [page async for page in ParquetRows(str(parquet_path), page_size=25).list_pages()]
+    # The cursor after the second page is partway through the second row group
+    resumed = [page async for page in ParquetRows(str(parquet_path), page_size=25).list_pages(
+        resume_from=pages[1].cursor)]
+    assert [item.document for page in resumed for item in page] == ROWS[50:]
+    assert [item.id for page in resumed for item in page] == [str(i) for i in range(50, 95)]
+    assert [page.cursor for page in resumed] == [page.cursor for page in pages[2:]]
+    assert resumed[-1].cursor is None
+
+
+@pytest.mark.asyncio
+async def test_only_reads_projected_columns(parquet_path):
+    repository = ParquetRows(str(parquet_path), identifier='key', columns=['number'])
+    items = [item async for item in repository.list()]
+    assert [item.document for item in items] == [{'number': row['number'], 'key': row['key']} for row in ROWS]
+    assert (await repository.get('k64')).document == {'number': 64, 'key': 'k64'}
+
+    # Fields are read in place of the repository's columns
+    items = [item async for item in repository.list(fields=['flag'])]
+    assert [item.document for item in items] == [{'flag': row['flag'], 'key': row['key']} for row in ROWS]
+    assert (await repository.get('k64', fields=['ratio'])).document == {'ratio': 8.0, 'key': 'k64'}
+    result = repository.get_many(['k1', 'k2'], fields=['note'])
+    assert [item.document async for item in result] == [{'note': 'x', 'key': 'k1'}, {'note': 'xx', 'key': 'k2'}]
+    # Searches select the same columns, after matching on the whole row
+    items = [item async for item in ParquetRows(str(parquet_path), identifier='key').search('k64', fields=['flag'])]
+    assert [item.document for item in items] == [{'flag': ROWS[64]['flag'], 'key': 'k64'}]
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("identifier", [INDEX, 'key', ('number', INDEX)])
+async def test_can_get_rows(parquet_path, identifier):
+    repository = ParquetRows(str(parquet_path), identifier=identifier)
+    ids = [item.id async for item in repository.list()]
+    for i in [0, 29, 30, 94]:
+        assert (await repository.get(ids[i])).document == ROWS[i]
+    with pytest.raises(ItemNotFound):
+        await repository.get('k95' if identifier == 'key' else '95')
+    result = repository.get_many([ids[94], ids[1], 'missing'])
+    assert [item.document async for item in result] == [ROWS[94], ROWS[1]]
+    assert result.missing == ['missing']
+
+
+@pytest.mark.asyncio
+async def test_can_read_a_url_with_range_requests(parquet_path):
+    ranges = []
+
+    async def handler(request):
+        if request.method == 'GET':
+            ranges.append(request.headers.get('Range'))
+        return web.FileResponse(parquet_path)
+
+    app = web.Application()
+    app.router.add_get('/rows.parquet', handler)
+    async with TestServer(app) as server:
+        repository = ParquetRows(str(server.make_url('/rows.parquet')), identifier='key', columns=['ratio'])
+        items = [item async for item in repository.list()]
+        assert [item.document for item in items] == [{'ratio': row['ratio'], 'key': row['key']} for row in ROWS]
+        assert (await repository.get('k77')).document == {'ratio': ROWS[77]['ratio'], 'key': 'k77'}
+    assert ranges and None not in ranges
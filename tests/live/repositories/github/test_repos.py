@@ -48,6 +48,15 @@ async def test_list():
         assert known_repository in identifiers
 
 
+@pytest.mark.asyncio
+async def test_list_resumes_from_a_cursor():
+    pages = [page async for page in get_repository().list_pages(per_page=2)]
+    assert pages[0].cursor is not None
+    assert pages[-1].cursor is None
+    resumed = [page async for page in get_repository().list_pages(resume_from=pages[0].cursor)]
+    assert [item.id for page in resumed for item in page] == [item.id for page in pages[1:] for item in page]
+
+
 @pytest.mark.asyncio
 async def test_get_when_identifier_exists():
     item = await get_repository().get(KNOWN_REPOSITORIES[0])
@@ -92,3 +101,14 @@ async def test_get_async_is_faster():
     # Finally, we'll check that the asyncio.gather() is at least faster than the sequential version.
     n_times_faster = average_sync / average_async
     assert n_times_faster > 1
+
+
+@pytest.mark.asyncio
+async def test_changes_since():
+    changes = get_repository().changes_since()
+    identifiers = [item.id async for item in changes]
+    for known_repository in KNOWN_REPOSITORIES:
+        assert known_repository in identifiers
+    later = get_repository().changes_since(changes.cursor)
+    assert len([item async for item in later]) < len(identifiers)
+    assert later.cursor == changes.cursor
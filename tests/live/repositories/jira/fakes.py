@@ -0,0 +1,27 @@
+from typing import Callable
+
+
+def updated_at(minute: int) -> str:
+    return f'2022-05-01T10:{minute:02d}:00.000+0000'
+
+
+class FakeJiraClient:
+    """
+    Searches issues in memory, ordered by when they were updated as the JQL asks (its filters are ignored), and
+    calls on_search with the number of searches so far after answering each one.
+    """
+
+    def __init__(self, issues: dict[str, dict], on_search: Callable[[int], None]):
+        self.issues = issues
+        self.on_search = on_search
+        self.searches = 0
+
+    async def search(self, query: str = '', max_results: int = 100, start_at: int = 0, **kwargs) -> dict:
+        ordered = sorted(self.issues.values(), key=lambda issue: issue['fields']['updated'],
+                         reverse='updated DESC' in query)
+        data = {'issues': [{'id': issue['id'], 'fields': dict(issue['fields'])}
+                           for issue in ordered[start_at:start_at + max_results]],
+                'startAt': start_at, 'maxResults': max_results, 'total': len(ordered)}
+        self.searches += 1
+        self.on_search(self.searches)
+        return data
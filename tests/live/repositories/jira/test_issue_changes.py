@@ -0,0 +1,29 @@
+import pytest
+
+from asyncrepo.repositories.jira.issues import Issues
+from asyncrepo.utils.timestamps import format_timestamp, parse_timestamp
+from tests.live.repositories.jira.fakes import FakeJiraClient, updated_at
+
+
+@pytest.mark.asyncio
+async def test_changes_since_picks_up_issues_updated_during_the_feed():
+    issues = {str(id): {'id': str(id), 'fields': {'updated': updated_at(id)}} for id in range(6)}
+
+    def on_search(searches: int):
+        if searches == 1:
+            # Once the first page is out, update an issue which has already been returned and one which hasn't
+            issues['5']['fields']['updated'] = updated_at(30)
+            issues['1']['fields']['updated'] = updated_at(31)
+
+    repository = Issues('https://jira.example.com', 'username', 'token')
+    repository.jira_client = FakeJiraClient(issues, on_search)
+
+    changes = repository.changes_since(max_results=2)
+    first = {item.id async for item in changes}
+    assert changes.cursor == format_timestamp(parse_timestamp(updated_at(5)))
+
+    changes = repository.changes_since(changes.cursor, max_results=2)
+    second = {item.id async for item in changes}
+    assert {'1', '5'} <= second
+    assert first | second == set(issues)
+    assert changes.cursor == format_timestamp(parse_timestamp(updated_at(31)))
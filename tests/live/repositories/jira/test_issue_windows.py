@@ -0,0 +1,27 @@
+import pytest
+
+from asyncrepo.repositories.jira.issues import Issues
+from tests.live.repositories.jira.fakes import FakeJiraClient, updated_at
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("concurrency", [None, 3])
+async def test_positional_search_args_are_passed_to_jira(concurrency):
+    issues = {str(id): {'id': str(id), 'fields': {'updated': updated_at(id)}} for id in range(7)}
+    repository = Issues('https://jira.example.com', 'username', 'token')
+    repository.jira_client = FakeJiraClient(issues, lambda searches: None)
+
+    # max_results is the search's first argument after the query
+    pages = [page async for page in repository.list_pages(2, concurrency=concurrency)]
+    assert [len(page) for page in pages] == [2, 2, 2, 1]
+    assert sorted(item.id for page in pages for item in page) == sorted(issues)
+
+
+@pytest.mark.asyncio
+async def test_prefetch_cannot_be_combined_with_concurrency():
+    repository = Issues('https://jira.example.com', 'username', 'token')
+    repository.jira_client = FakeJiraClient({}, lambda searches: None)
+    with pytest.raises(ValueError):
+        [page async for page in repository.list_pages(concurrency=3, prefetch=2)]
+    with pytest.raises(ValueError):
+        [page async for page in repository.search_pages('query', concurrency=3, prefetch=2)]
@@ -62,6 +62,33 @@ async def test_list():
         assert str(known_issue.id) in identifiers
 
 
+@pytest.mark.asyncio
+@pytest.mark.parametrize("ordered", [True, False])
+async def test_list_concurrently(ordered: bool):
+    serial_identifiers = [item.id async for item in get_repository().list(max_results=2)]
+    total_pages = 0
+    identifiers = []
+    async for page in get_repository().list_pages(max_results=2, concurrency=2, ordered=ordered):
+        total_pages += 1
+        assert isinstance(page, Page)
+        identifiers.extend(item.id for item in page.items)
+    assert total_pages == ceil(len(KNOWN_ISSUES) / 2)
+    if ordered:
+        assert identifiers == serial_identifiers
+    else:
+        assert sorted(identifiers) == sorted(serial_identifiers)
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("concurrency", [None, 2])
+async def test_list_resumes_from_a_cursor(concurrency):
+    pages = [page async for page in get_repository().list_pages(max_results=2)]
+    assert pages[0].cursor is not None
+    assert pages[-1].cursor is None
+    resumed = get_repository().list_pages(max_results=2, concurrency=concurrency, resume_from=pages[0].cursor)
+    assert [item.id async for page in resumed for item in page] == [item.id for page in pages[1:] for item in page]
+
+
 @pytest.mark.asyncio
 async def test_get_when_identifier_id_exists():
     item = await get_repository().get(str(KNOWN_ISSUES[0].id))
@@ -80,6 +107,27 @@ async def test_get_when_identifier_does_not_exist():
         await get_repository().get('AS-0')
 
 
+@pytest.mark.asyncio
+async def test_get_many():
+    ids_and_keys = [str(KNOWN_ISSUES[0].id), KNOWN_ISSUES[1].key, 'AS-0']
+    result = get_repository().get_many(ids_and_keys)
+    items = {item.id: item async for item in result}
+    assert set(items) == {str(KNOWN_ISSUES[0].id), str(KNOWN_ISSUES[1].id)}
+    for known_issue in KNOWN_ISSUES[:2]:
+        assert_item_matches_test_issue(items[str(known_issue.id)], known_issue)
+    assert result.missing == ['AS-0']
+
+
+@pytest.mark.asyncio
+async def test_fields_are_pushed_down():
+    repository = get_repository()
+    async for item in repository.list(fields=['summary']):
+        assert set(item.document['fields']) == {'summary'}
+    item = await repository.get(str(KNOWN_ISSUES[0].id), fields=['summary'])
+    assert_item_matches_test_issue(item, KNOWN_ISSUES[0])
+    assert set(item.document['fields']) == {'summary'}
+
+
 @pytest.mark.asyncio
 async def test_search():
     repository = get_repository()
@@ -97,3 +145,13 @@ async def test_search():
         assert total_items == 1
 
     await asyncio.gather(*[assert_test_item_can_be_searched(test_item) for test_item in KNOWN_ISSUES])
+
+
+@pytest.mark.asyncio
+async def test_changes_since():
+    changes = get_repository().changes_since(max_results=2)
+    identifiers = [item.id async for item in changes]
+    assert sorted(identifiers) == sorted(str(known_issue.id) for known_issue in KNOWN_ISSUES)
+    later = get_repository().changes_since(changes.cursor, fields=['summary'])
+    assert len([item async for item in later]) < len(identifiers)
+    assert later.cursor == changes.cursor
@@ -0,0 +1,79 @@
+import asyncio
+from typing import Optional, Sequence
+
+import pytest
+
+from asyncrepo.cache import CachedRepository
+from asyncrepo.exceptions import ItemNotFound
+from asyncrepo.repository import Item
+from tests.live.test_repository import NumbersRepository
+
+
+class CountingRepository(NumbersRepository):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.gets = 0
+
+    async def get(self, id: str, fields: Optional[Sequence[str]] = None) -> Item:
+        self.gets += 1
+        await asyncio.sleep(0.01)
+        return (await super().get(id)).project(fields)
+
+
+@pytest.mark.asyncio
+async def test_concurrent_gets_share_one_call():
+    repository = CountingRepository()
+    cached = CachedRepository(repository)
+    items = await asyncio.gather(*[cached.get("7") for _ in range(20)])
+    assert all(item.id == "7" for item in items)
+    assert repository.gets == 1
+    assert (await cached.get("7")).id == "7"
+    assert repository.gets == 1
+
+
+@pytest.mark.asyncio
+async def test_gets_with_fields_are_cached_separately():
+    repository = CountingRepository()
+    cached = CachedRepository(repository)
+    assert (await cached.get("7", fields=['number'])).document == {'number': 7}
+    assert (await cached.get("7", fields=['missing'])).document == {}
+    assert (await cached.get("7", fields=['number'])).document == {'number': 7}
+    assert repository.gets == 2
+
+
+@pytest.mark.asyncio
+async def test_items_expire_and_are_evicted():
+    repository = CountingRepository()
+    cached = CachedRepository(repository, ttl=0.05, max_size=2)
+    await cached.get("1")
+    await cached.get("2")
+    await cached.get("3")
+    await cached.get("1")  # Evicted by 3
+    assert repository.gets == 4
+    await cached.get("3")
+    assert repository.gets == 4
+    await asyncio.sleep(0.06)
+    await cached.get("3")
+    assert repository.gets == 5
+
+
+@pytest.mark.asyncio
+async def test_missing_items_are_remembered():
+    repository = CountingRepository()
+    cached = CachedRepository(repository, negative_ttl=60)
+    for _ in range(3):
+        with pytest.raises(ItemNotFound):
+            await cached.get("not-a-number")
+    assert repository.gets == 1
+    cached.invalidate("not-a-number")
+    with pytest.raises(ItemNotFound):
+        await cached.get("not-a-number")
+    assert repository.gets == 2
+
+
+@pytest.mark.asyncio
+async def test_everything_else_is_passed_through():
+    cached = CachedRepository(NumbersRepository())
+    assert len([item async for item in cached.list()]) == 50
+    assert [item.id async for item in cached.search("42")] == ["42"]
+    assert cached.page_size == 10
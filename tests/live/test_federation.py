@@ -0,0 +1,83 @@
+import asyncio
+import time
+
+import pytest
+
+from asyncrepo.federation import Federation
+from asyncrepo.repository import Item, Page
+from tests.live.test_repository import NumbersRepository
+
+
+class FailingRepository(NumbersRepository):
+    """
+    A repository of numbers whose third page fails to load.
+    """
+
+    async def list_page(self, start: int = 0) -> Page:
+        if start >= 2 * self.page_size:
+            raise ConnectionError("The source went away")
+        return await super().list_page(start)
+
+
+class TimingOutRepository(NumbersRepository):
+    """
+    A repository of numbers whose third page times out on its own.
+    """
+
+    async def list_page(self, start: int = 0) -> Page:
+        if start >= 2 * self.page_size:
+            raise asyncio.TimeoutError()
+        return await super().list_page(start)
+
+
+@pytest.mark.asyncio
+async def test_search_combines_every_repository():
+    first, second = NumbersRepository(total=20), NumbersRepository(total=30)
+    items = [item async for item in Federation(first, second).search("1")]
+    assert all(isinstance(item, Item) for item in items)
+    assert sorted(item.id for item in items if item.repository is first) == ["1", "10", "11", "12", "13", "14",
+                                                                               "15", "16", "17", "18", "19"]
+    assert sorted(item.id for item in items if item.repository is second) == ["1", "10", "11", "12", "13", "14",
+                                                                                "15", "16", "17", "18", "19", "21"]
+
+
+@pytest.mark.asyncio
+async def test_slow_repository_does_not_hold_back_fast_ones():
+    fast, slow = NumbersRepository(delay=0), NumbersRepository(delay=0.5)
+    start = time.monotonic()
+    async for page in Federation(slow, fast).list_pages():
+        assert isinstance(page, Page)
+        if page.repository is fast:
+            assert time.monotonic() - start < 0.5
+        else:
+            break
+
+
+@pytest.mark.asyncio
+async def test_repository_exceeding_its_timeout_is_skipped():
+    fast, slow = NumbersRepository(delay=0), NumbersRepository(delay=0.2)
+    federation = Federation(fast, slow, timeouts={slow: 0.3})
+    with pytest.warns(UserWarning, match="NumbersRepository did not finish"):
+        items = [item async for item in federation.list()]
+    assert len([item for item in items if item.repository is fast]) == 50
+    assert len([item for item in items if item.repository is slow]) == 10
+
+
+@pytest.mark.asyncio
+async def test_failing_repository_is_skipped():
+    working, failing = NumbersRepository(delay=0.01), FailingRepository()
+    with pytest.warns(UserWarning, match="FailingRepository failed with ConnectionError"):
+        items = [item async for item in Federation(failing, working).list()]
+    assert len([item for item in items if item.repository is working]) == 50
+    assert len([item for item in items if item.repository is failing]) == 20
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("timeout", [None, 10])
+async def test_repository_timing_out_on_its_own_is_a_failure(timeout):
+    working, timing_out = NumbersRepository(), TimingOutRepository()
+    with pytest.warns(UserWarning, match="TimingOutRepository failed with TimeoutError") as warned:
+        items = [item async for item in Federation(timing_out, working, timeout=timeout).list()]
+    assert not [warning for warning in warned if 'did not finish' in str(warning.message)]
+    assert len([item for item in items if item.repository is working]) == 50
+    assert len([item for item in items if item.repository is timing_out]) == 20
@@ -0,0 +1,71 @@
+import asyncio
+
+import pytest
+
+from asyncrepo.exceptions import ItemNotFound
+from asyncrepo.index import IndexedRepository, InvertedIndex
+from asyncrepo.repository import Item
+from tests.live.test_repository import NumbersRepository
+
+
+class WordsRepository(NumbersRepository):
+    async def list_page(self, start: int = 0):
+        page = await super().list_page(start)
+        for item in page:
+            number = item.document['number']
+            item.document['words'] = f"{'even' if number % 2 == 0 else 'odd'} number{number} tens{number // 10}"
+        return page
+
+
+def test_inverted_index():
+    index = InvertedIndex([
+        Item(None, '1', {'title': 'New York City'}),
+        Item(None, '2', {'title': 'York'}),
+        Item(None, '3', {'title': 'Yorkshire pudding'}),
+    ])
+    assert [item.id for item in index.search('york')] == ['1', '2', '3']
+    assert [item.id for item in index.search('New YORK')] == ['1']
+    assert [item.id for item in index.search('york pud')] == ['3']
+    assert index.search('york boston') == []
+    assert len(index.search('')) == 3
+    assert index.get('2').document == {'title': 'York'}
+    assert index.get('4') is None
+
+
+@pytest.mark.asyncio
+async def test_searches_are_answered_from_the_index():
+    repository = WordsRepository(page_size=7)
+    indexed = IndexedRepository(repository, page_size=4)
+    assert len([item async for item in indexed.list()]) == 50
+    fetches = repository.fetches
+
+    pages = [page async for page in indexed.search_pages('even tens2')]
+    assert [len(page) for page in pages] == [4, 1]
+    assert [item.id for page in pages for item in page] == ['20', '22', '24', '26', '28']
+    assert [item.id async for item in indexed.search('number4')] == ['4', '40', '41', '42', '43', '44', '45', '46',
+                                                                     '47', '48', '49']
+    assert (await indexed.get('33')).document['number'] == 33
+    with pytest.raises(ItemNotFound):
+        await indexed.get('51')
+    assert repository.fetches == fetches
+
+
+@pytest.mark.asyncio
+async def test_the_index_is_built_once_and_refreshed():
+    repository = WordsRepository(delay=0.01)
+    indexed = IndexedRepository(repository, ttl=0.2)
+    results = await asyncio.gather(*[indexed.search_page('odd') for _ in range(5)])
+    assert all(len(page) == 25 for page in results)
+    assert repository.fetches == 5
+
+    # Partial listings don't replace the index
+    async for _ in indexed.list():
+        break
+    await indexed.search_page('odd')
+    assert repository.fetches == 6
+
+    await asyncio.sleep(0.2)
+    await indexed.search_page('odd')
+    assert repository.fetches == 11
+    await indexed.refresh()
+    assert repository.fetches == 16
@@ -0,0 +1,251 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from asyncrepo.exceptions import InvalidCursor, ItemNotFound, OperationNotSupported
+from asyncrepo.repository import BatchLoader, Repository, Page, Item
+from asyncrepo.utils.cursors import decode_cursor, encode_cursor
+
+
+class NumbersRepository(Repository):
+    """
+    An in-memory repository of the numbers 0 to total - 1, fetched a page at a time.
+    """
+
+    def __init__(self, total: int = 50, page_size: int = 10, delay: float = 0):
+        self.total = total
+        self.page_size = page_size
+        self.delay = delay
+        self.fetches = 0
+
+    async def list_page(self, start: int = 0) -> Page:
+        self.fetches += 1
+        await asyncio.sleep(self.delay)
+        end = min(start + self.page_size, self.total)
+        items = [Item(self, str(i), {'number': i}) for i in range(start, end)]
+        next_page_fn = None
+        if end < self.total:
+            async def next_page_fn():
+                return await self.list_page(end)
+        return Page(self, items, next_page_fn)
+
+    async def get(self, id: str) -> Item:
+        if not id.isdigit() or int(id) >= self.total:
+            raise ItemNotFound(id)
+        return Item(self, id, {'number': int(id)})
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("prefetch", [0, 1, 3])
+async def test_list_pages_with_prefetch(prefetch: int):
+    pages = [page async for page in NumbersRepository().list_pages(prefetch=prefetch)]
+    assert [len(page) for page in pages] == [10] * 5
+    assert [item.document['number'] for page in pages for item in page] == list(range(50))
+
+
+@pytest.mark.asyncio
+async def test_prefetch_overlaps_fetching_with_processing():
+    repository = NumbersRepository(delay=0.05)
+    async for _ in repository.list_pages(prefetch=2):
+        await asyncio.sleep(0.05)
+        # The background task is always busy fetching the following pages
+        assert repository.fetches >= 2
+
+
+@pytest.mark.asyncio
+async def test_prefetch_stops_when_the_consumer_breaks():
+    repository = NumbersRepository(total=1000, delay=0.01)
+    pages = repository.list_pages(prefetch=2)
+    async for _ in pages:
+        break
+    await pages.aclose()
+    fetches = repository.fetches
+    await asyncio.sleep(0.1)
+    assert repository.fetches == fetches
+    assert fetches <= 4
+
+
+class Interrupted(BaseException):
+    pass
+
+
+class InterruptedNumbersRepository(NumbersRepository):
+    """
+    A NumbersRepository whose second page fails with the given exception.
+    """
+
+    def __init__(self, exception: BaseException, **kwargs):
+        super().__init__(**kwargs)
+        self.exception = exception
+
+    async def list_page(self, start: int = 0) -> Page:
+        if start > 0:
+            raise self.exception
+        return await super().list_page(start)
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("exception", [asyncio.CancelledError(), Interrupted()])
+async def test_prefetch_forwards_base_exceptions(exception: BaseException):
+    repository = InterruptedNumbersRepository(exception)
+
+    async def consume():
+        return [page async for page in repository.list_pages(prefetch=2)]
+
+    # A timeout here would mean the consumer is left waiting on pages which never come
+    with pytest.raises(type(exception)):
+        await asyncio.wait_for(consume(), 5)
+
+
+@pytest.mark.asyncio
+async def test_search_pages_with_prefetch():
+    items = [item async for item in NumbersRepository().search("7", prefetch=2)]
+    assert [item.id for item in items] == ["7", "17", "27", "37", "47"]
+
+
+@pytest.mark.asyncio
+async def test_get_many():
+    result = NumbersRepository().get_many(["3", "99", "12", "3", "x"], concurrency=2)
+    items = [item async for item in result]
+    assert sorted(item.id for item in items) == ["12", "3"]
+    assert sorted(result.missing) == ["99", "x"]
+
+
+@pytest.mark.asyncio
+async def test_fields_are_projected_when_not_pushed_down():
+    repository = NumbersRepository(total=25)
+    pages = [page async for page in repository.list_pages(fields=['missing'], prefetch=1)]
+    assert [len(page) for page in pages] == [10, 10, 5]
+    assert all(item.document == {} for page in pages for item in page)
+    # Searches match the whole document before it is projected
+    items = [item async for item in repository.search("7", fields=['number'])]
+    assert [item.document for item in items] == [{'number': 7}, {'number': 17}]
+
+
+class LazyNumbersRepository(NumbersRepository):
+    """
+    Numbers whose squares are only loaded on demand, a page at a time.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.loads = []
+
+    async def list_page(self, start: int = 0) -> Page:
+        page = await super().list_page(start)
+        BatchLoader(page.items, self._load_squares)
+        return page
+
+    async def _load_squares(self, items) -> dict[str, dict]:
+        self.loads.append([item.id for item in items])
+        await asyncio.sleep(0.01)
+        return {item.id: {'square': {'value': int(item.id) ** 2}} for item in items}
+
+
+@pytest.mark.asyncio
+async def test_lightweight_items_are_loaded_a_batch_at_a_time():
+    repository = LazyNumbersRepository(total=25)
+    pages = [page async for page in repository.list_pages()]
+    item = pages[0][3]
+    assert not item.is_loaded
+    assert item.document == {'number': 3}
+    assert await item.field('number') == 3
+    assert repository.loads == []
+
+    # Concurrent loads of items on the same page share one call
+    values = await asyncio.gather(*[item.field('square.value') for item in pages[0]])
+    assert values == [i ** 2 for i in range(10)]
+    assert repository.loads == [[str(i) for i in range(10)]]
+    assert item.is_loaded and item.matches('square')
+    assert (await item.load()).document == {'number': 3, 'square': {'value': 9}}
+    with pytest.raises(KeyError):
+        await item.field('cube')
+
+    await pages[2].load()
+    assert [item.document['square']['value'] for item in pages[2]] == [i ** 2 for i in range(20, 25)]
+    assert len(repository.loads) == 2
+
+
+class ChangingNumbersRepository(NumbersRepository):
+    """
+    Numbers which each changed at some point, reported newest first like GitHub's.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        start = datetime(2022, 5, 1, tzinfo=timezone.utc)
+        self.changed_at = {str(i): start + timedelta(minutes=i) for i in range(self.total)}
+
+    async def _changes_since(self, since, *args, **kwargs):
+        for id, changed_at in sorted(self.changed_at.items(), key=lambda change: change[1], reverse=True):
+            if since is not None and changed_at < since:
+                return
+            yield await self.get(id), changed_at
+
+
+@pytest.mark.asyncio
+async def test_changes_since():
+    repository = ChangingNumbersRepository(total=5)
+    changes = repository.changes_since()
+    assert [item.id async for item in changes] == ['4', '3', '2', '1', '0']
+    assert changes.cursor == '2022-05-01T00:04:00+00:00'
+
+    repository.changed_at['1'] = repository.changed_at['4'] + timedelta(seconds=1)
+    repository.changed_at['2'] = repository.changed_at['4'] + timedelta(seconds=2)
+    newer = repository.changes_since(changes.cursor)
+    # Items changed right at the cursor are returned again
+    assert [item.id async for item in newer] == ['2', '1', '4']
+    assert newer.cursor == '2022-05-01T00:04:02+00:00'
+
+    unchanged = repository.changes_since(newer.cursor)
+    assert [item.id async for item in unchanged] == ['2']
+    assert unchanged.cursor == newer.cursor
+
+    # Stopping early leaves the cursor where it was, as the rest of the changes weren't seen
+    partial = repository.changes_since(changes.cursor)
+    async for _ in partial:
+        break
+    assert partial.cursor == changes.cursor
+
+    with pytest.raises(OperationNotSupported):
+        NumbersRepository().changes_since()
+
+
+class ResumableNumbersRepository(NumbersRepository):
+    """
+    Numbers whose pages have cursors holding the start of the next page.
+    """
+
+    resumes_pages = True
+
+    async def list_page(self, start: int = 0, resume_from=None) -> Page:
+        if resume_from is not None:
+            start = decode_cursor(self, resume_from)['start']
+        page = await super().list_page(start)
+        if page._next_page_fn is not None:
+            page.cursor = encode_cursor(self, {'start': start + self.page_size})
+        return page
+
+
+@pytest.mark.asyncio
+async def test_list_pages_resume_from_a_cursor():
+    repository = ResumableNumbersRepository(total=35)
+    pages = [page async for page in repository.list_pages()]
+    assert [page.cursor is None for page in pages] == [False, False, False, True]
+
+    resumed = [page async for page in ResumableNumbersRepository(total=35).list_pages(resume_from=pages[1].cursor)]
+    assert [item.id for page in resumed for item in page] == [str(i) for i in range(20, 35)]
+    assert [page.cursor for page in resumed] == [page.cursor for page in pages[2:]]
+
+    # Projected pages keep their cursors
+    projected = [page async for page in repository.list_pages(fields=['number'], resume_from=pages[0].cursor)]
+    assert projected[0][0].document == {'number': 10}
+    assert projected[0].cursor == pages[1].cursor
+
+    with pytest.raises(InvalidCursor):
+        await anext(repository.list_pages(resume_from=encode_cursor(NumbersRepository(), {'start': 10})))
+    with pytest.raises(InvalidCursor):
+        await anext(repository.list_pages(resume_from='not a cursor'))
+    with pytest.raises(OperationNotSupported):
+        await anext(NumbersRepository().list_pages(resume_from=resumed[0].cursor))
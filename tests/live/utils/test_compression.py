@@ -0,0 +1,43 @@
+import bz2
+import gzip
+import lzma
+
+import pytest
+
+from asyncrepo.utils.compression import MAGIC_SIZE, Decompressor, compression_from_magic, compression_from_path
+
+DATA = b''.join(b'%d,some text to compress\n' % i for i in range(10_000))
+
+COMPRESS = {
+    'gzip': gzip.compress,
+    'bz2': bz2.compress,
+    'xz': lzma.compress,
+}
+
+
+def test_compression_from_path():
+    assert compression_from_path('/exports/rows.csv.gz') == 'gzip'
+    assert compression_from_path('/exports/ROWS.CSV.ZST') == 'zstd'
+    assert compression_from_path('/exports/rows.csv') is None
+
+
+@pytest.mark.parametrize("compression", list(COMPRESS))
+def test_decompressor_handles_blocks_and_concatenated_streams(compression: str):
+    compress = COMPRESS[compression]
+    compressed = compress(DATA[:1000]) + compress(DATA[1000:])
+    assert compression_from_magic(compressed[:MAGIC_SIZE]) == compression
+    decompressor = Decompressor(compression)
+    decompressed = b''.join(decompressor.decompress(compressed[start:start + 333])
+                            for start in range(0, len(compressed), 333))
+    decompressor.finish()
+    assert decompressed == DATA
+
+    decompressor = Decompressor(compression)
+    decompressor.decompress(compressed[:len(compressed) // 3])
+    with pytest.raises(EOFError):
+        decompressor.finish()
+
+
+def test_compression_from_magic_ignores_text():
+    assert compression_from_magic(b'BZh,name\n1,') is None
+    assert compression_from_magic(DATA[:MAGIC_SIZE]) is None
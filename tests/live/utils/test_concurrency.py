@@ -0,0 +1,86 @@
+import asyncio
+
+import pytest
+
+from asyncrepo.utils.concurrency import bounded_map, merge
+
+
+async def delayed(n: int) -> int:
+    # Later arguments finish first
+    await asyncio.sleep((10 - n) / 100)
+    return n
+
+
+@pytest.mark.asyncio
+async def test_bounded_map_ordered():
+    assert [n async for n in bounded_map(delayed, range(10), limit=4)] == list(range(10))
+
+
+@pytest.mark.asyncio
+async def test_bounded_map_unordered():
+    results = [n async for n in bounded_map(delayed, range(10), limit=10, ordered=False)]
+    assert results == list(reversed(range(10)))
+
+
+@pytest.mark.asyncio
+async def test_bounded_map_respects_limit():
+    running = peak = 0
+
+    async def track(n: int) -> int:
+        nonlocal running, peak
+        running += 1
+        peak = max(peak, running)
+        await asyncio.sleep(0.01)
+        running -= 1
+        return n
+
+    assert len([n async for n in bounded_map(track, range(20), limit=3, ordered=False)]) == 20
+    assert peak == 3
+
+
+@pytest.mark.asyncio
+async def test_bounded_map_cancels_pending_calls_when_closed():
+    started = []
+
+    async def slow(n: int) -> int:
+        started.append(n)
+        await asyncio.sleep(10)
+        return n
+
+    results = bounded_map(slow, range(100), limit=5)
+    with pytest.raises(asyncio.TimeoutError):
+        await asyncio.wait_for(results.__anext__(), 0.05)
+    await results.aclose()
+    assert len(started) == 5
+
+
+@pytest.mark.asyncio
+async def test_merge_yields_every_value():
+    async def numbers(start: int, delay: float):
+        for n in range(start, start + 5):
+            await asyncio.sleep(delay)
+            yield n
+
+    values = [n async for n in merge([numbers(0, 0.01), numbers(10, 0.003)], buffer=2)]
+    assert sorted(values) == [*range(5), *range(10, 15)]
+
+
+@pytest.mark.asyncio
+async def test_merge_holds_at_most_buffer_values():
+    produced = 0
+
+    async def numbers():
+        nonlocal produced
+        for n in range(100):
+            produced += 1
+            yield n
+
+    values = merge([numbers(), numbers()], buffer=3)
+    assert await values.__anext__() == 0
+    await asyncio.sleep(0.05)
+    # Each iterator may also be holding the one value it is waiting to put
+    assert produced <= 1 + 3 + 2
+    await values.aclose()
+
+    with pytest.raises(ValueError):
+        await merge([numbers()], buffer=0).__anext__()
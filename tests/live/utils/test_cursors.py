@@ -0,0 +1,27 @@
+import json
+
+import pytest
+
+from asyncrepo.exceptions import InvalidCursor
+from asyncrepo.utils.cursors import decode_cursor, encode_cursor
+
+
+class Issues:
+    pass
+
+
+class Pages:
+    pass
+
+
+def test_cursors_round_trip_through_json():
+    cursor = encode_cursor(Issues(), {'start_at': 150, 'next_link': '/rest/api/search?cursor=a+b/c'})
+    assert cursor.isascii() and cursor.isprintable() and '=' not in cursor
+    assert json.loads(json.dumps(cursor)) == cursor
+    assert decode_cursor(Issues(), cursor) == {'start_at': 150, 'next_link': '/rest/api/search?cursor=a+b/c'}
+
+
+@pytest.mark.parametrize("cursor", ['', 'not a cursor', 'bm90IGpzb24', encode_cursor(Pages(), {'start': 25})])
+def test_invalid_cursors_are_rejected(cursor):
+    with pytest.raises(InvalidCursor):
+        decode_cursor(Issues(), cursor)
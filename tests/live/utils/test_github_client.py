@@ -0,0 +1,81 @@
+import pytest
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+
+from asyncrepo.exceptions import ItemNotFound
+from asyncrepo.repositories.github.repos import Repos
+from asyncrepo.utils.github_client import GithubClient
+
+REPOS = [{'id': i, 'full_name': f'acme/repo-{i}', 'updated_at': '2022-05-01T10:00:00Z'} for i in range(5)]
+
+
+@pytest.fixture
+async def github_server():
+    """
+    A local server with a few GitHub API endpoints: /orgs/acme/repos pages through REPOS two at a time with Link
+    headers, and /repos/acme/... finds one of them or answers 404. Every request's query and Authorization header
+    are recorded.
+    """
+    requests = []
+
+    async def org_repos(request):
+        requests.append((dict(request.query), request.headers.get('Authorization')))
+        page = int(request.query.get('page', '1'))
+        headers = {}
+        if page * 2 < len(REPOS):
+            headers['Link'] = f'<{request.url.update_query(page=page + 1)}>; rel="next"'
+        return web.json_response(REPOS[(page - 1) * 2:page * 2], headers=headers)
+
+    async def repo(request):
+        requests.append((dict(request.query), request.headers.get('Authorization')))
+        for raw in REPOS:
+            if raw['full_name'] == f"acme/{request.match_info['name']}":
+                return web.json_response(raw)
+        return web.json_response({'message': 'Not Found'}, status=404)
+
+    app = web.Application()
+    app.router.add_get('/orgs/acme/repos', org_repos)
+    app.router.add_get('/repos/acme/{name}', repo)
+    async with TestServer(app) as server:
+        yield server, requests
+
+
+@pytest.mark.asyncio
+async def test_client_follows_link_headers(github_server):
+    server, requests = github_server
+    async with GithubClient('secret', base_url=str(server.make_url(''))) as client:
+        pages = []
+        data, next_url = await client.get_page('/orgs/acme/repos', {'per_page': 2})
+        pages.append(data)
+        while next_url is not None:
+            data, next_url = await client.get_page(next_url)
+            pages.append(data)
+    assert [len(page) for page in pages] == [2, 2, 1]
+    assert [raw for page in pages for raw in page] == REPOS
+    assert [query.get('page') for query, _ in requests] == [None, '2', '3']
+    assert {authorization for _, authorization in requests} == {'token secret'}
+
+
+@pytest.mark.asyncio
+async def test_client_raises_item_not_found_for_missing_repos(github_server):
+    server, _ = github_server
+    async with GithubClient('secret', base_url=str(server.make_url(''))) as client:
+        assert (await client.get_repo('acme/repo-3'))['id'] == 3
+        with pytest.raises(ItemNotFound):
+            await client.get_repo('acme/missing')
+
+
+@pytest.mark.asyncio
+async def test_repos_list_page_takes_positional_query_parameters(github_server):
+    server, requests = github_server
+    repository = Repos('secret', org='acme', github_kwargs={'base_url': str(server.make_url(''))})
+    try:
+        page = await repository.list_page('public', 'updated')
+        assert [item.id for item in page] == ['acme/repo-0', 'acme/repo-1']
+        assert requests[0][0]['type'] == 'public'
+        assert requests[0][0]['sort'] == 'updated'
+        with pytest.raises(TypeError):
+            await repository.list_page('public', 'updated', 'desc', 'extra')
+        assert [item.id async for item in repository.list()] == [raw['full_name'] for raw in REPOS]
+    finally:
+        await repository.close()
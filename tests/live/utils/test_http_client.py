@@ -0,0 +1,146 @@
+import asyncio
+
+import pytest
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+
+from asyncrepo.utils.http_cache import CacheEntry, DiskResponseCache, MemoryResponseCache
+from asyncrepo.utils.http_client import HttpClient, RetryPolicy, connection_pool
+
+
+@pytest.mark.asyncio
+async def test_connection_pool_shares_connectors_by_base_url():
+    assert connection_pool.connector("https://example.com") is connection_pool.connector("https://example.com")
+    assert connection_pool.connector("https://example.com") is not connection_pool.connector("https://example.org")
+    assert connection_pool.session("https://example.com") is connection_pool.session("https://example.com")
+
+
+@pytest.mark.asyncio
+async def test_closing_a_client_leaves_the_pooled_connector_open():
+    async with HttpClient("https://example.com") as client:
+        connector = client.connector
+    assert client.closed
+    assert not connector.closed
+    assert connection_pool.connector("https://example.com") is connector
+    await connection_pool.close()
+    assert connector.closed
+
+
+@pytest.fixture
+async def flaky_server():
+    """
+    A local server whose /flaky endpoint fails with a 503 (asking to retry right away) twice before succeeding.
+    """
+    calls = {'flaky': 0, 'broken': 0, 'post': 0}
+
+    async def flaky(request):
+        calls['flaky'] += 1
+        if calls['flaky'] <= 2:
+            return web.Response(status=503, headers={'Retry-After': '0'})
+        return web.json_response({'ok': True})
+
+    async def broken(request):
+        calls['broken'] += 1
+        return web.Response(status=500)
+
+    async def post(request):
+        calls['post'] += 1
+        return web.Response(status=500)
+
+    app = web.Application()
+    app.router.add_get('/flaky', flaky)
+    app.router.add_get('/broken', broken)
+    app.router.add_post('/post', post)
+    async with TestServer(app) as server:
+        yield server, calls
+
+
+@pytest.mark.asyncio
+async def test_retries_honor_retry_after(flaky_server):
+    server, calls = flaky_server
+    async with HttpClient(retry_policy=RetryPolicy(backoff=0)) as client:
+        async with client.get(server.make_url('/flaky')) as response:
+            assert response.status == 200
+            assert await response.json() == {'ok': True}
+    assert calls['flaky'] == 3
+
+
+@pytest.mark.asyncio
+async def test_retries_are_limited_by_method(flaky_server):
+    server, calls = flaky_server
+    async with HttpClient(retry_policy=RetryPolicy(idempotent_retries=3, retries=1, backoff=0)) as client:
+        async with client.get(server.make_url('/broken')) as response:
+            assert response.status == 500
+        # A 500 may mean the request already took effect, so it is never retried for non-idempotent methods
+        async with client.post(server.make_url('/post')) as response:
+            assert response.status == 500
+    assert calls['broken'] == 4
+    assert calls['post'] == 1
+
+
+@pytest.fixture
+async def etag_server():
+    """
+    A local server whose /data endpoint answers conditional requests with a 304 while its ETag is unchanged.
+    """
+    state = {'etag': '"v1"', 'data': {'version': 1}, 'statuses': []}
+
+    async def data(request):
+        if request.headers.get('If-None-Match') == state['etag']:
+            state['statuses'].append(304)
+            return web.Response(status=304, headers={'ETag': state['etag']})
+        state['statuses'].append(200)
+        return web.json_response(state['data'], headers={'ETag': state['etag']})
+
+    app = web.Application()
+    app.router.add_get('/data', data)
+    async with TestServer(app) as server:
+        yield server, state
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("backend", ["memory", "disk"])
+async def test_conditional_requests_are_served_from_cache(etag_server, tmp_path, backend: str):
+    server, state = etag_server
+    cache = MemoryResponseCache() if backend == "memory" else DiskResponseCache(tmp_path)
+    async with HttpClient(cache=cache) as client:
+        for _ in range(2):
+            async with client.get(server.make_url('/data')) as response:
+                assert response.status == 200
+                assert await response.json() == {'version': 1}
+        state['etag'], state['data'] = '"v2"', {'version': 2}
+        async with client.get(server.make_url('/data')) as response:
+            assert await response.json() == {'version': 2}
+    assert state['statuses'] == [200, 304, 200]
+
+
+@pytest.mark.asyncio
+async def test_cached_responses_can_be_streamed(etag_server):
+    server, state = etag_server
+    async with HttpClient(cache=MemoryResponseCache()) as client:
+        for _ in range(2):
+            async with client.get(server.make_url('/data')) as response:
+                assert response.content_type == 'application/json'
+                assert b''.join([chunk async for chunk in response.content.iter_chunked(4)]) == b'{"version": 1}'
+    assert state['statuses'] == [200, 304]
+
+
+@pytest.mark.asyncio
+async def test_memory_cache_evicts_least_recently_used():
+    cache = MemoryResponseCache(max_size=10)
+    await cache.set('a', CacheEntry(200, [], b'12345'))
+    await cache.set('b', CacheEntry(200, [], b'12345'))
+    assert await cache.get('a') is not None
+    await cache.set('c', CacheEntry(200, [], b'12345'))
+    assert await cache.get('b') is None
+    assert await cache.get('a') is not None
+    assert await cache.get('c') is not None
+
+
+@pytest.mark.asyncio
+async def test_disk_cache_writes_of_the_same_key_do_not_interleave(tmp_path):
+    cache = DiskResponseCache(tmp_path)
+    bodies = [bytes([i]) * 1024 * 1024 for i in range(8)]
+    await asyncio.gather(*[cache.set('a', CacheEntry(200, [], body)) for body in bodies])
+    assert (await cache.get('a')).body in bodies
+    assert list(tmp_path.glob('*.tmp')) == []
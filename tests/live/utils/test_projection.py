@@ -0,0 +1,18 @@
+from asyncrepo.repository import Item
+from asyncrepo.utils.projection import project
+
+
+def test_project_keeps_only_the_given_fields():
+    document = {'id': '1', 'fields': {'summary': 'Hello', 'status': {'name': 'Done'}, 'labels': []}, 'extra': None}
+    assert project(document, ['id', 'fields.status.name', 'extra', 'missing', 'id.nested']) == {
+        'id': '1', 'fields': {'status': {'name': 'Done'}}, 'extra': None}
+    assert project(document, ['fields.summary', 'fields.labels']) == {'fields': {'summary': 'Hello', 'labels': []}}
+    assert project(document, []) == {}
+
+
+def test_item_project():
+    item = Item(None, '1', {'a': 1, 'b': {'c': 2, 'd': 3}})
+    assert item.project(None) is item
+    projected = item.project(['b.d'])
+    assert projected.id == '1'
+    assert projected.document == {'b': {'d': 3}}
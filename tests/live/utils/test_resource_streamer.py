@@ -1,7 +1,17 @@
+import bz2
+import csv
+import gzip
+import io
+import json
+import lzma
 from pathlib import Path
 
 import pytest
+from aiohttp import web
+from aiohttp.test_utils import TestServer
 
+from asyncrepo.utils.http_cache import MemoryResponseCache
+from asyncrepo.utils.http_client import RetryPolicy, connection_pool
 from asyncrepo.utils.resource_streamer import ResourceStreamer
 
 CSV_URLS = [
@@ -53,3 +63,263 @@ async def test_resource_streamer_can_stream_csv_file(filepath: str):
             assert isinstance(key, str)
             assert isinstance(value, str)
     assert rows > 0
+
+
+def write_tricky_csv(filepath: Path, rows: int) -> None:
+    values = ['plain', 'multi\nline', 'with "quotes"', '"\n"', '', 'comma, here']
+    with open(filepath, 'w', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(['id', 'value', 'tail'])
+        for i in range(rows):
+            writer.writerow([i, values[i % len(values)], 'end'])
+            if i % 100 == 0:
+                f.write('\n')
+
+
+@pytest.mark.asyncio
+async def test_resource_streamer_can_stream_csv_offsets(tmp_path):
+    filepath = tmp_path / 'tricky.csv'
+    write_tricky_csv(filepath, 500)
+    streamer = ResourceStreamer(filepath.as_posix())
+    rows = [row async for row in streamer.stream_csv_offsets()]
+    assert [row for _, row in rows] == [row async for row in streamer.stream_csv()]
+    assert [row['id'] for _, row in rows] == [str(i) for i in range(500)]
+    assert rows[1][1]['value'] == 'multi\nline'
+    for offset, row in rows[::37]:
+        assert await streamer.read_csv_row(offset) == row
+
+
+@pytest.mark.asyncio
+async def test_resource_streamer_can_read_mapped_csv_offsets(tmp_path):
+    filepath = tmp_path / 'mapped.csv'
+    lines = ['id,name,note'] + [f'{i},Zoë {"é" * (i % 5)},"ünï\r\ncode"' for i in range(300)]
+    lines += ['300,short', '301,a,b,c']
+    filepath.write_bytes('\r\n'.join(lines).encode())
+    streamer = ResourceStreamer(filepath.as_posix())
+    rows = [row async for row in streamer.stream_csv_offsets()]
+    expected = list(csv.DictReader(io.StringIO(filepath.read_bytes().decode(), newline='')))
+    assert [row for _, row in rows] == expected
+    assert rows[-2][1]['note'] is None
+    assert rows[-1][1][None] == ['c']
+    for offset, row in rows[::7]:
+        assert await streamer.read_csv_row(offset) == row
+
+    empty = tmp_path / 'empty.csv'
+    empty.write_bytes(b'')
+    assert [row async for row in ResourceStreamer(empty.as_posix()).stream_csv_offsets()] == []
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("newline, encoding", [('\r', 'utf-8'), ('\n', 'utf-8-sig'), ('\r\n', 'utf-8-sig')])
+async def test_resource_streamer_can_read_csv_offsets_past_cr_and_bom(tmp_path, newline: str, encoding: str):
+    filepath = tmp_path / 'lines.csv'
+    lines = ['id,name,note'] + [f'{i},Zoë {"é" * (i % 5)},"multi{newline}line"' for i in range(300)]
+    filepath.write_bytes(newline.join(lines).encode(encoding))
+    data = filepath.read_bytes()
+    streamer = ResourceStreamer(filepath.as_posix(), encoding=encoding)
+    expected = list(csv.DictReader(io.StringIO(data.decode(encoding), newline='')))
+    rows = [row async for row in streamer.stream_csv_offsets()]
+    assert [row for _, row in rows] == expected
+    assert [row async for row in streamer.stream_csv()] == expected
+    assert [row async for row in streamer.stream_csv_offsets(processes=2, chunk_size=1000)] == rows
+    for offset, row in rows[::7]:
+        assert data[offset:].startswith(f'{row["id"]},'.encode())
+        assert await streamer.read_csv_row(offset) == row
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("chunk_size", [64, 1000, 1 << 20])
+async def test_resource_streamer_can_parse_csv_in_processes(tmp_path, chunk_size: int):
+    filepath = tmp_path / 'tricky.csv'
+    write_tricky_csv(filepath, 500)
+    streamer = ResourceStreamer(filepath.as_posix())
+    serial = [row async for row in streamer.stream_csv_offsets()]
+    assert [row async for row in streamer.stream_csv_offsets(processes=2, chunk_size=chunk_size)] == serial
+
+
+@pytest.fixture
+async def csv_server(tmp_path):
+    """
+    A local server whose /tricky.csv endpoint sends a tricky CSV file in small, unevenly sized writes.
+    """
+    filepath = tmp_path / 'tricky.csv'
+    write_tricky_csv(filepath, 500)
+    data = filepath.read_bytes()
+
+    async def tricky(request):
+        response = web.StreamResponse(headers={'Content-Type': 'text/csv; charset=utf-8'})
+        await response.prepare(request)
+        for start in range(0, len(data), 777):
+            await response.write(data[start:start + 777])
+        return response
+
+    app = web.Application()
+    app.router.add_get('/tricky.csv', tricky)
+    async with TestServer(app) as server:
+        yield server, filepath
+
+
+@pytest.mark.asyncio
+async def test_resource_streamer_can_stream_csv_batches(csv_server):
+    server, filepath = csv_server
+    expected = list(csv.DictReader(io.StringIO(filepath.read_bytes().decode(), newline='')))
+    for filepath_or_url in [filepath.as_posix(), str(server.make_url('/tricky.csv'))]:
+        batches = [batch async for batch in ResourceStreamer(filepath_or_url).stream_csv_batches(batch_size=64)]
+        assert [len(batch) for batch in batches] == [64] * 7 + [52]
+        assert [row for batch in batches for row in batch] == expected
+
+
+@pytest.mark.asyncio
+async def test_resource_streamer_streams_past_the_response_cache(monkeypatch):
+    rows = [{'id': i} for i in range(30)]
+    conditional_requests = []
+
+    async def jsonl(request):
+        conditional_requests.append(request.headers.get('If-None-Match'))
+        body = ''.join(json.dumps(row) + '\n' for row in rows)
+        return web.Response(text=body, content_type='application/json', headers={'ETag': '"v1"'})
+
+    monkeypatch.setattr(connection_pool, 'cache', MemoryResponseCache())
+    app = web.Application()
+    app.router.add_get('/rows.jsonl', jsonl)
+    async with TestServer(app) as server:
+        streamer = ResourceStreamer(str(server.make_url('/rows.jsonl')))
+        for _ in range(2):
+            assert [row async for row in streamer.stream_jsonl()] == rows
+    assert conditional_requests == [None, None]
+
+
+@pytest.fixture
+async def ranged_csv_server(tmp_path, monkeypatch):
+    """
+    A local server whose /ranged.csv endpoint serves byte ranges of a tricky CSV file, but drops the connection
+    after sending drop_after bytes of any response, and /ranged.csv?changed=1 serves a different file to resumed
+    requests.
+    """
+    monkeypatch.setattr(connection_pool, 'retry_policy', RetryPolicy(backoff=0))
+    filepath = tmp_path / 'tricky.csv'
+    write_tricky_csv(filepath, 500)
+    data = filepath.read_bytes()
+    requests = []
+
+    async def ranged(request):
+        requests.append(request.headers.get('Range'))
+        body = data
+        if request.query.get('changed') and request.headers.get('If-Range'):
+            body = data + b'changed'
+        headers = {'Content-Type': 'text/csv; charset=utf-8', 'Accept-Ranges': 'bytes', 'ETag': f'"{len(body)}"'}
+        status = 200
+        start, end = 0, len(body)
+        if 'Range' in request.headers and request.headers.get('If-Range', headers['ETag']) == headers['ETag']:
+            start, end = request.http_range.start, min(request.http_range.stop or len(body), len(body))
+            headers['Content-Range'] = f'bytes {start}-{end - 1}/{len(body)}'
+            status = 206
+        response = web.StreamResponse(status=status, headers=headers)
+        response.content_length = end - start
+        await response.prepare(request)
+        await response.write(body[start:min(end, start + server.drop_after)])
+        if start + server.drop_after < end:
+            request.transport.close()
+        return response
+
+    app = web.Application()
+    app.router.add_get('/ranged.csv', ranged)
+    async with TestServer(app) as server:
+        server.drop_after = len(data)
+        server.requests = requests
+        yield server, filepath
+
+
+@pytest.mark.asyncio
+async def test_resource_streamer_resumes_csv_downloads(ranged_csv_server):
+    server, filepath = ranged_csv_server
+    expected = list(csv.DictReader(io.StringIO(filepath.read_bytes().decode(), newline='')))
+    server.drop_after = 3000
+    streamer = ResourceStreamer(str(server.make_url('/ranged.csv')))
+    assert [row async for row in streamer.stream_csv()] == expected
+    assert server.requests[0] is None
+    assert server.requests[1:] == [f'bytes={start}-{filepath.stat().st_size - 1}'
+                                   for start in range(3000, filepath.stat().st_size, 3000)]
+
+    server.requests.clear()
+    streamer = ResourceStreamer(str(server.make_url('/ranged.csv').with_query(changed=1)))
+    with pytest.raises(ValueError, match='changed'):
+        _ = [row async for row in streamer.stream_csv()]
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("drop_after", [1 << 20, 700])
+async def test_resource_streamer_can_download_csv_ranges_in_parallel(ranged_csv_server, drop_after: int):
+    server, filepath = ranged_csv_server
+    expected = list(csv.DictReader(io.StringIO(filepath.read_bytes().decode(), newline='')))
+    server.drop_after = drop_after
+    streamer = ResourceStreamer(str(server.make_url('/ranged.csv')), connections=3, range_size=1000)
+    assert [row async for row in streamer.stream_csv()] == expected
+    size = filepath.stat().st_size
+    ranges = {f'bytes={start}-{min(start + 1000, size) - 1}' for start in range(0, size, 1000)}
+    assert ranges <= set(server.requests)
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("extension, compression", [('.gz', 'gzip'), ('.bz2', 'bz2'), ('.xz', 'xz'), ('.zst', 'zstd')])
+@pytest.mark.parametrize("cr_only", [False, True])
+async def test_resource_streamer_can_stream_compressed_csv_files(tmp_path, extension: str, compression: str,
+                                                                 cr_only: bool):
+    if compression == 'zstd':
+        compress = pytest.importorskip('zstandard').ZstdCompressor().compress
+    else:
+        compress = {'gzip': gzip.compress, 'bz2': bz2.compress, 'xz': lzma.compress}[compression]
+    filepath = tmp_path / 'tricky.csv'
+    if cr_only:
+        filepath.write_bytes('\r'.join(['id,value'] + [f'{i},"multi\rline"' for i in range(500)]).encode())
+    else:
+        write_tricky_csv(filepath, 500)
+    expected = list(csv.DictReader(io.StringIO(filepath.read_bytes().decode(), newline='')))
+    assert [row async for row in ResourceStreamer(filepath.as_posix()).stream_csv()] == expected
+    data = filepath.read_bytes()
+    compressed = compress(data[:5000]) + compress(data[5000:])
+    # Recognized from the extension, and from the data itself without one
+    for name in [f'tricky.csv{extension}', 'tricky.data']:
+        (tmp_path / name).write_bytes(compressed)
+        streamer = ResourceStreamer((tmp_path / name).as_posix())
+        assert await streamer.file_compression() == compression
+        assert [row async for row in streamer.stream_csv()] == expected
+        with pytest.raises(ValueError):
+            _ = [row async for row in streamer.stream_csv_offsets()]
+
+
+@pytest.fixture
+async def compressed_csv_server(tmp_path):
+    """
+    A local server with a tricky CSV file sent gzip compressed as a /tricky.csv.gz file, as /tricky.csv with a
+    gzip Content-Encoding, and as an xz compressed /tricky file.
+    """
+    filepath = tmp_path / 'tricky.csv'
+    write_tricky_csv(filepath, 500)
+    data = filepath.read_bytes()
+
+    def handler(body: bytes, headers: dict):
+        async def handle(request):
+            response = web.StreamResponse(headers=headers)
+            await response.prepare(request)
+            for start in range(0, len(body), 777):
+                await response.write(body[start:start + 777])
+            return response
+        return handle
+
+    app = web.Application()
+    app.router.add_get('/tricky.csv.gz', handler(gzip.compress(data), {'Content-Type': 'application/gzip'}))
+    app.router.add_get('/tricky.csv', handler(gzip.compress(data), {'Content-Type': 'text/csv; charset=utf-8',
+                                                                    'Content-Encoding': 'gzip'}))
+    app.router.add_get('/tricky', handler(lzma.compress(data), {'Content-Type': 'application/octet-stream'}))
+    async with TestServer(app) as server:
+        yield server, filepath
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("path", ['/tricky.csv.gz', '/tricky.csv', '/tricky'])
+async def test_resource_streamer_can_stream_compressed_csv_urls(compressed_csv_server, path: str):
+    server, filepath = compressed_csv_server
+    expected = list(csv.DictReader(io.StringIO(filepath.read_bytes().decode(), newline='')))
+    streamer = ResourceStreamer(str(server.make_url(path)))
+    assert [row async for row in streamer.stream_csv()] == expected
@@ -0,0 +1,34 @@
+import json
+import pickle
+
+from asyncrepo.repository import Item
+from asyncrepo.utils.row import Header, Row
+
+
+def test_row_is_a_read_only_mapping():
+    header = Header(['date', 'county', 'cases'])
+    row = header.row(['2020-03-01', 'New York City', '7'])
+    assert row == {'date': '2020-03-01', 'county': 'New York City', 'cases': '7'}
+    assert {'date': '2020-03-01', 'county': 'New York City', 'cases': '7'} == row
+    assert list(row) == ['date', 'county', 'cases'] and len(row) == 3
+    assert row['county'] == 'New York City' and row.get('fips') is None and 'fips' not in row
+    assert list(row.values()) == ['2020-03-01', 'New York City', '7']
+    assert repr(row) == repr(dict(row))
+    assert json.dumps(dict(row)) == json.dumps({'date': '2020-03-01', 'county': 'New York City', 'cases': '7'})
+    assert not hasattr(row, '__dict__')
+
+
+def test_header_compacts_rows_with_its_names():
+    header = Header(['a', 'b'])
+    assert isinstance(header.compact({'a': 1, 'b': 2}), Row)
+    assert isinstance(header.compact({'b': 2, 'a': 1}), dict)
+    assert isinstance(header.compact({'a': 1, 'b': 2, None: [3]}), dict)
+    rows = pickle.loads(pickle.dumps([header.row([i, i]) for i in range(3)]))
+    assert rows[0].header is rows[2].header and rows[2] == {'a': 2, 'b': 2}
+
+
+def test_items_match_and_project_rows():
+    item = Item(None, '1', Header(['county', 'state']).row(['New York City', 'New York']))
+    assert item.matches('york city')
+    assert item.project(['state']).document == {'state': 'New York'}
+    assert not hasattr(item, '__dict__')
@@ -0,0 +1,19 @@
+from asyncrepo.repository import Item
+from asyncrepo.utils.text import matches, normalized
+
+
+def test_normalized_keeps_only_alphanumerics():
+    text = "Hello, World_42! Ünïcödé — ½ snake_case\tτέλος ٣"
+    assert normalized(text) == ''.join(c.lower() for c in text if c.isalnum())
+
+
+def test_matches():
+    assert matches("new york city", {'county': 'New York City'})
+    assert not matches("new jersey", {'county': 'New York City'})
+
+
+def test_item_search_text_is_cached():
+    item = Item(None, '1', {'county': 'New York City'})
+    assert item.matches("NEW-YORK")
+    item.document['county'] = 'Kings'
+    assert item.search_text == normalized(str({'county': 'New York City'}))
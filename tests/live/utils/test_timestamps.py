@@ -0,0 +1,19 @@
+from datetime import datetime, timedelta, timezone
+
+from asyncrepo.utils.timestamps import format_timestamp, minutes_since, parse_timestamp
+
+
+def test_parse_timestamp_in_the_sources_formats():
+    expected = datetime(2022, 5, 1, 10, 20, 30, 123000, tzinfo=timezone.utc)
+    assert parse_timestamp('2022-05-01T10:20:30.123Z') == expected
+    assert parse_timestamp('2022-05-01T10:20:30.123+0000') == expected
+    assert parse_timestamp('2022-05-01T12:20:30.123+0200') == expected
+    assert parse_timestamp('2022-05-01T10:20:30.123000') == expected
+    assert parse_timestamp(format_timestamp(expected)) == expected
+    assert parse_timestamp(format_timestamp(expected)).tzinfo == timezone.utc
+
+
+def test_minutes_since_rounds_up_with_a_margin():
+    now = datetime.now(timezone.utc)
+    assert minutes_since(now - timedelta(minutes=5, seconds=1)) == 7
+    assert minutes_since(now + timedelta(minutes=5), margin=2) == 2